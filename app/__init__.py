@@ -5,7 +5,16 @@ __all__ = [
     "models",
     "prompts",
     "selection",
+    "quantization",
+    "embedding_cache",
+    "embedding_workers",
+    "response_cache",
+    "singleflight",
+    "corpus",
     "guards",
+    "metrics",
+    "admission",
+    "routing",
     "compression",
     "main",
 ]
@@ -0,0 +1,199 @@
+"""Backend admission control: a concurrency cap with a bounded, deadline-aware queue."""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from .metrics import BACKEND_REJECTIONS
+
+__all__ = ["ConcurrencyLimiter", "Overloaded"]
+
+
+class Overloaded(Exception):
+    """The backend is saturated; retry after ``retry_after`` seconds."""
+
+    def __init__(self, reason: str, retry_after: float) -> None:
+        super().__init__(f"Backend overloaded ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(math.ceil(self.retry_after), 1))
+
+
+class ConcurrencyLimiter:
+    """Cap concurrent backend calls; queue a bounded number of callers.
+
+    A caller is rejected with :class:`Overloaded` without waiting when:
+
+    - ``max_queue`` callers are already waiting, or
+    - the expected wait is longer than ``queue_timeout``. The expected wait
+      is the smoothed backend latency times the queue depth over the limit.
+
+    A queued caller that is not admitted within ``queue_timeout`` is also
+    rejected.
+
+    With ``adaptive`` the limit moves between ``min_limit`` and ``limit``,
+    AIMD style. It grows by ``1 / limit`` per call completed while
+    saturated, i.e. by about one per round trip. It shrinks by ``backoff``,
+    at most once per round trip, when a call fails or takes ``tolerance``
+    times longer than the best recent latency.
+    """
+
+    def __init__(
+        self,
+        limit: int,
+        max_queue: int = 100,
+        queue_timeout: float = 10.0,
+        *,
+        adaptive: bool = False,
+        min_limit: int = 1,
+        tolerance: float = 2.0,
+        backoff: float = 0.9,
+    ) -> None:
+        self.max_limit = max(limit, 1)
+        self.min_limit = max(min(min_limit, self.max_limit), 1)
+        self.limit = float(self.max_limit)
+        self.max_queue = max(max_queue, 0)
+        self.queue_timeout = queue_timeout
+        self.adaptive = adaptive
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.in_flight = 0
+        self._waiters: deque[asyncio.Future[None]] = deque()
+        self.latency: float | None = None  # EWMA of call latency
+        self.min_latency: float | None = None  # slowly decaying baseline
+        self._last_decrease = 0.0
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    @property
+    def capacity(self) -> int:
+        return max(int(self.limit), 1)
+
+    def expected_wait(self) -> float:
+        latency = self.latency if self.latency is not None else 0.0
+        return latency * (len(self._waiters) + 1) / self.capacity
+
+    def _reject(self, reason: str) -> Overloaded:
+        self.rejected += 1
+        BACKEND_REJECTIONS.inc(reason=reason)
+        return Overloaded(reason, self.expected_wait() or 1.0)
+
+    def _free(self) -> bool:
+        return self.in_flight < self.capacity and not self._waiters
+
+    def _check_queue(self) -> None:
+        if len(self._waiters) >= self.max_queue:
+            raise self._reject("queue_full")
+        if self.expected_wait() > self.queue_timeout:
+            raise self._reject("deadline")
+
+    def check(self) -> None:
+        """Raise :class:`Overloaded` if ``acquire`` would reject right now.
+
+        Takes no slot; lets a caller answer 429 before committing to a
+        response, e.g. a stream whose headers go out before the backend call.
+        """
+        if not self._free():
+            self._check_queue()
+
+    async def acquire(self) -> None:
+        if self._free():
+            self.in_flight += 1
+            self.admitted += 1
+            return
+        self._check_queue()
+
+        waiter: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except BaseException as exc:
+            if waiter.done() and not waiter.cancelled():
+                self._release()  # admitted just as we gave up
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(exc, asyncio.TimeoutError):
+                self.timeouts += 1
+                raise self._reject("timeout") from None
+            raise
+        self.admitted += 1
+
+    def _release(self) -> None:
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < self.capacity:
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+            self.in_flight += 1
+            waiter.set_result(None)
+
+    def release(self, latency: float | None = None, ok: bool = True) -> None:
+        """Free a slot; ``latency`` and ``ok`` feed the adaptive limit."""
+        if latency is not None:
+            self._observe(latency, ok, saturated=self.in_flight >= self.capacity)
+        self._release()
+
+    def _observe(self, latency: float, ok: bool, saturated: bool) -> None:
+        if ok:
+            self.latency = (
+                latency if self.latency is None else 0.8 * self.latency + 0.2 * latency
+            )
+            # Let the baseline drift up so a permanently slower backend is
+            # eventually treated as normal rather than as congestion.
+            self.min_latency = (
+                latency
+                if self.min_latency is None
+                else min(self.min_latency * 1.01, latency)
+            )
+        if not self.adaptive:
+            return
+        congested = not ok or (
+            self.min_latency is not None and latency > self.tolerance * self.min_latency
+        )
+        now = time.monotonic()
+        if congested:
+            if now - self._last_decrease >= (self.latency or 0.0):
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+        elif saturated:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold a slot for the ``async with`` block, timing it for adaptation."""
+        await self.acquire()
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.release(time.perf_counter() - started, ok=False)
+            raise
+        except BaseException:
+            # Cancelled or closed by the caller: says nothing about the backend.
+            self.release()
+            raise
+        else:
+            self.release(time.perf_counter() - started)
+
+    def stats(self) -> dict[str, float | int]:
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": len(self._waiters),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "latency": round(self.latency or 0.0, 6),
+        }
@@ -1,18 +1,40 @@
 """Utilities for chunking documents into token-constrained segments."""
 
-from collections.abc import Iterable
+import re
+from collections.abc import Iterable, Iterator
+from functools import lru_cache
+
+import numpy as np
 
 try:  # pragma: no cover - optional dependency wiring
     import tiktoken  # type: ignore
 except ModuleNotFoundError:  # pragma: no cover - runtime fallback
     tiktoken = None  # type: ignore
 
-__all__ = ["chunk_text"]
+__all__ = [
+    "CHUNKING_STRATEGIES",
+    "Span",
+    "chunk_document",
+    "chunk_spans",
+    "chunk_text",
+    "count_tokens",
+    "iter_chunks",
+    "iter_structured_chunks",
+    "rechunk_tail",
+    "split_sentences",
+]
+
+CHUNKING_STRATEGIES = ("window", "structure")
 
+# (start, end, text): the character range of ``document`` a chunk was cut from.
+Span = tuple[int, int, str]
+# A span plus its token count as known from chunking.
+_CountedSpan = tuple[int, int, str, int]
 
-def _window(sequence: list[int], size: int, step: int) -> Iterable[list[int]]:
-    for start in range(0, len(sequence), step):
-        yield sequence[start : start + size]
+_HEADING = re.compile(r"#{1,6}\s")
+_FENCE = re.compile(r"\s*(`{3,}|~{3,})")
+_WORD = re.compile(r"\S+")
+_SENTENCE = re.compile(r".*?(?:[.!?](?=\s)|\n|$)\s*", re.S)
 
 
 def _words_window(words: list[str], size: int, step: int) -> Iterable[list[str]]:
@@ -22,6 +44,7 @@ def _words_window(words: list[str], size: int, step: int) -> Iterable[list[str]]
             yield chunk
 
 
+@lru_cache(maxsize=1)
 def _resolve_encoding():
     if tiktoken is None:  # pragma: no cover - optional dependency wiring
         return None
@@ -38,31 +61,350 @@ def _resolve_encoding():
     return None
 
 
-def chunk_text(document: str, target_tokens: int, overlap_tokens: int) -> list[str]:
-    """Chunk ``document`` into segments that respect the provided budgets."""
+@lru_cache(maxsize=4)
+def _token_byte_lengths(encoding) -> np.ndarray:
+    """Return the UTF-8 byte length of every token id in ``encoding``'s vocabulary."""
 
-    if not document:
-        return []
+    lengths = np.zeros(encoding.n_vocab, dtype=np.uint32)
+    for token in range(encoding.n_vocab):
+        try:
+            lengths[token] = len(encoding.decode_single_token_bytes(token))
+        except KeyError:  # gaps in the vocabulary
+            continue
+    return lengths
+
+
+def _encode(encoding, document: str) -> np.ndarray:
+    # Special-token text such as "<|endoftext|>" is ordinary input here.
+    if hasattr(encoding, "encode_to_numpy"):
+        return encoding.encode_to_numpy(document, disallowed_special=())
+    return np.asarray(encoding.encode(document, disallowed_special=()), dtype=np.uint32)
+
+
+def _token_offsets(encoding, document: str) -> tuple[bytes, np.ndarray] | None:
+    """Return the document's UTF-8 bytes and the byte offset of every token."""
+
+    token_ids = _encode(encoding, document)
+    if token_ids.size == 0:
+        return None
+
+    data = document.encode("utf-8")
+    offset_dtype = np.uint32 if len(data) < 2**32 else np.uint64
+    offsets = np.zeros(token_ids.size + 1, dtype=offset_dtype)
+    np.cumsum(
+        _token_byte_lengths(encoding)[token_ids], dtype=offset_dtype, out=offsets[1:]
+    )
+    return data, offsets
+
+
+def _token_chunks(encoding, document: str, size: int, step: int) -> Iterator[str]:
+    """Slice ``document`` by token windows using byte offsets instead of decoding.
+
+    Token byte lengths are looked up in a per-process table and prefix-summed
+    once, so each window is a slice of the document's UTF-8 bytes and
+    overlapping tokens are never decoded twice.
+    """
+
+    tokens = _token_offsets(encoding, document)
+    if tokens is None:
+        return
+    data, offsets = tokens
+    last = offsets.size - 1
+    for start in range(0, last, step):
+        end = min(start + size, last)
+        chunk = data[offsets[start] : offsets[end]].decode("utf-8", errors="replace")
+        if chunk:
+            yield chunk
+
+
+def _token_spans(
+    encoding, document: str, size: int, step: int
+) -> Iterator[_CountedSpan]:
+    tokens = _token_offsets(encoding, document)
+    if tokens is None:
+        return
+    data, offsets = tokens
+    # Characters that start before each byte offset: count UTF-8 lead bytes.
+    lead = (np.frombuffer(data, dtype=np.uint8) & 0xC0) != 0x80
+    chars = np.zeros(len(data) + 1, dtype=offsets.dtype)
+    np.cumsum(lead, dtype=offsets.dtype, out=chars[1:])
+    last = offsets.size - 1
+    for start in range(0, last, step):
+        end = min(start + size, last)
+        begin, finish = int(chars[offsets[start]]), int(chars[offsets[end]])
+        chunk = data[offsets[start] : offsets[end]].decode("utf-8", errors="replace")
+        if chunk:
+            yield begin, finish, chunk, end - start
 
+
+def _window_step(target_tokens: int, overlap_tokens: int) -> tuple[int, int]:
     target = max(target_tokens, 1)
     overlap = max(overlap_tokens, 0)
     effective_overlap = min(overlap, target - 1) if target > 1 else 0
-    step = max(target - effective_overlap, 1)
+    return target, max(target - effective_overlap, 1)
+
+
+def iter_chunks(
+    document: str, target_tokens: int, overlap_tokens: int
+) -> Iterator[str]:
+    """Lazily yield chunks of ``document`` that respect the provided budgets."""
 
+    if not document:
+        return
+
+    target, step = _window_step(target_tokens, overlap_tokens)
     encoding = _resolve_encoding()
 
     if encoding is not None:
-        token_ids = encoding.encode(document)
-        if not token_ids:
-            return []
-
-        chunks = [
-            encoding.decode(window) for window in _window(token_ids, target, step)
-        ]
-        return [chunk for chunk in chunks if chunk]
+        yield from _token_chunks(encoding, document, target, step)
+        return
 
     words = document.split()
     if not words:
-        return [document]
+        yield document
+        return
+
+    for chunk in _words_window(words, target, step):
+        yield " ".join(chunk)
+
+
+def _window_spans(
+    document: str, target_tokens: int, overlap_tokens: int
+) -> Iterator[_CountedSpan]:
+    """``iter_chunks`` with the character range and token count of each chunk."""
+
+    if not document:
+        return
+
+    target, step = _window_step(target_tokens, overlap_tokens)
+    encoding = _resolve_encoding()
+
+    if encoding is not None:
+        yield from _token_spans(encoding, document, target, step)
+        return
+
+    words = list(_WORD.finditer(document))
+    if not words:
+        yield 0, len(document), document, 0
+        return
+
+    for start in range(0, len(words), step):
+        window = words[start : start + target]
+        text = " ".join(word.group() for word in window)
+        yield window[0].start(), window[-1].end(), text, len(window)
+
+
+def chunk_text(document: str, target_tokens: int, overlap_tokens: int) -> list[str]:
+    """Chunk ``document`` into segments that respect the provided budgets."""
 
-    return [" ".join(chunk) for chunk in _words_window(words, target, step)]
+    return list(iter_chunks(document, target_tokens, overlap_tokens))
+
+
+def _segments(document: str) -> Iterator[str]:
+    """Split markdown-ish text into headings, paragraphs and whole fenced blocks.
+
+    Blank lines stay attached to the segment they terminate, so concatenating
+    the segments reproduces ``document`` exactly.
+    """
+
+    current: list[str] = []
+    fence: str | None = None
+    for line in document.splitlines(keepends=True):
+        if fence is not None:
+            current.append(line)
+            if line.lstrip().startswith(fence):
+                fence = None
+                yield "".join(current)
+                current = []
+            continue
+
+        marker = _FENCE.match(line)
+        if marker or _HEADING.match(line):
+            if current:
+                yield "".join(current)
+            current = [line]
+            if marker:
+                fence = marker.group(1)
+            continue
+
+        current.append(line)
+        if not line.strip():
+            yield "".join(current)
+            current = []
+    if current:
+        yield "".join(current)
+
+
+def iter_structured_chunks(document: str, target_tokens: int) -> Iterator[str]:
+    """Pack structural segments greedily into chunks of at most ``target_tokens``.
+
+    Chunk boundaries fall between headings, paragraphs and code fences; a new
+    chunk starts at a heading once the current one is half full. Segments larger
+    than the target fall back to fixed windows. No overlap is added since the
+    boundaries are already semantic. Each segment is tokenized once.
+    """
+
+    for _, _, chunk, _ in _structured_spans(document, target_tokens):
+        yield chunk
+
+
+def _structured_spans(document: str, target_tokens: int) -> Iterator[_CountedSpan]:
+    """Structural chunks; each count is the sum of its segments' counts."""
+    target = max(target_tokens, 1)
+    current: list[str] = []
+    used = 0
+    start = position = 0
+
+    def flush() -> Iterator[_CountedSpan]:
+        chunk = "".join(current).rstrip()
+        if chunk.strip():
+            yield start, start + len(chunk), chunk, used
+
+    for segment in _segments(document):
+        tokens = count_tokens(segment)
+        if tokens > target:
+            yield from flush()
+            current, used = [], 0
+            for begin, end, chunk, count in _window_spans(segment, target, 0):
+                yield position + begin, position + end, chunk, count
+            position += len(segment)
+            start = position
+            continue
+        starts_section = _HEADING.match(segment) is not None
+        if current and (
+            used + tokens > target or (starts_section and used * 2 >= target)
+        ):
+            yield from flush()
+            current, used = [], 0
+        if not current:
+            start = position
+        current.append(segment)
+        used += tokens
+        position += len(segment)
+    yield from flush()
+
+
+def _counted_spans(
+    document: str, target_tokens: int, overlap_tokens: int, strategy: str
+) -> list[_CountedSpan]:
+    if strategy == "window":
+        return list(_window_spans(document, target_tokens, overlap_tokens))
+    if strategy == "structure":
+        return list(_structured_spans(document, target_tokens))
+    raise ValueError(f"Unsupported chunking strategy: {strategy}")
+
+
+def chunk_document(
+    document: str,
+    target_tokens: int,
+    overlap_tokens: int,
+    strategy: str = "window",
+    *,
+    return_counts: bool = False,
+) -> list[str] | tuple[list[str], list[int]]:
+    """Chunk ``document`` with the named strategy (see ``CHUNKING_STRATEGIES``).
+
+    With ``return_counts`` also return each chunk's token count as known from
+    chunking, so callers need not encode the chunks again.
+    """
+
+    if return_counts:
+        spans = _counted_spans(document, target_tokens, overlap_tokens, strategy)
+        return [span[2] for span in spans], [span[3] for span in spans]
+    if strategy == "window":
+        return chunk_text(document, target_tokens, overlap_tokens)
+    if strategy == "structure":
+        return list(iter_structured_chunks(document, target_tokens))
+    raise ValueError(f"Unsupported chunking strategy: {strategy}")
+
+
+def chunk_spans(
+    document: str,
+    target_tokens: int,
+    overlap_tokens: int,
+    strategy: str = "window",
+    *,
+    return_counts: bool = False,
+) -> list[Span] | tuple[list[Span], list[int]]:
+    """``chunk_document`` plus the character range of ``document`` per chunk."""
+
+    spans = _counted_spans(document, target_tokens, overlap_tokens, strategy)
+    plain = [(start, end, text) for start, end, text, _ in spans]
+    if return_counts:
+        return plain, [span[3] for span in spans]
+    return plain
+
+
+def _common_prefix(old: str, new: str) -> int:
+    if new.startswith(old):
+        return len(old)
+    low, high = 0, min(len(old), len(new))
+    while low < high:  # binary search keeps the comparisons in C
+        middle = (low + high + 1) // 2
+        if old[:middle] == new[:middle]:
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def rechunk_tail(
+    old_document: str,
+    old_spans: list[Span],
+    new_document: str,
+    target_tokens: int,
+    overlap_tokens: int,
+    strategy: str = "window",
+) -> tuple[int, list[Span]]:
+    """Re-chunk only the part of ``new_document`` that differs from the old one.
+
+    Returns ``(keep, spans)``: ``old_spans[:keep]`` are unchanged and ``spans``
+    are the chunks for the rest of ``new_document``. Window chunking restarts at
+    the first window touching the edit, so the step grid and the overlap with
+    the last kept window are preserved; structural chunking also redoes the
+    preceding chunk, whose boundary depended on the edited segment.
+    """
+
+    changed = _common_prefix(old_document, new_document)
+    # Tokens can merge across the edit point, so back off to the word start.
+    while changed > 0 and not old_document[changed - 1].isspace():
+        changed -= 1
+
+    keep = next(
+        (index for index, span in enumerate(old_spans) if span[1] >= changed),
+        len(old_spans),
+    )
+    keep = min(keep, max(len(old_spans) - 1, 0))
+    if strategy == "structure":
+        keep = max(keep - 1, 0)
+    elif strategy != "window":
+        raise ValueError(f"Unsupported chunking strategy: {strategy}")
+
+    offset = old_spans[keep][0] if old_spans else 0
+    spans = chunk_spans(new_document[offset:], target_tokens, overlap_tokens, strategy)
+    return keep, [(offset + start, offset + end, text) for start, end, text in spans]
+
+
+def split_sentences(text: str) -> list[str]:
+    """Split ``text`` into sentences and lines; fenced code blocks stay whole.
+
+    Each piece keeps its trailing whitespace, so concatenating any subset in
+    order yields well-formed text and concatenating all of them yields ``text``.
+    """
+
+    pieces: list[str] = []
+    for segment in _segments(text):
+        if _FENCE.match(segment):
+            pieces.append(segment)
+            continue
+        pieces.extend(match.group() for match in _SENTENCE.finditer(segment))
+    return [piece for piece in pieces if piece]
+
+
+def count_tokens(text: str) -> int:
+    """Count tokens in ``text`` with the chunking tokenizer (or whitespace words)."""
+
+    encoding = _resolve_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text.split())
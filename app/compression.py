@@ -2,17 +2,35 @@
 
 from __future__ import annotations
 
+import asyncio
+import importlib.util
+import json
+import logging
+import queue
+import time
+from collections.abc import AsyncIterator
+from contextlib import AbstractAsyncContextManager, nullcontext
 from string import Formatter, Template
+from typing import Any
 
 import httpx
 
+from .admission import ConcurrencyLimiter
+from .chunking import chunk_text, count_tokens
 from .config import settings
+from .lazy import UNRESOLVED, resolve
+from .metrics import TOKENS, timed
 from .prompts import LOSSLESSISH_PROMPT, TASK_PROMPT
+from .routing import Endpoint, EndpointRouter, parse_endpoints
+from .singleflight import AsyncSingleFlight
 
-try:
-    from transformers import AutoModelForSeq2SeqLM, AutoTokenizer, pipeline
-except Exception:  # pragma: no cover - transformers is optional
-    AutoTokenizer = AutoModelForSeq2SeqLM = pipeline = None  # type: ignore
+# transformers is optional and slow to import; resolved by the HF backend only.
+pipeline: Any = UNRESOLVED
+TextIteratorStreamer: Any = UNRESOLVED
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SEPARATOR = "\n\n---\n\n"
 
 
 class Compressor:
@@ -23,18 +41,43 @@ class Compressor:
     def __init__(self) -> None:
         self.backend = settings.compressor_backend
         self.client: httpx.Client | None = None
+        self.router: EndpointRouter | None = None
         self.pipe = None
+        self.inflight = AsyncSingleFlight()
+        self.limiter: ConcurrencyLimiter | None = None
+        if settings.backend_max_concurrency > 0:
+            self.limiter = ConcurrencyLimiter(
+                settings.backend_max_concurrency,
+                settings.backend_max_queue,
+                settings.backend_queue_timeout,
+                adaptive=settings.backend_adaptive_concurrency,
+                min_limit=settings.backend_min_concurrency,
+            )
 
         if self.backend == "OPENAI":
+            endpoints = parse_endpoints(
+                settings.openai_base_urls or settings.openai_base_url
+            )
+            self.router = EndpointRouter(
+                endpoints,
+                self._async_http,
+                retries=settings.backend_retries,
+                max_failures=settings.backend_eject_failures,
+                eject_seconds=settings.backend_eject_seconds,
+                health_check_interval=settings.backend_health_check_interval,
+                health_check_path=settings.backend_health_check_path,
+            )
+            # The blocking client only serves warm-up and scripts: first replica.
             self.client = httpx.Client(
-                base_url=settings.openai_base_url,
-                timeout=120.0,
+                base_url=endpoints[0][0],
+                timeout=settings.openai_timeout,
                 headers={"Authorization": f"Bearer {settings.openai_api_key}"},
             )
         elif self.backend == "HF":
-            if pipeline is None:
+            make_pipeline = resolve(globals(), "pipeline", "transformers", "pipeline")
+            if make_pipeline is None:
                 raise RuntimeError("transformers is required for HF backend")
-            self.pipe = pipeline(
+            self.pipe = make_pipeline(
                 "text2text-generation",
                 model=settings.hf_model,
                 device_map=settings.hf_device,
@@ -72,39 +115,325 @@ class Compressor:
         if mode == "task" and task:
             template = TASK_PROMPT
             substitutions["task"] = task
-        return self._fill_prompt(template, **substitutions)
+        with timed("prompt"):
+            return self._fill_prompt(template, **substitutions)
+
+    def _openai_body(self, prompt: str, budget: int) -> dict[str, object]:
+        max_tokens = self._clamp_budget(budget, settings.openai_max_tokens)
+        return {
+            "model": settings.openai_model,
+            "temperature": settings.openai_temperature,
+            "top_p": settings.openai_top_p,
+            "max_tokens": max_tokens,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": "You are a deterministic context compressor.",
+                },
+                {"role": "user", "content": prompt},
+            ],
+        }
+
+    @staticmethod
+    def _completion_text(data: dict) -> str:
+        return data["choices"][0]["message"]["content"].strip()
+
+    @staticmethod
+    def _record_tokens(prompt: str, completion: str, usage: dict | None = None) -> None:
+        """Count backend tokens, estimating them when no usage is reported."""
+
+        usage = usage or {}
+        prompt_tokens = usage.get("prompt_tokens")
+        completion_tokens = usage.get("completion_tokens")
+        if prompt_tokens is None:
+            prompt_tokens = count_tokens(prompt)
+        if completion_tokens is None:
+            completion_tokens = count_tokens(completion)
+        TOKENS.inc(prompt_tokens, kind="prompt")
+        TOKENS.inc(completion_tokens, kind="completion")
+
+    def _generate_hf(self, prompt: str, budget: int) -> str:
+        assert self.pipe is not None
+        max_new_tokens = self._clamp_budget(budget, settings.hf_max_new_tokens)
+        output: list[dict] = self.pipe(
+            prompt, max_new_tokens=max_new_tokens, do_sample=False
+        )
+        return output[0]["generated_text"].strip()
+
+    @staticmethod
+    def _async_http(base_url: str) -> httpx.AsyncClient:
+        """Build the pooled async client of one backend endpoint."""
+
+        http2 = settings.openai_http2
+        if http2 and importlib.util.find_spec("h2") is None:
+            logger.warning("OPENAI_HTTP2 requested but h2 is not installed")
+            http2 = False
+        return httpx.AsyncClient(
+            base_url=base_url,
+            timeout=settings.openai_timeout,
+            headers={"Authorization": f"Bearer {settings.openai_api_key}"},
+            limits=httpx.Limits(
+                max_connections=settings.openai_max_connections,
+                max_keepalive_connections=settings.openai_max_keepalive_connections,
+                keepalive_expiry=settings.openai_keepalive_expiry,
+            ),
+            http2=http2,
+        )
 
     def compress(self, content: str, task: str | None, budget: int, mode: str) -> str:
         prompt = self._prompt(content, task, budget, mode)
         if self.backend == "OPENAI":
             assert self.client is not None
-            max_tokens = self._clamp_budget(budget, settings.openai_max_tokens)
-            body = {
-                "model": settings.openai_model,
-                "temperature": settings.openai_temperature,
-                "top_p": settings.openai_top_p,
-                "max_tokens": max_tokens,
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "You are a deterministic context compressor.",
-                    },
-                    {"role": "user", "content": prompt},
-                ],
-            }
+            body = self._openai_body(prompt, budget)
             response = self.client.post("/chat/completions", json=body)
             response.raise_for_status()
-            data = response.json()
-            return data["choices"][0]["message"]["content"].strip()
+            return self._completion_text(response.json())
+
+        return self._generate_hf(prompt, budget)
+
+    async def acompress(
+        self, content: str, task: str | None, budget: int, mode: str
+    ) -> str:
+        """Async variant of :meth:`compress` that never blocks the event loop.
+
+        Concurrent calls with an identical prompt and budget share one backend
+        request.
+        """
+
+        prompt = self._prompt(content, task, budget, mode)
+        if self.backend == "OPENAI":
+            body = self._openai_body(prompt, budget)
+            key = json.dumps(body, sort_keys=True)
+            return await self.inflight.do(key, lambda: self._post_openai(body))
+
+        return await self.inflight.do(
+            (prompt, budget), lambda: self._agenerate_hf(prompt, budget)
+        )
+
+    def _slot(self) -> AbstractAsyncContextManager[object]:
+        """Hold a backend slot, or raise ``Overloaded`` when none is available."""
+
+        return self.limiter.slot() if self.limiter is not None else nullcontext()
 
+    async def _post_openai(self, body: dict[str, object]) -> str:
+        assert self.router is not None
+        async with self._slot():
+            # Completions have no side effects, so a failed call is retried on
+            # another replica.
+            response = await self.router.request("POST", "/chat/completions", json=body)
+        data = response.json()
+        text = self._completion_text(data)
+        prompt = body["messages"][-1]["content"]  # type: ignore[index]
+        self._record_tokens(prompt, text, data.get("usage"))
+        return text
+
+    async def _agenerate_hf(self, prompt: str, budget: int) -> str:
+        async with self._slot():
+            text = await asyncio.to_thread(self._generate_hf, prompt, budget)
+        self._record_tokens(prompt, text)
+        return text
+
+    def _batch_token_limit(self, task: str | None, budget: int, mode: str) -> int:
+        """Content tokens that fit in one backend call next to prompt and output."""
+
+        maximum = (
+            settings.openai_max_tokens
+            if self.backend == "OPENAI"
+            else settings.hf_max_new_tokens
+        )
+        overhead = count_tokens(self._prompt("", task, budget, mode))
+        output = self._clamp_budget(budget, maximum)
+        return max(settings.compressor_context_tokens - overhead - output, 1)
+
+    @staticmethod
+    def _pack_batches(
+        items: list[str], token_counts: list[int], limit: int
+    ) -> list[list[str]]:
+        """Greedily group consecutive ``items`` into batches of at most ``limit``."""
+
+        separator_tokens = count_tokens(CHUNK_SEPARATOR)
+        batches: list[list[str]] = []
+        current: list[str] = []
+        used = 0
+        for item, tokens in zip(items, token_counts, strict=True):
+            cost = tokens + (separator_tokens if current else 0)
+            if current and used + cost > limit:
+                batches.append(current)
+                current, used, cost = [], 0, tokens
+            current.append(item)
+            used += cost
+        if current:
+            batches.append(current)
+        return batches
+
+    @staticmethod
+    def _split_oversized(
+        items: list[str], token_counts: list[int], limit: int
+    ) -> tuple[list[str], list[int]]:
+        """Window any item over ``limit`` tokens so each fits one backend call."""
+
+        pieces: list[str] = []
+        counts: list[int] = []
+        for item, tokens in zip(items, token_counts, strict=True):
+            if tokens <= limit:
+                pieces.append(item)
+                counts.append(tokens)
+                continue
+            for piece in chunk_text(item, limit, 0):
+                pieces.append(piece)
+                counts.append(count_tokens(piece))
+        return pieces, counts
+
+    async def acompress_hierarchical(
+        self, texts: list[str], task: str | None, budget: int, mode: str
+    ) -> tuple[str, dict[str, Any]]:
+        """Map-reduce ``texts`` that do not fit a single backend call.
+
+        Each level packs its inputs into backend-sized batches and compresses
+        them concurrently; the partial summaries become the next level's inputs
+        until everything fits one final call made with the full ``budget``.
+        Returns the compressed text and a report of tree depth and level timings.
+        """
+
+        limit = self._batch_token_limit(task, budget, mode)
+        # Two partial summaries must fit one call, or a level cannot merge them.
+        separator_tokens = count_tokens(CHUNK_SEPARATOR)
+        partial_budget = max(1, min(budget, (limit - separator_tokens) // 2))
+        levels: list[dict[str, Any]] = []
+        items = list(texts)
+        while True:
+            started = time.perf_counter()
+            token_counts = await asyncio.to_thread(
+                lambda batch=items: [count_tokens(item) for item in batch]
+            )
+            items, token_counts = await asyncio.to_thread(
+                self._split_oversized, items, token_counts, limit
+            )
+            batches = self._pack_batches(items, token_counts, limit)
+            stuck = len(batches) == len(items) > 1
+            if stuck and levels and levels[-1]["batches"] == levels[-1]["inputs"]:
+                # Summaries made with partial_budget always pair up unless the
+                # backend overran its max_tokens.
+                raise RuntimeError(
+                    "Hierarchical compression is not converging: partial "
+                    "summaries exceed their token budget"
+                )
+            if len(batches) <= 1:
+                result = await self.acompress(
+                    CHUNK_SEPARATOR.join(items), task, budget, mode
+                )
+            else:
+                summaries = await asyncio.gather(*[
+                    self.acompress(
+                        CHUNK_SEPARATOR.join(batch), task, partial_budget, mode
+                    )
+                    for batch in batches
+                ])
+            levels.append({
+                "level": len(levels),
+                "inputs": len(items),
+                "input_tokens": sum(token_counts),
+                "batches": max(len(batches), 1),
+                "seconds": round(time.perf_counter() - started, 6),
+            })
+            if len(batches) <= 1:
+                return result, {"depth": len(levels), "levels": levels}
+            items = list(summaries)
+
+    async def astream(
+        self, content: str, task: str | None, budget: int, mode: str
+    ) -> AsyncIterator[str]:
+        """Yield compressed output incrementally as the backend generates it."""
+
+        prompt = self._prompt(content, task, budget, mode)
+        if self.backend == "OPENAI":
+            pieces = self._stream_openai(prompt, budget)
+        else:
+            pieces = self._stream_hf(prompt, budget)
+
+        leading = True
+        streamed: list[str] = []
+        async with self._slot():
+            async for piece in pieces:
+                if leading:
+                    piece = piece.lstrip()
+                    leading = not piece
+                if piece:
+                    streamed.append(piece)
+                    yield piece
+        self._record_tokens(prompt, "".join(streamed))
+
+    async def _stream_openai(self, prompt: str, budget: int) -> AsyncIterator[str]:
+        assert self.router is not None
+        body = {**self._openai_body(prompt, budget), "stream": True}
+        tried: list[Endpoint] = []
+        while True:
+            streaming = False
+            try:
+                async with (
+                    self.router.use(tried) as client,
+                    client.stream("POST", "/chat/completions", json=body) as response,
+                ):
+                    response.raise_for_status()
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:") :].strip()
+                        if data == "[DONE]":
+                            break
+                        choices = json.loads(data).get("choices") or [{}]
+                        delta = choices[0].get("delta", {}).get("content")
+                        if delta:
+                            streaming = True
+                            yield delta
+                return
+            except Exception as exc:
+                # Output already sent to the client cannot be taken back.
+                if streaming or not self.router.should_retry(exc, tried):
+                    raise
+                logger.warning("retrying stream on another endpoint after %r", exc)
+
+    async def _stream_hf(self, prompt: str, budget: int) -> AsyncIterator[str]:
         assert self.pipe is not None
+        streamer_class = resolve(
+            globals(), "TextIteratorStreamer", "transformers", "TextIteratorStreamer"
+        )
+        if streamer_class is None:  # pragma: no cover - transformers wiring
+            yield await asyncio.to_thread(self._generate_hf, prompt, budget)
+            return
+
+        streamer = streamer_class(
+            self.pipe.tokenizer,
+            skip_special_tokens=True,
+            timeout=settings.openai_timeout,
+        )
         max_new_tokens = self._clamp_budget(budget, settings.hf_max_new_tokens)
-        output: list[dict] = self.pipe(
-            prompt, max_new_tokens=max_new_tokens, do_sample=False
+        generation = asyncio.ensure_future(
+            asyncio.to_thread(
+                self.pipe,
+                prompt,
+                max_new_tokens=max_new_tokens,
+                do_sample=False,
+                streamer=streamer,
+            )
         )
-        return output[0]["generated_text"].strip()
+        pieces = iter(streamer)
+        try:
+            while True:
+                piece = await asyncio.to_thread(next, pieces, None)
+                if piece is None:
+                    break
+                yield piece
+        except queue.Empty:
+            pass
+        await generation
 
     def close(self) -> None:
         if self.client is not None:
             self.client.close()
             self.client = None
+
+    async def aclose(self) -> None:
+        if self.router is not None:
+            await self.router.aclose()
+        self.close()
@@ -8,18 +8,105 @@ from pydantic import BaseModel, Field
 class Settings(BaseModel):
     embedding_model: str = Field(default=os.getenv("EMBEDDING_MODEL", "BAAI/bge-m3"))
     mmr_lambda: float = float(os.getenv("MMR_LAMBDA", "0.5"))
+    # Run MMR over only the top-M most relevant chunks (0 disables the pre-filter)
+    selection_candidate_pool: int = int(os.getenv("SELECTION_CANDIDATE_POOL", "0"))
+    # Fill this many tokens of selected content instead of keep_ratio (0 disables)
+    selection_budget_tokens: int = int(os.getenv("SELECTION_BUDGET_TOKENS", "0"))
+    # Second pass: keep this fraction of selected tokens by sentence MMR (0 disables)
+    sentence_keep_ratio: float = float(os.getenv("SENTENCE_KEEP_RATIO", "0"))
     chunk_target_tokens: int = int(os.getenv("CHUNK_TARGET_TOKENS", "900"))
     chunk_overlap_tokens: int = int(os.getenv("CHUNK_OVERLAP_TOKENS", "120"))
+    chunking_strategy: str = os.getenv("CHUNKING_STRATEGY", "window").lower()
+
+    # Embedding cache (0 bytes disables the in-process tier)
+    embedding_cache_bytes: int = int(os.getenv("EMBEDDING_CACHE_BYTES", "67108864"))
+    embedding_cache_dir: str | None = os.getenv("EMBEDDING_CACHE_DIR") or None
+
+    # Compact embedding storage for cached vectors and corpora
+    # (float32, float16 or int8) and Matryoshka-style truncation (0 keeps all dims)
+    embedding_storage_dtype: str = os.getenv(
+        "EMBEDDING_STORAGE_DTYPE", "float32"
+    ).lower()
+    embedding_dim: int = int(os.getenv("EMBEDDING_DIM", "0"))
+
+    # Embedding backend: auto, onnx, sentence-transformers or fallback
+    embedding_backend: str = os.getenv("EMBEDDING_BACKEND", "auto").lower()
+    embedding_onnx_path: str | None = os.getenv("EMBEDDING_ONNX_PATH") or None
+    # ONNX Runtime intra-op threads (0 lets the runtime decide)
+    embedding_onnx_threads: int = int(os.getenv("EMBEDDING_ONNX_THREADS", "0"))
+    embedding_onnx_pooling: str = os.getenv("EMBEDDING_ONNX_POOLING", "cls").lower()
+    embedding_max_length: int = int(os.getenv("EMBEDDING_MAX_LENGTH", "512"))
+    # Padded tokens per embedding call; texts are length-sorted first (0 disables)
+    embedding_max_batch_tokens: int = int(os.getenv("EMBEDDING_MAX_BATCH_TOKENS", "0"))
+
+    # Embedding worker processes, each loading the model once (0 embeds in-process)
+    embedding_workers: int = int(os.getenv("EMBEDDING_WORKERS", "0"))
+    # "spawn" or "fork"; with "fork" the parent preloads the model to share weights
+    embedding_worker_start_method: str = os.getenv(
+        "EMBEDDING_WORKER_START_METHOD", "spawn"
+    ).lower()
+
+    # Cross-request embedding micro-batching (0 ms disables it)
+    embed_batch_wait_ms: float = float(os.getenv("EMBED_BATCH_WAIT_MS", "0"))
+    embed_batch_max_size: int = int(os.getenv("EMBED_BATCH_MAX_SIZE", "256"))
+
+    # Registered corpora (chunks + memory-mapped embeddings)
+    corpus_dir: str = os.getenv("CORPUS_DIR", "corpora")
+
+    # Full-response cache (a TTL of 0 seconds disables it)
+    response_cache_ttl: float = float(os.getenv("RESPONSE_CACHE_TTL", "0"))
+    response_cache_bytes: int = int(os.getenv("RESPONSE_CACHE_BYTES", "33554432"))
+    response_cache_sqlite: str | None = os.getenv("RESPONSE_CACHE_SQLITE") or None
+
+    # "background" answers /healthz at once and loads models in a thread
+    # (/readyz reports progress); "eager" loads them before serving
+    model_loading: str = os.getenv("MODEL_LOADING", "background").lower()
+    # Run a dummy selection (and HF generation) before reporting ready
+    startup_warmup: bool = os.getenv("STARTUP_WARMUP", "false").lower() in {"1", "true"}
+
+    # Bounded executor for CPU-bound stages (chunking, embedding, MMR)
+    cpu_workers: int = int(os.getenv("CPU_WORKERS", "4"))
 
     compressor_backend: str = os.getenv("COMPRESSOR_BACKEND", "OPENAI").upper()
+    # Prompt + output tokens a single backend call may use (hierarchical mode)
+    compressor_context_tokens: int = int(os.getenv("COMPRESSOR_CONTEXT_TOKENS", "8192"))
+
+    # Backend admission control (0 concurrent calls disables it)
+    backend_max_concurrency: int = int(os.getenv("BACKEND_MAX_CONCURRENCY", "0"))
+    backend_max_queue: int = int(os.getenv("BACKEND_MAX_QUEUE", "100"))
+    backend_queue_timeout: float = float(os.getenv("BACKEND_QUEUE_TIMEOUT", "10"))
+    # Tune the limit between BACKEND_MIN_CONCURRENCY and the maximum from latency
+    backend_adaptive_concurrency: bool = os.getenv(
+        "BACKEND_ADAPTIVE_CONCURRENCY", "false"
+    ).lower() in {"1", "true"}
+    backend_min_concurrency: int = int(os.getenv("BACKEND_MIN_CONCURRENCY", "1"))
+
+    # Routing across backend replicas (0 failures disables passive ejection,
+    # a 0 second interval disables active health checks)
+    backend_retries: int = int(os.getenv("BACKEND_RETRIES", "1"))
+    backend_eject_failures: int = int(os.getenv("BACKEND_EJECT_FAILURES", "3"))
+    backend_eject_seconds: float = float(os.getenv("BACKEND_EJECT_SECONDS", "30"))
+    backend_health_check_interval: float = float(
+        os.getenv("BACKEND_HEALTH_CHECK_INTERVAL", "0")
+    )
+    backend_health_check_path: str = os.getenv("BACKEND_HEALTH_CHECK_PATH", "/models")
 
     # OpenAI-compatible backend
     openai_base_url: str = os.getenv("OPENAI_BASE_URL", "http://localhost:8001/v1")
+    # Comma-separated "URL [WEIGHT]" replicas; overrides OPENAI_BASE_URL when set
+    openai_base_urls: str = os.getenv("OPENAI_BASE_URLS", "")
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "local")
     openai_model: str = os.getenv("OPENAI_MODEL", "llama-3.1-8b-instruct")
     openai_temperature: float = float(os.getenv("OPENAI_TEMPERATURE", "0"))
     openai_top_p: float = float(os.getenv("OPENAI_TOP_P", "0.9"))
     openai_max_tokens: int = int(os.getenv("OPENAI_MAX_TOKENS", "800"))
+    openai_timeout: float = float(os.getenv("OPENAI_TIMEOUT", "120"))
+    openai_max_connections: int = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+    openai_max_keepalive_connections: int = int(
+        os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "20")
+    )
+    openai_keepalive_expiry: float = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "30"))
+    openai_http2: bool = os.getenv("OPENAI_HTTP2", "false").lower() in {"1", "true"}
 
     # HuggingFace backend
     hf_model: str = os.getenv("HF_MODEL", "google/flan-t5-large")
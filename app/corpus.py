@@ -0,0 +1,436 @@
+"""Persistent corpora: chunks plus a memory-mapped embedding matrix on disk."""
+
+from __future__ import annotations
+
+import contextlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from .chunking import Span, count_tokens, rechunk_tail
+from .quantization import QuantizedMatrix, quantize_rows
+
+__all__ = ["CorpusNotFound", "CorpusStore"]
+
+
+_EMBEDDING_FILES = {
+    "float32": "embeddings.f32",
+    "float16": "embeddings.f16",
+    "int8": "embeddings.i8",
+}
+_SCALES_FILE = "scales.f32"
+
+
+class CorpusNotFound(KeyError):
+    """Raised when a corpus id is unknown to the store."""
+
+
+class CorpusStore:
+    """Register chunked, embedded document sets once and reuse them per request.
+
+    Each corpus lives in ``<directory>/<corpus_id>/`` as ``meta.json``,
+    ``chunks.json`` and a raw ``embeddings.f32`` matrix that is opened with
+    ``np.memmap`` so only the pages touched by selection become resident.
+    With ``dtype`` ``"float16"`` or ``"int8"`` new corpora store unit-length
+    rows in ``embeddings.f16`` / ``embeddings.i8`` (plus per-row ``scales.f32``
+    for int8) and load as a ``QuantizedMatrix``. Corpora built from a document
+    also keep ``document.txt`` and the chunk character ranges in
+    ``spans.json`` so edits can be re-chunked incrementally.
+
+    Updates never modify these files: they write a new generation
+    (``chunks.1.json``, ``embeddings.1.f32``, ...) and switch to it by
+    replacing ``meta.json``, so readers and crashes see either revision whole.
+    """
+
+    def __init__(
+        self, directory: str | os.PathLike[str], dtype: str = "float32"
+    ) -> None:
+        if dtype not in _EMBEDDING_FILES:
+            raise ValueError(f"Unsupported embedding dtype: {dtype}")
+        self.directory = Path(directory)
+        self.dtype = dtype
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._loaded: dict[str, tuple[list[str], np.memmap | QuantizedMatrix]] = {}
+        self._token_counts: dict[str, list[int]] = {}
+
+    def _path(self, corpus_id: str) -> Path:
+        if not corpus_id.isalnum():
+            raise CorpusNotFound(corpus_id)
+        return self.directory / corpus_id
+
+    def _read_meta(self, corpus_id: str) -> dict[str, Any]:
+        path = self._path(corpus_id) / "meta.json"
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            raise CorpusNotFound(corpus_id) from None
+
+    @staticmethod
+    def _file(meta: dict[str, Any], name: str) -> str:
+        """Name of corpus file ``name`` in the generation ``meta`` points at."""
+        generation = meta.get("generation", 0)
+        if not generation:
+            return name
+        stem, _, suffix = name.partition(".")
+        return f"{stem}.{generation}.{suffix}"
+
+    @classmethod
+    def _files(cls, meta: dict[str, Any]) -> list[str]:
+        dtype = meta.get("dtype", "float32")
+        names = ["chunks.json", "tokens.json", "document.txt", "spans.json"]
+        names.append(_EMBEDDING_FILES[dtype])
+        if dtype == "int8":
+            names.append(_SCALES_FILE)
+        return [cls._file(meta, name) for name in names]
+
+    @classmethod
+    def _open_matrix(
+        cls, path: Path, meta: dict[str, Any]
+    ) -> np.memmap | QuantizedMatrix:
+        dtype = meta.get("dtype", "float32")
+        shape = (meta["chunk_count"], meta["dim"])
+        data = np.memmap(
+            path / cls._file(meta, _EMBEDDING_FILES[dtype]),
+            dtype=dtype,
+            mode="r",
+            shape=shape,
+        )
+        if dtype == "float32":
+            return data
+        scales = None
+        if dtype == "int8":
+            scales = np.memmap(
+                path / cls._file(meta, _SCALES_FILE),
+                dtype=np.float32,
+                mode="r",
+                shape=(shape[0],),
+            )
+        return QuantizedMatrix(data, scales)
+
+    @classmethod
+    def _write_rows(
+        cls,
+        path: Path,
+        meta: dict[str, Any],
+        matrix: np.ndarray,
+        base: dict[str, Any] | None = None,
+        keep: int = 0,
+    ) -> None:
+        """Write the embedding files of ``meta``'s generation.
+
+        The first ``keep`` rows are copied from generation ``base``, followed
+        by ``matrix``.
+        """
+        dtype = meta.get("dtype", "float32")
+        data, scales = quantize_rows(matrix, dtype)
+        files = [(_EMBEDDING_FILES[dtype], data)]
+        if scales is not None:
+            files.append((_SCALES_FILE, scales))
+        for name, rows in files:
+            target = path / cls._file(meta, name)
+            row_bytes = rows.itemsize * (rows.shape[1] if rows.ndim == 2 else 1)
+            if base is not None:
+                shutil.copyfile(path / cls._file(base, name), target)
+                os.truncate(target, keep * row_bytes)
+            with open(target, "ab" if base is not None else "wb") as handle:
+                handle.write(rows.tobytes())
+
+    @staticmethod
+    def _embedding_bytes(meta: dict[str, Any]) -> int:
+        dtype = meta.get("dtype", "float32")
+        row = meta["dim"] * np.dtype(dtype).itemsize + (4 if dtype == "int8" else 0)
+        return meta["chunk_count"] * row
+
+    @classmethod
+    def _read_text(cls, path: Path, meta: dict[str, Any], name: str) -> str:
+        return (path / cls._file(meta, name)).read_text(encoding="utf-8")
+
+    @staticmethod
+    def _write_text(path: Path, text: str) -> None:
+        partial = path.with_name(path.name + ".tmp")
+        partial.write_text(text, encoding="utf-8")
+        os.replace(partial, path)
+
+    def create(
+        self,
+        texts: list[str],
+        embeddings: np.ndarray,
+        model_name: str,
+        chunking_strategy: str | None = None,
+        document: str | None = None,
+        spans: list[Span] | None = None,
+        backend: str | None = None,
+        token_counts: list[int] | None = None,
+    ) -> dict[str, Any]:
+        """Store a new corpus; ``backend`` names what produced ``embeddings``.
+
+        ``token_counts`` (e.g. from chunking) are counted here when omitted.
+        """
+        if len(texts) != embeddings.shape[0]:
+            raise ValueError("texts and embeddings must have the same length")
+
+        corpus_id = uuid.uuid4().hex
+        path = self._path(corpus_id)
+        path.mkdir(parents=True)
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        meta = {
+            "corpus_id": corpus_id,
+            "model": model_name,
+            "backend": backend,
+            "chunking_strategy": chunking_strategy,
+            "chunk_count": len(texts),
+            "dim": int(matrix.shape[1]) if matrix.ndim == 2 else 0,
+            "dtype": self.dtype,
+            "created_at": time.time(),
+            "revision": 0,
+        }
+        self._write_rows(path, meta, matrix)
+        (path / "chunks.json").write_text(json.dumps(texts), encoding="utf-8")
+        if token_counts is None:
+            token_counts = [count_tokens(text) for text in texts]
+        (path / "tokens.json").write_text(json.dumps(token_counts), encoding="utf-8")
+        if document is not None and spans is not None:
+            (path / "document.txt").write_text(document, encoding="utf-8")
+            (path / "spans.json").write_text(
+                json.dumps([[start, end] for start, end, _ in spans]), encoding="utf-8"
+            )
+        (path / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        return self.info(corpus_id)
+
+    def update_document(
+        self,
+        corpus_id: str,
+        embed: Callable[[list[str]], np.ndarray],
+        target_tokens: int,
+        overlap_tokens: int,
+        *,
+        document: str | None = None,
+        append: str | None = None,
+    ) -> dict[str, Any]:
+        """Replace (or ``append`` to) a corpus document, re-chunking only the tail.
+
+        Chunks before the first edited window are kept as-is; the rest are
+        re-chunked and only those whose text is new are passed to ``embed``.
+        """
+        with self._write_lock:
+            meta = self._read_meta(corpus_id)
+            path = self._path(corpus_id)
+            try:
+                old_document = self._read_text(path, meta, "document.txt")
+                ranges = json.loads(self._read_text(path, meta, "spans.json"))
+            except FileNotFoundError:
+                raise ValueError("corpus was not created from a document") from None
+            texts = json.loads(self._read_text(path, meta, "chunks.json"))
+            if document is None:
+                document = old_document + (append or "")
+
+            old_spans = [
+                (start, end, text)
+                for (start, end), text in zip(ranges, texts, strict=True)
+            ]
+            keep, tail = rechunk_tail(
+                old_document,
+                old_spans,
+                document,
+                target_tokens,
+                overlap_tokens,
+                meta["chunking_strategy"] or "window",
+            )
+            ranges = [[start, end] for start, end, _ in old_spans[:keep] + tail]
+            return self._replace_tail(
+                corpus_id,
+                meta,
+                texts,
+                keep,
+                [text for _, _, text in tail],
+                embed,
+                {"document.txt": document, "spans.json": json.dumps(ranges)},
+            )
+
+    def extend(
+        self,
+        corpus_id: str,
+        texts: list[str],
+        embed: Callable[[list[str]], np.ndarray],
+    ) -> dict[str, Any]:
+        """Append pre-chunked ``texts`` to a corpus, embedding only new content."""
+        with self._write_lock:
+            meta = self._read_meta(corpus_id)
+            path = self._path(corpus_id)
+            if (path / self._file(meta, "document.txt")).exists():
+                raise ValueError("document corpora are updated by document")
+            current = json.loads(self._read_text(path, meta, "chunks.json"))
+            return self._replace_tail(
+                corpus_id, meta, current, len(current), texts, embed
+            )
+
+    def _replace_tail(
+        self,
+        corpus_id: str,
+        meta: dict[str, Any],
+        texts: list[str],
+        keep: int,
+        tail: list[str],
+        embed: Callable[[list[str]], np.ndarray],
+        files: dict[str, str] | None = None,
+    ) -> dict[str, Any]:
+        """Rewrite rows ``keep:`` of the corpus, reusing dropped rows by content.
+
+        The result is written as the next generation and committed by the
+        ``meta.json`` replace; a failing ``embed`` or a crash before then
+        leaves the corpus unchanged. The old generation's files are removed
+        afterwards (open mappings of them stay readable).
+        """
+        path = self._path(corpus_id)
+        dim = meta["dim"]
+        matrix = self._open_matrix(path, meta)
+        reusable = {text: keep + row for row, text in enumerate(texts[keep:])}
+        rows = np.empty((len(tail), dim), dtype=np.float32)
+        missing: list[int] = []
+        for position, text in enumerate(tail):
+            row = reusable.get(text)
+            if row is None:
+                missing.append(position)
+            else:
+                rows[position] = matrix[row]
+        del matrix
+        if missing:
+            computed = np.asarray(embed([tail[i] for i in missing]), dtype=np.float32)
+            if computed.shape[1:] != (dim,):
+                raise ValueError(
+                    f"embedding dimension {computed.shape[1:]} does not match {dim}"
+                )
+            rows[missing] = computed
+
+        new_meta = {
+            **meta,
+            "chunk_count": keep + len(tail),
+            "revision": meta.get("revision", 0) + 1,
+            "generation": meta.get("generation", 0) + 1,
+        }
+        self._write_rows(path, new_meta, rows, base=meta, keep=keep)
+        counts = self.token_counts(corpus_id)[:keep]
+        counts.extend(count_tokens(text) for text in tail)
+        files = {
+            "chunks.json": json.dumps(texts[:keep] + tail),
+            "tokens.json": json.dumps(counts),
+            **(files or {}),
+        }
+        for name, content in files.items():
+            self._write_text(path / self._file(new_meta, name), content)
+        self._write_text(path / "meta.json", json.dumps(new_meta))
+        with self._lock:
+            self._loaded.pop(corpus_id, None)
+            self._token_counts.pop(corpus_id, None)
+            # Under the lock, so a load never reads the old meta and then
+            # finds its files gone.
+            for name in self._files(meta):
+                (path / name).unlink(missing_ok=True)
+        return {
+            **self.info(corpus_id),
+            "kept_chunks": keep,
+            "reused_chunks": len(tail) - len(missing),
+            "embedded_chunks": len(missing),
+        }
+
+    def revision(self, corpus_id: str) -> int:
+        """Return a counter that changes whenever the corpus content changes."""
+        return self._read_meta(corpus_id).get("revision", 0)
+
+    def load(self, corpus_id: str) -> tuple[list[str], np.memmap | QuantizedMatrix]:
+        """Return the corpus chunks and its memory-mapped embedding matrix."""
+        with self._lock:
+            loaded = self._loaded.get(corpus_id)
+            if loaded is not None:
+                return loaded
+            meta = self._read_meta(corpus_id)
+            path = self._path(corpus_id)
+            texts = json.loads(self._read_text(path, meta, "chunks.json"))
+            matrix = self._open_matrix(path, meta)
+            self._loaded[corpus_id] = (texts, matrix)
+            return texts, matrix
+
+    def embedding_model(self, corpus_id: str) -> tuple[str, int, str | None]:
+        """Return the model, dimension and backend the corpus was embedded with.
+
+        The backend is ``None`` for corpora created before it was recorded.
+        """
+        meta = self._read_meta(corpus_id)
+        return meta["model"], meta["dim"], meta.get("backend")
+
+    def token_counts(self, corpus_id: str) -> list[int]:
+        """Return the token count of every chunk, computed once per chunk."""
+        with self._lock:
+            counts = self._token_counts.get(corpus_id)
+        if counts is not None:
+            return list(counts)
+        meta = self._read_meta(corpus_id)
+        path = self._path(corpus_id) / self._file(meta, "tokens.json")
+        try:
+            counts = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:  # corpora created before counts were stored
+            texts = self.load(corpus_id)[0]
+            counts = [count_tokens(text) for text in texts]
+            self._write_text(path, json.dumps(counts))
+        with self._lock:
+            self._token_counts[corpus_id] = counts
+        return list(counts)
+
+    def info(self, corpus_id: str) -> dict[str, Any]:
+        meta = self._read_meta(corpus_id)
+        path = self._path(corpus_id)
+        embedding_bytes = self._embedding_bytes(meta)
+        text_bytes = 0
+        for name in ("chunks.json", "tokens.json", "document.txt", "spans.json"):
+            with contextlib.suppress(FileNotFoundError):
+                text_bytes += (path / self._file(meta, name)).stat().st_size
+        with self._lock:
+            loaded = corpus_id in self._loaded
+        return {
+            "revision": 0,
+            "dtype": "float32",
+            **meta,
+            "embedding_bytes": embedding_bytes,
+            "text_bytes": text_bytes,
+            "total_bytes": embedding_bytes + text_bytes,
+            "loaded": loaded,
+        }
+
+    def list(self) -> list[dict[str, Any]]:
+        if not self.directory.exists():
+            return []
+        infos = []
+        for entry in sorted(self.directory.iterdir()):
+            try:
+                infos.append(self.info(entry.name))
+            except CorpusNotFound:
+                continue
+        return infos
+
+    def delete(self, corpus_id: str) -> None:
+        path = self._path(corpus_id)
+        if not (path / "meta.json").exists():
+            raise CorpusNotFound(corpus_id)
+        with self._lock:
+            self._loaded.pop(corpus_id, None)
+            self._token_counts.pop(corpus_id, None)
+        shutil.rmtree(path)
+
+    def stats(self) -> dict[str, int]:
+        infos = self.list()
+        return {
+            "corpora": len(infos),
+            "loaded": sum(1 for info in infos if info["loaded"]),
+            "chunks": sum(info["chunk_count"] for info in infos),
+            "embedding_bytes": sum(info["embedding_bytes"] for info in infos),
+            "text_bytes": sum(info["text_bytes"] for info in infos),
+        }
@@ -0,0 +1,319 @@
+"""Content-addressed cache for embedding vectors."""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Sequence
+from pathlib import Path
+
+import numpy as np
+
+from .quantization import quantize_rows
+
+__all__ = ["DiskEmbeddingStore", "EmbeddingCache", "cache_key"]
+
+
+def cache_key(model_name: str, text: str) -> str:
+    """Return a stable digest identifying ``text`` embedded by ``model_name``."""
+    digest = hashlib.sha256()
+    digest.update(model_name.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(text.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class DiskEmbeddingStore:
+    """Append-only float32 matrix on disk with a line-oriented key index.
+
+    Vectors live in ``vectors.f32`` and are read through ``np.memmap``; the
+    ``index.txt`` file starts with a ``dim <n>`` header followed by one
+    ``<key> <row>`` line per stored vector. Rows referenced by the index but not
+    fully written to the vector file (e.g. after a crash) are dropped on load,
+    together with any trailing partial row.
+    A directory must only be written by a single process at a time.
+    """
+
+    def __init__(self, directory: str | os.PathLike[str]) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._vectors_path = self.directory / "vectors.f32"
+        self._index_path = self.directory / "index.txt"
+        self._rows: dict[str, int] = {}
+        self._count = 0
+        self._matrix: np.memmap | None = None
+        self.dim: int | None = None
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def _load(self) -> None:
+        if not self._index_path.exists():
+            return
+        with self._index_path.open(encoding="utf-8") as handle:
+            header = handle.readline().split()
+            if len(header) != 2 or header[0] != "dim":
+                return
+            self.dim = int(header[1])
+            row_bytes = self.dim * np.dtype(np.float32).itemsize
+            size = (
+                self._vectors_path.stat().st_size if self._vectors_path.exists() else 0
+            )
+            self._count = size // row_bytes
+            stale = False
+            for line in handle:
+                parts = line.split()
+                if len(parts) == 2 and int(parts[1]) < self._count:
+                    self._rows[parts[0]] = int(parts[1])
+                else:
+                    stale = True
+        if size > self._count * row_bytes:
+            # Drop a partially written row so later appends stay aligned.
+            with self._vectors_path.open("r+b") as vectors:
+                vectors.truncate(self._count * row_bytes)
+        if stale:
+            # Forget index lines for rows that were never fully written; their
+            # row numbers are reused by the next append.
+            self._index_path.write_text(
+                f"dim {self.dim}\n"
+                + "".join(f"{key} {row}\n" for key, row in self._rows.items()),
+                encoding="utf-8",
+            )
+
+    def _mapped(self) -> np.memmap:
+        if self._matrix is None or self._matrix.shape[0] < self._count:
+            assert self.dim is not None
+            self._matrix = np.memmap(
+                self._vectors_path,
+                dtype=np.float32,
+                mode="r",
+                shape=(self._count, self.dim),
+            )
+        return self._matrix
+
+    def get(self, key: str) -> np.ndarray | None:
+        row = self._rows.get(key)
+        if row is None:
+            return None
+        return np.array(self._mapped()[row])
+
+    def put_many(self, items: Sequence[tuple[str, np.ndarray]]) -> None:
+        fresh: dict[str, np.ndarray] = {}
+        for key, vector in items:
+            if key not in self._rows:
+                fresh[key] = vector
+        if not fresh:
+            return
+
+        matrix = np.stack(list(fresh.values())).astype(np.float32, copy=False)
+        if self.dim is None:
+            self.dim = int(matrix.shape[1])
+            self._index_path.write_text(f"dim {self.dim}\n", encoding="utf-8")
+        elif matrix.shape[1] != self.dim:
+            raise ValueError(
+                f"Embedding dimension {matrix.shape[1]} does not match store "
+                f"dimension {self.dim}"
+            )
+
+        start = self._count
+        with self._vectors_path.open("ab") as handle:
+            handle.write(matrix.tobytes())
+        with self._index_path.open("a", encoding="utf-8") as handle:
+            handle.writelines(
+                f"{key} {start + offset}\n" for offset, key in enumerate(fresh)
+            )
+        for offset, key in enumerate(fresh):
+            self._rows[key] = start + offset
+        self._count += len(fresh)
+
+
+def _store_name(model_name: str) -> str:
+    """Directory name of a model namespace's disk store: readable and unique."""
+    slug = re.sub(r"[^A-Za-z0-9._-]+", "_", model_name)[:64]
+    return f"{slug}-{hashlib.sha256(model_name.encode('utf-8')).hexdigest()[:12]}"
+
+
+class EmbeddingCache:
+    """Byte-bounded in-process LRU of embeddings with an optional disk tier.
+
+    With ``dtype`` ``"float16"`` or ``"int8"`` the in-process tier stores
+    unit-length vectors in that dtype (int8 with a per-vector scale), fitting
+    2-4x more entries in ``max_bytes``; lookups return float32. Misses and
+    disk hits are returned after the same round trip through ``dtype``, so a
+    text embeds identically whether it was cached or not.
+
+    The disk tier keeps one store per ``model_name`` namespace under
+    ``directory``, since each namespace may have its own dimension.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        directory: str | os.PathLike[str] | None = None,
+        dtype: str = "float32",
+    ) -> None:
+        self.max_bytes = max(max_bytes, 0)
+        self.directory = Path(directory) if directory else None
+        self._disks: dict[str, DiskEmbeddingStore] = {}
+        self.dtype = dtype
+        quantize_rows(np.zeros((0, 1)), dtype)  # validate early
+        self._entries: OrderedDict[str, tuple[np.ndarray, float | None]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _entry_bytes(entry: tuple[np.ndarray, float | None]) -> int:
+        data, scale = entry
+        return data.nbytes + (4 if scale is not None else 0)
+
+    def _disk(self, model_name: str) -> DiskEmbeddingStore | None:
+        if self.directory is None:
+            return None
+        store = self._disks.get(model_name)
+        if store is None:
+            store = DiskEmbeddingStore(self.directory / _store_name(model_name))
+            self._disks[model_name] = store
+        return store
+
+    def _quantize(self, vector: np.ndarray) -> tuple[np.ndarray, float | None]:
+        data, scales = quantize_rows(vector[None, :], self.dtype)
+        return data[0], float(scales[0]) if scales is not None else None
+
+    @staticmethod
+    def _dequantize(entry: tuple[np.ndarray, float | None]) -> np.ndarray:
+        data, scale = entry
+        if scale is None:
+            return data.astype(np.float32, copy=False)
+        return data.astype(np.float32) * scale
+
+    def _lookup(self, key: str, disk: DiskEmbeddingStore | None) -> np.ndarray | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._dequantize(entry)
+        if disk is not None:
+            vector = disk.get(key)
+            if vector is not None:
+                self.hits += 1
+                self.disk_hits += 1
+                entry = self._quantize(vector)
+                self._remember(key, entry)
+                return self._dequantize(entry)
+        return None
+
+    def _remember(self, key: str, entry: tuple[np.ndarray, float | None]) -> None:
+        if key in self._entries:
+            return
+        size = self._entry_bytes(entry)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = entry
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= self._entry_bytes(evicted)
+            self.evictions += 1
+
+    def get_or_compute(
+        self,
+        model_name: str,
+        texts: Sequence[str],
+        compute: Callable[[list[str]], np.ndarray],
+    ) -> np.ndarray:
+        """Return embeddings for ``texts``, encoding only the cache misses.
+
+        Misses (deduplicated within the call) are passed to ``compute`` in a
+        single batch and written back to every configured tier.
+        """
+        if not texts:
+            return compute([])
+        vectors, missing = self._lookup_many(model_name, texts)
+        if missing:
+            miss_texts = [texts[positions[0]] for positions in missing.values()]
+            self._fill(model_name, vectors, missing, compute(miss_texts))
+        return np.stack(vectors, axis=0)  # type: ignore[arg-type]
+
+    async def aget_or_compute(
+        self,
+        model_name: str,
+        texts: Sequence[str],
+        compute: Callable[[list[str]], Awaitable[np.ndarray]],
+    ) -> np.ndarray:
+        """``get_or_compute`` for an awaitable ``compute``.
+
+        Lookups and write-backs run in a worker thread; nothing blocks while
+        ``compute`` is awaited.
+        """
+        if not texts:
+            return await compute([])
+        vectors, missing = await asyncio.to_thread(self._lookup_many, model_name, texts)
+        if missing:
+            miss_texts = [texts[positions[0]] for positions in missing.values()]
+            computed = await compute(miss_texts)
+            await asyncio.to_thread(self._fill, model_name, vectors, missing, computed)
+        return np.stack(vectors, axis=0)  # type: ignore[arg-type]
+
+    def _lookup_many(
+        self, model_name: str, texts: Sequence[str]
+    ) -> tuple[list[np.ndarray | None], dict[str, list[int]]]:
+        """Return cached vectors (``None`` for misses) and each miss's positions."""
+        keys = [cache_key(model_name, text) for text in texts]
+        vectors: list[np.ndarray | None] = []
+        missing: dict[str, list[int]] = {}
+        with self._lock:
+            disk = self._disk(model_name)
+            for position, key in enumerate(keys):
+                vector = self._lookup(key, disk)
+                vectors.append(vector)
+                if vector is None:
+                    missing.setdefault(key, []).append(position)
+            self.misses += sum(len(positions) for positions in missing.values())
+        return vectors, missing
+
+    def _fill(
+        self,
+        model_name: str,
+        vectors: list[np.ndarray | None],
+        missing: dict[str, list[int]],
+        computed: np.ndarray,
+    ) -> None:
+        """Store freshly computed rows and put them in place in ``vectors``."""
+        computed = np.asarray(computed, dtype=np.float32)
+        fresh = [(key, row.copy()) for key, row in zip(missing, computed, strict=True)]
+        entries = [self._quantize(vector) for _key, vector in fresh]
+        for entry, positions in zip(entries, missing.values(), strict=True):
+            vector = self._dequantize(entry)
+            for position in positions:
+                vectors[position] = vector
+        with self._lock:
+            for (key, _vector), entry in zip(fresh, entries, strict=True):
+                self._remember(key, entry)
+            disk = self._disk(model_name)
+            if disk is not None:
+                disk.put_many(fresh)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "disk_entries": sum(len(disk) for disk in self._disks.values()),
+            }
@@ -0,0 +1,162 @@
+"""Process pool that runs the embedding model on every core of one API process."""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+import numpy as np
+
+from .chunking import count_tokens
+from .selection import (
+    EmbeddingBackend,
+    _length_buckets,
+    backend_cache_id,
+    load_embedding_backend,
+)
+
+__all__ = ["EmbeddingWorkerPool"]
+
+# Backend of the current worker process (or of the parent, when preloaded
+# before forking so workers share its weights copy-on-write).
+_backend: EmbeddingBackend | None = None
+
+
+def _load(config: dict[str, Any]) -> EmbeddingBackend:
+    options = dict(config)
+    return load_embedding_backend(
+        options.pop("name"),
+        options.pop("model_name"),
+        options.pop("onnx_path"),
+        **options,
+    )
+
+
+def _init_worker(config: dict[str, Any], threads: int, preloaded: bool) -> None:
+    global _backend
+    if not preloaded or _backend is None:
+        _backend = _load(config)
+    # torch is imported lazily by the backend, so cap its threads only now.
+    if threads > 0 and "torch" in sys.modules:
+        sys.modules["torch"].set_num_threads(threads)
+
+
+def _encode(texts: list[str]) -> np.ndarray:
+    assert _backend is not None
+    return np.asarray(_backend.encode(texts), dtype=np.float32)
+
+
+def _cache_id() -> str:
+    assert _backend is not None
+    return backend_cache_id(_backend)
+
+
+class EmbeddingWorkerPool:
+    """Embedding backend that fans batches out to ``processes`` model workers.
+
+    Each worker loads the backend once, from the same arguments as
+    :func:`~app.selection.load_embedding_backend`. Texts are sorted by length
+    and split into buckets of at most ``max_batch_tokens`` padded tokens (or
+    one contiguous shard per worker when that is ``0``); buckets are queued to
+    whichever worker is free and the rows are returned in input order.
+
+    With ``start_method="fork"`` and ``preload`` the parent loads the model
+    before the workers start, so they share its weights copy-on-write instead
+    of each holding a private copy. ``threads`` caps the intra-op threads of
+    each worker (``0`` divides the cores evenly between workers).
+    """
+
+    length_bucketed = True
+
+    def __init__(
+        self,
+        processes: int,
+        name: str,
+        model_name: str,
+        onnx_path: str | None = None,
+        *,
+        max_batch_tokens: int = 0,
+        start_method: str = "spawn",
+        preload: bool = False,
+        threads: int = 0,
+        **onnx_options: Any,
+    ) -> None:
+        global _backend
+        preload = preload and start_method == "fork"
+        self.processes = max(processes, 1)
+        self.max_batch_tokens = max_batch_tokens
+        if threads <= 0:
+            threads = max((os.cpu_count() or 1) // self.processes, 1)
+        config = {
+            "name": name,
+            "model_name": model_name,
+            "onnx_path": onnx_path,
+            **onnx_options,
+            # The ONNX backend inside each worker buckets by the same budget.
+            "max_batch_tokens": max_batch_tokens,
+            "threads": threads,
+        }
+        if preload:
+            _backend = _load(config)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.processes,
+            mp_context=multiprocessing.get_context(start_method),
+            initializer=_init_worker,
+            initargs=(config, threads, preload),
+        )
+        self._lock = threading.Lock()
+        self._cache_id: str | None = None
+        self.calls = 0
+        self.tasks = 0
+        self.texts = 0
+
+    @property
+    def cache_id(self) -> str:
+        """The backend the workers actually loaded (``auto`` may fall back)."""
+        if self._cache_id is None:
+            self._cache_id = self._executor.submit(_cache_id).result()
+        return self._cache_id
+
+    def _shards(self, texts: list[str]) -> list[np.ndarray]:
+        lengths = np.array([max(count_tokens(text), 1) for text in texts])
+        buckets = _length_buckets(lengths, self.max_batch_tokens)
+        if len(buckets) == 1 and self.processes > 1:
+            buckets = np.array_split(buckets[0], self.processes)
+        return [bucket for bucket in buckets if len(bucket)]
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return self._executor.submit(_encode, []).result()
+        shards = self._shards(texts)
+        futures = [
+            self._executor.submit(_encode, [texts[i] for i in shard])
+            for shard in shards
+        ]
+        output: np.ndarray | None = None
+        for shard, future in zip(shards, futures, strict=True):
+            rows = future.result()
+            if output is None:
+                output = np.empty((len(texts), rows.shape[1]), dtype=rows.dtype)
+            output[shard] = rows
+        with self._lock:
+            self.calls += 1
+            self.tasks += len(shards)
+            self.texts += len(texts)
+        assert output is not None
+        return output
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "processes": self.processes,
+                "calls": self.calls,
+                "tasks": self.tasks,
+                "texts": self.texts,
+            }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
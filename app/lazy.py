@@ -0,0 +1,41 @@
+"""Deferred imports of heavy optional dependencies (torch, transformers, ORT)."""
+
+from __future__ import annotations
+
+import importlib
+import logging
+import time
+from typing import Any
+
+__all__ = ["UNRESOLVED", "resolve"]
+
+logger = logging.getLogger(__name__)
+
+# Placeholder for a module global whose import has not been attempted yet.
+UNRESOLVED: Any = type("Unresolved", (), {"__repr__": lambda self: "<unresolved>"})()
+
+
+def resolve(
+    namespace: dict[str, Any], name: str, module: str, attr: str | None = None
+) -> Any:
+    """Import ``module`` (``attr`` of it) on first use and cache it as ``name``.
+
+    The result is stored in ``namespace`` (a module's ``globals()``), so the
+    import cost is paid once, on the first call that needs the dependency, and
+    tests can still replace the global. A missing or broken dependency
+    resolves to ``None``.
+    """
+    value = namespace.get(name, UNRESOLVED)
+    if value is not UNRESOLVED:
+        return value
+    started = time.perf_counter()
+    try:
+        value = importlib.import_module(module)
+        if attr is not None:
+            value = getattr(value, attr)
+    except Exception:
+        value = None
+    else:
+        logger.info("imported %s in %.2fs", module, time.perf_counter() - started)
+    namespace[name] = value
+    return value
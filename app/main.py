@@ -1,73 +1,582 @@
 """FastAPI entrypoint for the context compressor."""
 
-from fastapi import FastAPI
+import asyncio
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any
 
-from .chunking import chunk_text
-from .compression import Compressor
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+from .admission import Overloaded
+from .chunking import chunk_document, chunk_spans, count_tokens
+from .compression import CHUNK_SEPARATOR, Compressor
 from .config import settings
+from .corpus import CorpusNotFound, CorpusStore
+from .embedding_cache import EmbeddingCache
+from .embedding_workers import EmbeddingWorkerPool
 from .guards import ensure_code_blocks_closed, forbid_identifier_renames
-from .models import CompressRequest, CompressResponse
-from .selection import Selector
+from .metrics import BACKEND_ERRORS, CHUNKS, REGISTRY, start_timings, timed
+from .models import (
+    CompressBatchError,
+    CompressBatchRequest,
+    CompressBatchResponse,
+    CompressRequest,
+    CompressResponse,
+    CorpusCreateRequest,
+    CorpusInfo,
+    CorpusListResponse,
+    CorpusUpdateRequest,
+    CorpusUpdateResponse,
+)
+from .response_cache import (
+    PROMPT_VERSION,
+    ResponseCache,
+    SQLiteCacheBackend,
+    stable_hash,
+)
+from .selection import (
+    EmbeddingBackend,
+    EmbeddingDimensionMismatch,
+    Selector,
+    load_embedding_backend,
+)
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Context Compressor", version="0.1.0")
 selector: Selector | None = None
 compressor: Compressor | None = None
+executor: ThreadPoolExecutor | None = None
+response_cache: ResponseCache | None = None
+corpus_store: CorpusStore | None = None
+# Model loading progress reported by /readyz: idle, loading, ready or failed.
+_startup: dict[str, Any] = {"state": "idle", "error": None, "seconds": {}}
+
+# Settings that change what a /compress call returns for the same request.
+_CACHE_SETTINGS = {
+    "embedding_model",
+    "embedding_backend",
+    "embedding_onnx_path",
+    "embedding_onnx_pooling",
+    "embedding_dim",
+    "embedding_storage_dtype",
+    "selection_candidate_pool",
+    "chunk_target_tokens",
+    "chunk_overlap_tokens",
+    "compressor_backend",
+    "compressor_context_tokens",
+    "openai_model",
+    "openai_temperature",
+    "openai_top_p",
+    "openai_max_tokens",
+    "hf_model",
+    "hf_max_new_tokens",
+}
+
+
+async def _run_cpu(func: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Any:
+    """Run a CPU-bound pipeline stage on the bounded executor."""
+    loop = asyncio.get_running_loop()
+    # Run in a copy of this context so stage timings reach the current request.
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        executor, partial(context.run, func, *args, **kwargs)
+    )
+
+
+def _embedding_backend() -> EmbeddingBackend:
+    options = {
+        "threads": settings.embedding_onnx_threads,
+        "max_length": settings.embedding_max_length,
+        "max_batch_tokens": settings.embedding_max_batch_tokens,
+        "pooling": settings.embedding_onnx_pooling,
+    }
+    if settings.embedding_workers > 0:
+        fork = settings.embedding_worker_start_method == "fork"
+        return EmbeddingWorkerPool(
+            settings.embedding_workers,
+            settings.embedding_backend,
+            settings.embedding_model,
+            settings.embedding_onnx_path,
+            start_method=settings.embedding_worker_start_method,
+            preload=fork,
+            **options,
+        )
+    return load_embedding_backend(
+        settings.embedding_backend,
+        settings.embedding_model,
+        settings.embedding_onnx_path,
+        **options,
+    )
+
+
+def _build_selector() -> Selector:
+    cache = None
+    if settings.embedding_cache_bytes > 0 or settings.embedding_cache_dir:
+        cache = EmbeddingCache(
+            settings.embedding_cache_bytes,
+            settings.embedding_cache_dir,
+            dtype=settings.embedding_storage_dtype,
+        )
+    return Selector(
+        settings.embedding_model,
+        cache=cache,
+        batch_wait_ms=settings.embed_batch_wait_ms,
+        max_batch_size=settings.embed_batch_max_size,
+        candidate_pool=settings.selection_candidate_pool,
+        embedding_dim=settings.embedding_dim,
+        backend=_embedding_backend(),
+        max_batch_tokens=settings.embedding_max_batch_tokens,
+    )
+
+
+def _warmup() -> None:
+    """Run one tiny selection (and local generation) to prime model kernels."""
+    assert selector is not None
+    selector.select(
+        ["Warm up the embedding model.", "Prime its kernels."],
+        task="warm up",
+        keep_ratio=0.5,
+        lam=0.5,
+    )
+    if compressor is not None and settings.compressor_backend == "HF":
+        compressor.compress("Warm up.", task=None, budget=8, mode="losslessish")
+
+
+def _format_seconds(seconds: dict[str, float]) -> str:
+    return " ".join(f"{name}={value:.3f}s" for name, value in seconds.items())
+
+
+def _load_models() -> None:
+    """Build the embedding model and compressor backend, then optionally warm up."""
+    global selector, compressor
+    seconds = _startup["seconds"]
+    started = time.perf_counter()
+    try:
+        if selector is None:
+            selector = _build_selector()
+            seconds["selector"] = time.perf_counter() - started
+        if compressor is None and settings.compressor_backend != "NONE":
+            mark = time.perf_counter()
+            compressor = Compressor()
+            seconds["compressor"] = time.perf_counter() - mark
+        if settings.startup_warmup:
+            mark = time.perf_counter()
+            _warmup()
+            seconds["warmup"] = time.perf_counter() - mark
+    except Exception as exc:
+        logger.exception("model loading failed")
+        _startup.update(state="failed", error=f"{type(exc).__name__}: {exc}")
+        return
+    seconds["models"] = time.perf_counter() - started
+    _startup["state"] = "ready"
+    logger.info("models ready: %s", _format_seconds(seconds))
 
 
 @app.on_event("startup")
 def startup() -> None:
-    global selector, compressor
-    if selector is None:
-        selector = Selector(settings.embedding_model)
-    if compressor is None:
-        compressor = Compressor()
+    global executor, response_cache, corpus_store
+    started = time.perf_counter()
+    seconds: dict[str, float] = {}
+    _startup.update(state="loading", error=None, seconds=seconds)
+    if executor is None:
+        executor = ThreadPoolExecutor(
+            max_workers=max(settings.cpu_workers, 1), thread_name_prefix="cpu"
+        )
+    if corpus_store is None:
+        corpus_store = CorpusStore(
+            settings.corpus_dir, dtype=settings.embedding_storage_dtype
+        )
+    if response_cache is None and settings.response_cache_ttl > 0:
+        backend = (
+            SQLiteCacheBackend(settings.response_cache_sqlite)
+            if settings.response_cache_sqlite
+            else None
+        )
+        response_cache = ResponseCache(
+            settings.response_cache_bytes, settings.response_cache_ttl, backend
+        )
+    seconds["services"] = time.perf_counter() - started
+
+    if settings.model_loading == "background":
+        threading.Thread(target=_load_models, name="model-loader", daemon=True).start()
+        logger.info(
+            "serving after %s; loading models in the background",
+            _format_seconds(seconds),
+        )
+    else:
+        _load_models()
+        logger.info("startup finished: %s", _format_seconds(seconds))
+
+
+def _require_models(extractive: bool = True) -> None:
+    """Answer 503 while the models a request needs are still loading."""
+    if selector is not None and (extractive or compressor is not None):
+        return
+    if _startup["state"] == "failed":
+        raise HTTPException(
+            status_code=503, detail=f"Model loading failed: {_startup['error']}"
+        )
+    raise HTTPException(
+        status_code=503, detail="Models are loading", headers={"Retry-After": "5"}
+    )
 
 
 @app.on_event("shutdown")
-def shutdown() -> None:
-    global selector, compressor
+async def shutdown() -> None:
+    global selector, compressor, executor, response_cache, corpus_store
     if compressor is not None:
-        compressor.close()
+        await compressor.aclose()
         compressor = None
-    selector = None
+    if selector is not None:
+        selector.close()
+        selector = None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+        executor = None
+    if response_cache is not None:
+        response_cache.close()
+        response_cache = None
+    corpus_store = None
+    _startup.update(state="idle", error=None)
 
 
-@app.post("/compress", response_model=CompressResponse)
-def compress(req: CompressRequest) -> CompressResponse:
-    assert selector is not None
-    assert compressor is not None
-    if req.document is not None:
-        texts = chunk_text(
-            req.document,
-            settings.chunk_target_tokens,
-            settings.chunk_overlap_tokens,
-        )
-    else:
-        texts = req.texts or []
+def _selection_params(req: CompressRequest) -> tuple[float, float]:
     default_keep_ratio = 0.4 if req.mode == "task" else 0.5
     keep_ratio = req.keep_ratio if req.keep_ratio is not None else default_keep_ratio
     lam = req.mmr_lambda if req.mmr_lambda is not None else settings.mmr_lambda
-    indices, scores = selector.select(
-        texts=texts,
-        task=req.task,
+    return keep_ratio, lam
+
+
+async def _load_corpus(corpus_id: str) -> tuple[list[str], Any]:
+    assert corpus_store is not None
+    assert selector is not None
+    try:
+        model, dim, backend = await asyncio.to_thread(
+            corpus_store.embedding_model, corpus_id
+        )
+        loaded = await asyncio.to_thread(corpus_store.load, corpus_id)
+    except CorpusNotFound:
+        raise HTTPException(status_code=404, detail="Unknown corpus") from None
+    expected_dim = getattr(selector, "embedding_dim", 0)
+    # Same model and dim from another backend (pooling, ONNX export) is
+    # still another vector space.
+    expected_backend = await asyncio.to_thread(getattr, selector, "backend_id", None)
+    if (
+        model != selector.model_name
+        or (expected_dim and dim != expected_dim)
+        or (backend and expected_backend and backend != expected_backend)
+    ):
+        raise HTTPException(
+            status_code=409,
+            detail=(
+                f"Corpus was embedded with {model} [{backend}] (dim {dim}); "
+                f"rebuild it for {selector.model_name} [{expected_backend}]"
+            ),
+        )
+    return loaded
+
+
+def _selection_budget(req: CompressRequest) -> int | None:
+    if req.selection_budget_tokens is not None:
+        return req.selection_budget_tokens
+    return settings.selection_budget_tokens or None
+
+
+async def _chunk(req: CompressRequest) -> tuple[list[str], list[int] | None]:
+    """Return the request's chunks and, for a document, their token counts."""
+    if req.document is not None:
+        with timed("chunking"):
+            return await _run_cpu(
+                chunk_document,
+                req.document,
+                settings.chunk_target_tokens,
+                settings.chunk_overlap_tokens,
+                req.chunking_strategy or settings.chunking_strategy,
+                return_counts=True,
+            )
+    return req.texts or [], None
+
+
+async def _select(
+    req: CompressRequest,
+) -> tuple[list[str], list[int], list[float], dict[str, Any]]:
+    """Chunk the request payload and run MMR selection off the event loop."""
+    assert selector is not None
+    precomputed: dict[str, Any] = {}
+    from_corpus = (
+        req.corpus_id is not None and req.texts is None and req.document is None
+    )
+    counts = None
+    if from_corpus:
+        texts, precomputed["embeddings"] = await _load_corpus(req.corpus_id)
+    else:
+        texts, counts = await _chunk(req)
+    keep_ratio, lam = _selection_params(req)
+
+    budget = _selection_budget(req)
+    selection_meta: dict[str, Any] = {}
+    if budget is not None:
+        if from_corpus:
+            assert corpus_store is not None
+            counts = await asyncio.to_thread(corpus_store.token_counts, req.corpus_id)
+        elif counts is None:
+            counts = await _run_cpu(lambda: [count_tokens(text) for text in texts])
+        # Charge every chunk for the separator that joins it to the next one.
+        separator = count_tokens(CHUNK_SEPARATOR)
+        precomputed.update(
+            token_counts=[count + separator for count in counts],
+            budget_tokens=budget + separator,
+        )
+        selection_meta["budget_tokens"] = budget
+
+    if getattr(selector, "batcher", None) is not None:
+        await _embed_on_loop(req, texts, precomputed)
+    try:
+        indices, scores = await _run_cpu(
+            selector.select,
+            texts=texts,
+            task=req.task,
+            keep_ratio=keep_ratio,
+            lam=lam,
+            **precomputed,
+        )
+    except EmbeddingDimensionMismatch as exc:
+        # A corpus built with another EMBEDDING_DIM than the model's native one.
+        raise HTTPException(status_code=409, detail=str(exc)) from None
+    CHUNKS.inc(len(texts), kind="in")
+    CHUNKS.inc(len(indices), kind="kept")
+    if budget is not None:
+        selection_meta["selected_tokens"] = (
+            sum(counts[index] for index in indices)
+            + max(len(indices) - 1, 0) * separator
+        )
+    return texts, indices, scores, selection_meta
+
+
+async def _embed_on_loop(
+    req: CompressRequest, texts: list[str], precomputed: dict[str, Any]
+) -> None:
+    """Embed through the micro-batcher before selection reaches the executor.
+
+    Waiting for the batch window on the event loop rather than in a ``cpu``
+    thread lets more than ``CPU_WORKERS`` requests share one encode call.
+    """
+    assert selector is not None
+    embed_texts = "embeddings" not in precomputed
+    calls = [selector.aembed([req.task])] if req.task else []
+    if embed_texts:
+        calls.append(selector.aembed(texts))
+    rows = await asyncio.gather(*calls)
+    if req.task:
+        precomputed["task_embedding"] = rows[0][0]
+    if embed_texts:
+        precomputed["embeddings"] = rows[-1]
+
+
+def _budget(req: CompressRequest) -> int:
+    return req.budget_tokens if req.budget_tokens is not None else 800
+
+
+_EXTRACTIVE_META = {"backend": "NONE", "model": None, "mode": "extractive"}
+
+
+def _extractive(req: CompressRequest) -> bool:
+    return req.mode == "extractive" or settings.compressor_backend == "NONE"
+
+
+def _backend_meta() -> dict[str, Any]:
+    return {
+        "backend": settings.compressor_backend,
+        "model": settings.openai_model
+        if settings.compressor_backend == "OPENAI"
+        else settings.hf_model,
+    }
+
+
+def _apply_guards(selected_content: str, compressed_text: str) -> str:
+    with timed("guards"):
+        compressed_text = ensure_code_blocks_closed(compressed_text)
+        try:
+            forbid_identifier_renames(selected_content, compressed_text)
+        except Exception:
+            pass
+        return compressed_text
+
+
+def _backend_error(exc: Exception) -> None:
+    if not isinstance(exc, Overloaded):  # counted as a rejection instead
+        BACKEND_ERRORS.inc(error=type(exc).__name__)
+
+
+@app.exception_handler(Overloaded)
+async def _overloaded(_request: Request, exc: Overloaded) -> JSONResponse:
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc)},
+        headers={"Retry-After": exc.retry_after_header},
+    )
+
+
+async def _extract(req: CompressRequest, selected_texts: list[str]) -> str:
+    """Join the selected chunks, trimming sentences to ``budget_tokens``.
+
+    This is the whole response in extractive mode; no backend call is made.
+    """
+    with timed("extract"):
+        trimmed = await _trim_sentences(req, selected_texts, _budget(req))
+        return ensure_code_blocks_closed(CHUNK_SEPARATOR.join(trimmed))
+
+
+async def _trim_sentences(
+    req: CompressRequest, texts: list[str], budget: int
+) -> list[str]:
+    """Sentence-level MMR over ``texts`` so their joined form fits ``budget``."""
+    assert selector is not None
+    separators = count_tokens(CHUNK_SEPARATOR) * max(len(texts) - 1, 0)
+    _, lam = _selection_params(req)
+    trimmed = await _run_cpu(
+        selector.select_sentences,
+        texts,
+        req.task,
+        max(budget - separators, 1),
+        lam,
+    )
+    return [text for text in trimmed if text]
+
+
+async def _sentence_pass(
+    req: CompressRequest, selected_texts: list[str]
+) -> tuple[list[str], dict[str, int] | None]:
+    """Trim kept chunks sentence by sentence before they reach the prompt."""
+    ratio = req.sentence_keep_ratio or settings.sentence_keep_ratio
+    if not ratio or ratio >= 1 or not selected_texts:
+        return selected_texts, None
+    with timed("sentences"):
+        input_tokens = await _run_cpu(
+            count_tokens, CHUNK_SEPARATOR.join(selected_texts)
+        )
+        trimmed = await _trim_sentences(
+            req, selected_texts, max(int(input_tokens * ratio), 1)
+        )
+        output_tokens = await _run_cpu(count_tokens, CHUNK_SEPARATOR.join(trimmed))
+    return trimmed, {"input_tokens": input_tokens, "output_tokens": output_tokens}
+
+
+def _cache_key(req: CompressRequest, corpus_revision: int | None = None) -> str:
+    """Hash the request with defaults resolved, plus output-affecting settings."""
+    keep_ratio, lam = _selection_params(req)
+    normalized = req.model_dump(mode="json", exclude={"return_timings"})
+    normalized.update(
         keep_ratio=keep_ratio,
-        lam=lam,
+        mmr_lambda=lam,
+        budget_tokens=_budget(req),
+        chunking_strategy=req.chunking_strategy or settings.chunking_strategy,
+        selection_budget_tokens=_selection_budget(req),
+        sentence_keep_ratio=req.sentence_keep_ratio or settings.sentence_keep_ratio,
+        corpus_revision=corpus_revision,
     )
+    return stable_hash({
+        "request": normalized,
+        "settings": settings.model_dump(include=_CACHE_SETTINGS),
+        "prompts": PROMPT_VERSION,
+    })
 
-    selected_texts = [texts[index] for index in indices]
-    selected_content = "\n\n---\n\n".join(selected_texts)
-    compressed_text = compressor.compress(
-        content=selected_content,
-        task=req.task,
-        budget=req.budget_tokens if req.budget_tokens is not None else 800,
-        mode=req.mode,
+
+@app.post("/compress", response_model=CompressResponse)
+async def compress(req: CompressRequest) -> CompressResponse:
+    timings = start_timings()
+    with timed("total"):
+        response = await _cached_compress(req)
+    if req.return_timings:
+        response.meta["timings"] = _rounded(timings)
+    return response
+
+
+def _rounded(timings: dict[str, float]) -> dict[str, float]:
+    return {stage: round(seconds, 6) for stage, seconds in timings.items()}
+
+
+async def _cached_compress(req: CompressRequest) -> CompressResponse:
+    if response_cache is None:
+        return await _compress(req)
+
+    revision = None
+    if req.corpus_id is not None and corpus_store is not None:
+        try:
+            revision = await asyncio.to_thread(corpus_store.revision, req.corpus_id)
+        except CorpusNotFound:
+            pass
+    key = _cache_key(req, revision)
+    cached = await asyncio.to_thread(response_cache.get, key)
+    if cached is not None:
+        response = CompressResponse.model_validate_json(cached)
+        response.meta["cache"] = "hit"
+        return response
+
+    response = await _compress(req)
+    await asyncio.to_thread(
+        response_cache.set, key, response.model_dump_json().encode()
     )
+    response.meta["cache"] = "miss"
+    return response
+
 
-    compressed_text = ensure_code_blocks_closed(compressed_text)
+async def _compress(req: CompressRequest) -> CompressResponse:
+    _require_models(_extractive(req))
+    texts, indices, scores, selection_meta = await _select(req)
+
+    selected_texts = [texts[index] for index in indices]
+    extractive = _extractive(req)
+    meta = _EXTRACTIVE_META.copy() if extractive else _backend_meta()
+    if selection_meta:
+        meta["selection"] = selection_meta
+    if extractive:
+        compressed_text = await _extract(req, selected_texts)
+        return CompressResponse(
+            compressed=compressed_text,
+            kept_indices=indices,
+            kept_count=len(indices),
+            original_count=len(texts),
+            selection_scores=scores if req.return_selection else None,
+            kept_texts=selected_texts if req.return_selection else None,
+            meta=meta,
+        )
+
+    assert compressor is not None
+    prompt_texts, sentence_meta = await _sentence_pass(req, selected_texts)
+    if sentence_meta:
+        meta["sentences"] = sentence_meta
+    selected_content = CHUNK_SEPARATOR.join(prompt_texts)
+    budget = _budget(req)
     try:
-        forbid_identifier_renames(selected_content, compressed_text)
-    except Exception:
-        pass
+        with timed("backend"):
+            if req.hierarchical:
+                (
+                    compressed_text,
+                    meta["hierarchy"],
+                ) = await compressor.acompress_hierarchical(
+                    prompt_texts, task=req.task, budget=budget, mode=req.mode
+                )
+            else:
+                compressed_text = await compressor.acompress(
+                    content=selected_content,
+                    task=req.task,
+                    budget=budget,
+                    mode=req.mode,
+                )
+    except Exception as exc:
+        _backend_error(exc)
+        raise
+
+    compressed_text = _apply_guards(selected_content, compressed_text)
 
     return CompressResponse(
         compressed=compressed_text,
@@ -76,15 +585,281 @@ def compress(req: CompressRequest) -> CompressResponse:
         original_count=len(texts),
         selection_scores=scores if req.return_selection else None,
         kept_texts=selected_texts if req.return_selection else None,
-        meta={
-            "backend": settings.compressor_backend,
-            "model": settings.openai_model
-            if settings.compressor_backend == "OPENAI"
-            else settings.hf_model,
+        meta=meta,
+    )
+
+
+@app.post("/compress/batch", response_model=CompressBatchResponse)
+async def compress_batch(batch: CompressBatchRequest) -> CompressBatchResponse:
+    """Run many compressions concurrently so their embedding calls can coalesce.
+
+    A failed job is reported in its slot; it does not fail the whole batch.
+    """
+    results = await asyncio.gather(
+        *[compress(req) for req in batch.requests], return_exceptions=True
+    )
+    return CompressBatchResponse(results=[_batch_result(r) for r in results])
+
+
+def _batch_result(
+    result: CompressResponse | BaseException,
+) -> CompressResponse | CompressBatchError:
+    if isinstance(result, CompressResponse):
+        return result
+    if isinstance(result, HTTPException):
+        return CompressBatchError(status=result.status_code, detail=result.detail)
+    if isinstance(result, Overloaded):
+        return CompressBatchError(status=429, detail=str(result))
+    if not isinstance(result, Exception):
+        raise result  # cancellation and the like
+    logger.error("batch job failed", exc_info=result)
+    return CompressBatchError(status=500, detail="Internal Server Error")
+
+
+def _sse(event: str, data: dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def _stream_events(
+    req: CompressRequest,
+    selection: tuple[list[str], list[int], list[float], dict[str, Any]],
+    timings: dict[str, float],
+) -> AsyncIterator[str]:
+    texts, indices, scores, selection_meta = selection
+    selected_texts = [texts[index] for index in indices]
+    yield _sse(
+        "selection",
+        {
+            "kept_indices": indices,
+            "kept_count": len(indices),
+            "original_count": len(texts),
+            "selection_scores": scores,
+            "kept_texts": selected_texts if req.return_selection else None,
         },
     )
 
+    extractive = _extractive(req)
+    meta = _EXTRACTIVE_META.copy() if extractive else _backend_meta()
+    if selection_meta:
+        meta["selection"] = selection_meta
+    if extractive:
+        extract = await _extract(req, selected_texts)
+        yield _sse("token", {"text": extract})
+        if req.return_timings:
+            meta["timings"] = _rounded(timings)
+        yield _sse("done", {"compressed": extract, "meta": meta})
+        return
+
+    assert compressor is not None
+    prompt_texts, sentence_meta = await _sentence_pass(req, selected_texts)
+    if sentence_meta:
+        meta["sentences"] = sentence_meta
+    selected_content = CHUNK_SEPARATOR.join(prompt_texts)
+    budget = _budget(req)
+    pieces: list[str] = []
+    try:
+        with timed("backend"):
+            if req.hierarchical:
+                text, meta["hierarchy"] = await compressor.acompress_hierarchical(
+                    prompt_texts, task=req.task, budget=budget, mode=req.mode
+                )
+                pieces.append(text)
+                yield _sse("token", {"text": text})
+            else:
+                async for piece in compressor.astream(
+                    content=selected_content,
+                    task=req.task,
+                    budget=budget,
+                    mode=req.mode,
+                ):
+                    pieces.append(piece)
+                    yield _sse("token", {"text": piece})
+    except Exception as exc:
+        _backend_error(exc)
+        yield _sse("error", {"detail": str(exc)})
+        return
+
+    streamed = "".join(pieces)
+    compressed_text = _apply_guards(selected_content, streamed)
+    tail = compressed_text[len(streamed) :]
+    if tail:
+        yield _sse("token", {"text": tail})
+    if req.return_timings:
+        meta["timings"] = _rounded(timings)
+    yield _sse("done", {"compressed": compressed_text, "meta": meta})
+
+
+@app.post("/compress/stream")
+async def compress_stream(req: CompressRequest) -> StreamingResponse:
+    """Stream selection results, then backend tokens, as Server-Sent Events."""
+    _require_models(_extractive(req))
+    timings = start_timings()
+    # Select before the 200 goes out so e.g. an unknown corpus is still a 404,
+    # and likewise answer 429 if the backend would turn the call away.
+    selection = await _select(req)
+    limiter = getattr(compressor, "limiter", None)
+    if limiter is not None and not _extractive(req):
+        limiter.check()
+    return StreamingResponse(
+        _stream_events(req, selection, timings),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/corpora", response_model=CorpusInfo, status_code=201)
+async def create_corpus(req: CorpusCreateRequest) -> CorpusInfo:
+    """Chunk and embed a document set once so /compress only embeds the task."""
+    _require_models()
+    assert selector is not None
+    assert corpus_store is not None
+    strategy = None
+    spans = None
+    counts = None
+    if req.document is not None:
+        strategy = req.chunking_strategy or settings.chunking_strategy
+        spans, counts = await _run_cpu(
+            chunk_spans,
+            req.document,
+            settings.chunk_target_tokens,
+            settings.chunk_overlap_tokens,
+            strategy,
+            return_counts=True,
+        )
+        texts = [text for _, _, text in spans]
+    else:
+        texts = req.texts or []
+    if not texts:
+        raise HTTPException(status_code=422, detail="Corpus has no chunks")
+    embeddings = await _run_cpu(selector.embed, texts)
+    backend = await asyncio.to_thread(getattr, selector, "backend_id")
+    info = await _run_cpu(
+        corpus_store.create,
+        texts,
+        embeddings,
+        selector.model_name,
+        strategy,
+        document=req.document,
+        spans=spans,
+        backend=backend,
+        token_counts=counts,
+    )
+    return CorpusInfo(**info)
+
+
+@app.patch("/corpora/{corpus_id}", response_model=CorpusUpdateResponse)
+async def update_corpus(
+    corpus_id: str, req: CorpusUpdateRequest
+) -> CorpusUpdateResponse:
+    """Re-chunk and re-embed only what changed since the last revision."""
+    _require_models()
+    assert selector is not None
+    assert corpus_store is not None
+    try:
+        if req.texts is not None:
+            info = await _run_cpu(
+                corpus_store.extend, corpus_id, req.texts, selector.embed
+            )
+        else:
+            info = await _run_cpu(
+                corpus_store.update_document,
+                corpus_id,
+                selector.embed,
+                settings.chunk_target_tokens,
+                settings.chunk_overlap_tokens,
+                document=req.document,
+                append=req.append,
+            )
+    except CorpusNotFound:
+        raise HTTPException(status_code=404, detail="Unknown corpus") from None
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc)) from None
+    return CorpusUpdateResponse(**info)
+
+
+@app.get("/corpora", response_model=CorpusListResponse)
+async def list_corpora() -> CorpusListResponse:
+    assert corpus_store is not None
+    infos = await asyncio.to_thread(corpus_store.list)
+    return CorpusListResponse(
+        corpora=[CorpusInfo(**info) for info in infos],
+        total_bytes=sum(info["total_bytes"] for info in infos),
+    )
+
+
+@app.get("/corpora/{corpus_id}", response_model=CorpusInfo)
+async def get_corpus(corpus_id: str) -> CorpusInfo:
+    assert corpus_store is not None
+    try:
+        return CorpusInfo(**await asyncio.to_thread(corpus_store.info, corpus_id))
+    except CorpusNotFound:
+        raise HTTPException(status_code=404, detail="Unknown corpus") from None
+
+
+@app.delete("/corpora/{corpus_id}", status_code=204)
+async def delete_corpus(corpus_id: str) -> Response:
+    assert corpus_store is not None
+    try:
+        await asyncio.to_thread(corpus_store.delete, corpus_id)
+    except CorpusNotFound:
+        raise HTTPException(status_code=404, detail="Unknown corpus") from None
+    return Response(status_code=204)
+
+
+def _inflight_stats(component: object) -> dict[str, int] | None:
+    inflight = getattr(component, "inflight", None)
+    return inflight.stats() if inflight is not None else None
+
+
+@app.get("/stats")
+def stats() -> dict:
+    cache = getattr(selector, "cache", None)
+    batcher = getattr(selector, "batcher", None)
+    backend = getattr(selector, "backend", None)
+    limiter = getattr(compressor, "limiter", None)
+    router = getattr(compressor, "router", None)
+    return {
+        "embedding_cache": cache.stats() if cache is not None else None,
+        "response_cache": response_cache.stats()
+        if response_cache is not None
+        else None,
+        "corpora": corpus_store.stats() if corpus_store is not None else None,
+        "coalesced": {
+            "embed": _inflight_stats(selector),
+            "compress": _inflight_stats(compressor),
+        },
+        "embedding_batcher": batcher.stats() if batcher is not None else None,
+        "embedding_workers": backend.stats()
+        if isinstance(backend, EmbeddingWorkerPool)
+        else None,
+        "backend_limiter": limiter.stats() if limiter is not None else None,
+        "backend_endpoints": router.stats() if router is not None else None,
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics() -> PlainTextResponse:
+    """Stage latencies and pipeline counters in the Prometheus text format."""
+    return PlainTextResponse(
+        REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
 
 @app.get("/healthz")
 def health() -> dict:
     return {"ok": True}
+
+
+@app.get("/readyz")
+def ready(response: Response) -> dict:
+    """Readiness: 503 until models are loaded (and warmed up, if configured)."""
+    state = _startup["state"]
+    if state != "ready":
+        response.status_code = 503
+    seconds = dict(_startup["seconds"])  # the loader thread may still add keys
+    return {
+        "ready": state == "ready",
+        "state": state,
+        "error": _startup["error"],
+        "seconds": {name: round(value, 3) for name, value in seconds.items()},
+    }
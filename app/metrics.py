@@ -0,0 +1,245 @@
+"""Pipeline stage timings and counters in the Prometheus text format.
+
+Metrics are kept in-process with one lock per metric, so recording a sample
+costs a dictionary lookup and a bisect. :func:`timed` feeds the stage histogram
+and, when the current request called :func:`start_timings`, that request's
+``meta.timings`` as well. Work sent to executors must run in a copy of the
+caller's context (``contextvars.copy_context().run``) to be attributed.
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+import time
+from collections.abc import Iterator, Sequence
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+__all__ = [
+    "BACKEND_ERRORS",
+    "BACKEND_REJECTIONS",
+    "CHUNKS",
+    "ENDPOINT_SECONDS",
+    "REGISTRY",
+    "STAGE_SECONDS",
+    "TOKENS",
+    "Counter",
+    "Histogram",
+    "Registry",
+    "start_timings",
+    "timed",
+]
+
+_Labels = tuple[str, ...]
+
+# Stage latencies range from microseconds (guards) to minutes (backend).
+DEFAULT_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r"\"")
+
+
+def _number(value: float) -> str:
+    """Render a sample value exactly; ``:g`` would round large counters."""
+    value = float(value)
+    if value.is_integer() and abs(value) < 2**53:
+        return str(int(value))
+    return repr(value)
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)
+    )
+    return "{" + pairs + "}"
+
+
+class Counter:
+    """Monotonic counter with optional labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: dict[_Labels, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for key, value in values:
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_total{labels} {_number(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: per-bucket counts (last slot is +Inf), then the sum.
+        self._values: dict[_Labels, tuple[list[int], list[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(labels[name] for name in self.labelnames)
+        slot = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][slot] += 1
+            entry[1][0] += value
+
+    def count(self, **labels: str) -> int:
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            entry = self._values.get(key)
+            return sum(entry[0]) if entry is not None else 0
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(
+                (key, list(counts), total[0])
+                for key, (counts, total) in self._values.items()
+            )
+        names = (*self.labelnames, "le")
+        for key, counts, total in values:
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts, strict=True):
+                cumulative += count
+                le = bound if isinstance(bound, str) else f"{bound:g}"
+                labels = _format_labels(names, (*key, le))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_number(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    """Ordered collection of metrics rendered as one exposition document."""
+
+    def __init__(self) -> None:
+        self._metrics: list[Counter | Histogram] = []
+
+    def register(self, metric: Counter | Histogram) -> Counter | Histogram:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+STAGE_SECONDS = Histogram(
+    "compressor_stage_seconds",
+    "Time spent in each /compress pipeline stage.",
+    ("stage",),
+)
+CHUNKS = Counter(
+    "compressor_chunks",
+    "Chunks entering selection (in) and kept by it (kept).",
+    ("kind",),
+)
+TOKENS = Counter(
+    "compressor_backend_tokens",
+    "Backend prompt and completion tokens (reported usage or estimated).",
+    ("kind",),
+)
+BACKEND_ERRORS = Counter(
+    "compressor_backend_errors",
+    "Backend calls that raised, by exception type.",
+    ("error",),
+)
+BACKEND_REJECTIONS = Counter(
+    "compressor_backend_rejections",
+    "Calls refused by backend admission control (queue_full, deadline, timeout).",
+    ("reason",),
+)
+ENDPOINT_SECONDS = Histogram(
+    "compressor_backend_endpoint_seconds",
+    "Backend call latency per endpoint and outcome (ok, error).",
+    ("endpoint", "outcome"),
+)
+for _metric in (
+    STAGE_SECONDS,
+    CHUNKS,
+    TOKENS,
+    BACKEND_ERRORS,
+    BACKEND_REJECTIONS,
+    ENDPOINT_SECONDS,
+):
+    REGISTRY.register(_metric)
+
+_timings: ContextVar[dict[str, float] | None] = ContextVar("timings", default=None)
+
+
+def start_timings() -> dict[str, float]:
+    """Collect stage timings of the current task into the returned dict."""
+    timings: dict[str, float] = {}
+    _timings.set(timings)
+    return timings
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Record the duration of the ``with`` block as ``stage``."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        timings = _timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
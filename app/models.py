@@ -5,7 +5,7 @@ from typing import Any, Literal
 from pydantic import BaseModel, Field, field_validator, model_validator
 
 
-class CompressRequest(BaseModel):
+class DocumentPayload(BaseModel):
     texts: list[str] | None = Field(
         default=None, description="List of text chunks to condense"
     )
@@ -15,18 +15,85 @@ class CompressRequest(BaseModel):
             "Raw document to segment before selection; overrides `texts` when provided"
         ),
     )
+    chunking_strategy: Literal["window", "structure"] | None = Field(
+        default=None,
+        description=(
+            "How `document` is segmented: fixed token windows or markdown/code-aware "
+            "structure; defaults to CHUNKING_STRATEGY"
+        ),
+    )
+
+    @field_validator("texts", mode="before")
+    @classmethod
+    def _normalize_texts(cls, value: Any) -> list[str] | None:
+        if value is None:
+            return None
+        if isinstance(value, str):
+            return [value]
+        if isinstance(value, list):
+            return [str(item) for item in value]
+
+        return [str(value)]
+
+    @model_validator(mode="after")
+    @classmethod
+    def _ensure_payload(cls, values: "DocumentPayload") -> "DocumentPayload":
+        if values.texts is None and values.document is None:
+            raise ValueError("either texts or document must be provided")
+        return values
+
+
+class CompressRequest(DocumentPayload):
+    corpus_id: str | None = Field(
+        default=None,
+        description="Select from a corpus registered via POST /corpora instead",
+    )
     task: str | None = Field(
         None, description="Task conditioning, e.g. 'assist coding on feature X'"
     )
-    mode: Literal["losslessish", "task"] = "losslessish"
+    mode: Literal["losslessish", "task", "extractive"] = Field(
+        default="losslessish",
+        description=(
+            "`extractive` returns the selected chunks, trimmed to budget_tokens by "
+            "sentence-level MMR, without calling the LLM backend"
+        ),
+    )
     budget_tokens: int | None = Field(default=800, ge=0)
     return_selection: bool = False
+    return_timings: bool = Field(
+        default=False,
+        description="Report per-stage seconds for this request in meta.timings",
+    )
+    hierarchical: bool = Field(
+        default=False,
+        description=(
+            "Compress selected chunks in backend-sized batches and recursively "
+            "merge the partial summaries"
+        ),
+    )
     keep_ratio: float | None = Field(
         default=None,
         gt=0.0,
         le=1.0,
         description="Fraction of texts to retain during selection",
     )
+    sentence_keep_ratio: float | None = Field(
+        default=None,
+        gt=0.0,
+        le=1.0,
+        description=(
+            "Drop low-value sentences from the kept chunks before prompting, keeping "
+            "this fraction of their tokens (defaults to SENTENCE_KEEP_RATIO)"
+        ),
+    )
+    selection_budget_tokens: int | None = Field(
+        default=None,
+        ge=1,
+        description=(
+            "Token budget for the selected content; chunks are picked by MMR until "
+            "it is filled (overrides keep_ratio, defaults to SELECTION_BUDGET_TOKENS)"
+        ),
+    )
     mmr_lambda: float | None = Field(
         default=None,
         ge=0.0,
@@ -34,23 +101,11 @@ class CompressRequest(BaseModel):
         description="MMR trade-off between relevance and diversity",
     )
 
-    @field_validator("texts", mode="before")
-    @classmethod
-    def _normalize_texts(cls, value: Any) -> list[str] | None:
-        if value is None:
-            return None
-        if isinstance(value, str):
-            return [value]
-        if isinstance(value, list):
-            return [str(item) for item in value]
-
-        return [str(value)]
-
     @model_validator(mode="after")
     @classmethod
     def _ensure_payload(cls, values: "CompressRequest") -> "CompressRequest":
-        if values.texts is None and values.document is None:
-            raise ValueError("either texts or document must be provided")
+        if values.texts is None and values.document is None and not values.corpus_id:
+            raise ValueError("one of texts, document or corpus_id must be provided")
         return values
 
 
@@ -62,3 +117,77 @@ class CompressResponse(BaseModel):
     selection_scores: list[float] | None = None
     kept_texts: list[str] | None = None
     meta: dict[str, Any] = Field(default_factory=dict)
+
+
+class CompressBatchRequest(BaseModel):
+    requests: list[CompressRequest] = Field(
+        min_length=1, description="Independent compression jobs to run together"
+    )
+
+
+class CompressBatchError(BaseModel):
+    """A batch job that failed; its siblings still return their results."""
+
+    status: int = Field(description="HTTP status the job would have returned alone")
+    detail: Any = Field(description="Error detail, as for a single /compress call")
+
+
+class CompressBatchResponse(BaseModel):
+    results: list[CompressResponse | CompressBatchError]
+
+
+class CorpusCreateRequest(DocumentPayload):
+    """Chunk and embed a document set once for repeated selection."""
+
+
+class CorpusUpdateRequest(BaseModel):
+    document: str | None = Field(
+        default=None,
+        description="New full document; only the part after the edit is re-chunked",
+    )
+    append: str | None = Field(
+        default=None, description="Text appended to the stored document"
+    )
+    texts: list[str] | None = Field(
+        default=None, description="Chunks appended to a corpus built from texts"
+    )
+
+    @model_validator(mode="after")
+    @classmethod
+    def _ensure_single_update(
+        cls, values: "CorpusUpdateRequest"
+    ) -> "CorpusUpdateRequest":
+        provided = [
+            name
+            for name in ("document", "append", "texts")
+            if getattr(values, name) is not None
+        ]
+        if len(provided) != 1:
+            raise ValueError("exactly one of document, append or texts is required")
+        return values
+
+
+class CorpusInfo(BaseModel):
+    corpus_id: str
+    model: str
+    backend: str | None = None
+    chunking_strategy: str | None = None
+    chunk_count: int
+    dim: int
+    created_at: float
+    revision: int = 0
+    embedding_bytes: int
+    text_bytes: int
+    total_bytes: int
+    loaded: bool
+
+
+class CorpusUpdateResponse(CorpusInfo):
+    kept_chunks: int
+    reused_chunks: int
+    embedded_chunks: int
+
+
+class CorpusListResponse(BaseModel):
+    corpora: list[CorpusInfo]
+    total_bytes: int
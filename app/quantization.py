@@ -0,0 +1,129 @@
+"""Compact embedding storage: float16, int8 with per-row scales, truncated dims."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import numpy as np
+
+__all__ = [
+    "EMBEDDING_DTYPES",
+    "QuantizedMatrix",
+    "quantize_rows",
+    "truncate_dim",
+]
+
+EMBEDDING_DTYPES = ("float32", "float16", "int8")
+
+
+def _unit_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def truncate_dim(matrix: np.ndarray, dim: int) -> np.ndarray:
+    """Keep the leading ``dim`` components and re-normalize (Matryoshka-style).
+
+    Only meaningful for models trained so that prefixes remain good embeddings;
+    ``dim <= 0`` or a ``dim`` at least the model width returns ``matrix`` as is.
+    """
+    if dim <= 0 or matrix.ndim != 2 or dim >= matrix.shape[1]:
+        return matrix
+    return _unit_rows(matrix[:, :dim])
+
+
+def quantize_rows(
+    matrix: np.ndarray, dtype: str
+) -> tuple[np.ndarray, np.ndarray | None]:
+    """Return unit-length rows as ``dtype`` plus per-row scales for ``int8``."""
+    if dtype not in EMBEDDING_DTYPES:
+        raise ValueError(f"Unsupported embedding dtype: {dtype}")
+    if dtype == "float32":
+        return np.ascontiguousarray(matrix, dtype=np.float32), None
+    rows = _unit_rows(matrix)
+    if dtype == "float16":
+        return rows.astype(np.float16), None
+    scales = np.abs(rows).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    data = np.rint(rows / scales[:, None]).astype(np.int8)
+    return data, scales.astype(np.float32)
+
+
+class QuantizedMatrix:
+    """Read-only matrix of unit-length embeddings kept in a compact dtype.
+
+    ``data`` holds ``float16`` rows, or ``int8`` rows that are multiplied by
+    ``scales``. Products and means are computed ``block_rows`` rows at a time
+    in float32, so a full-precision copy of the matrix is never materialized.
+    ``data`` and ``scales`` may be memory-mapped.
+    """
+
+    def __init__(
+        self,
+        data: np.ndarray,
+        scales: np.ndarray | None = None,
+        block_rows: int = 4096,
+    ) -> None:
+        if data.dtype == np.int8 and scales is None:
+            raise ValueError("int8 rows require per-row scales")
+        self.data = data
+        self.scales = scales
+        self.block_rows = block_rows
+
+    @classmethod
+    def from_array(cls, matrix: np.ndarray, dtype: str) -> QuantizedMatrix:
+        data, scales = quantize_rows(matrix, dtype)
+        return cls(data, scales)
+
+    @property
+    def shape(self) -> tuple[int, ...]:
+        return self.data.shape
+
+    @property
+    def size(self) -> int:
+        return self.data.size
+
+    @property
+    def nbytes(self) -> int:
+        scales = self.scales.nbytes if self.scales is not None else 0
+        return self.data.nbytes + scales
+
+    def __len__(self) -> int:
+        return self.data.shape[0]
+
+    def _dequantize(self, start: int, stop: int) -> np.ndarray:
+        rows = self.data[start:stop].astype(np.float32)
+        if self.scales is not None:
+            rows *= self.scales[start:stop, None]
+        return rows
+
+    def __getitem__(self, key: Any) -> Any:
+        if isinstance(key, (int, np.integer)):
+            index = int(key) % len(self)
+            return self._dequantize(index, index + 1)[0]
+        scales = self.scales[key] if self.scales is not None else None
+        return QuantizedMatrix(self.data[key], scales, self.block_rows)
+
+    def dot(self, vector: np.ndarray) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        out = np.empty(len(self), dtype=np.float32)
+        buffer = np.empty((min(self.block_rows, len(self)), self.shape[1]), np.float32)
+        for start in range(0, len(self), self.block_rows):
+            block = self.data[start : start + self.block_rows]
+            rows = buffer[: block.shape[0]]
+            np.copyto(rows, block)
+            rows.dot(vector, out=out[start : start + block.shape[0]])
+        if self.scales is not None:  # scale the products rather than every row
+            out *= self.scales
+        return out
+
+    def mean(self) -> np.ndarray:
+        total = np.zeros(self.shape[1], dtype=np.float64)
+        for start in range(0, len(self), self.block_rows):
+            total += self._dequantize(start, start + self.block_rows).sum(axis=0)
+        return (total / max(len(self), 1)).astype(np.float32)
+
+    def to_array(self) -> np.ndarray:
+        return self._dequantize(0, len(self))
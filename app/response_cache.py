@@ -0,0 +1,163 @@
+"""Cache of complete compression responses keyed by the normalized request."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Protocol
+
+from .prompts import LOSSLESSISH_PROMPT, TASK_PROMPT
+
+__all__ = [
+    "PROMPT_VERSION",
+    "CacheBackend",
+    "ResponseCache",
+    "SQLiteCacheBackend",
+    "stable_hash",
+]
+
+PROMPT_VERSION = hashlib.sha256(
+    (LOSSLESSISH_PROMPT + "\0" + TASK_PROMPT).encode("utf-8")
+).hexdigest()[:16]
+
+
+def stable_hash(payload: Any) -> str:
+    """Hash a JSON-serializable payload independently of key order."""
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class CacheBackend(Protocol):
+    """Shared second tier consulted after the in-process LRU misses.
+
+    ``get`` returns the value with its remaining time to live in seconds.
+    """
+
+    def get(self, key: str) -> tuple[bytes, float] | None: ...
+
+    def set(self, key: str, value: bytes, ttl: float) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class SQLiteCacheBackend:
+    """``CacheBackend`` stored in a local SQLite file (or ``:memory:``)."""
+
+    def __init__(self, path: str | os.PathLike[str]) -> None:
+        self._connection = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> tuple[bytes, float] | None:
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT value, expires_at FROM responses "
+                "WHERE key = ? AND expires_at > ?",
+                (key, now),
+            ).fetchone()
+        return (bytes(row[0]), row[1] - now) if row is not None else None
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, value, expires_at) "
+                "VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl),
+            )
+            self._connection.execute(
+                "DELETE FROM responses WHERE expires_at <= ?", (time.time(),)
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class ResponseCache:
+    """TTL + byte-bounded LRU of serialized responses with an optional backend."""
+
+    def __init__(
+        self,
+        max_bytes: int,
+        ttl: float,
+        backend: CacheBackend | None = None,
+    ) -> None:
+        self.max_bytes = max(max_bytes, 0)
+        self.ttl = ttl
+        self.backend = backend
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _drop(self, key: str) -> None:
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+    def _remember(self, key: str, value: bytes, expires_at: float) -> None:
+        if key in self._entries:
+            self._drop(key)
+        if len(value) > self.max_bytes:
+            return
+        self._entries[key] = (expires_at, value)
+        self._bytes += len(value)
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._drop(oldest)
+            self.evictions += 1
+
+    def get(self, key: str) -> bytes | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._drop(key)
+
+        shared = self.backend.get(key) if self.backend is not None else None
+        with self._lock:
+            if shared is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            value, remaining = shared
+            # Expire locally when the shared entry does, not a full TTL later.
+            self._remember(key, value, now + min(remaining, self.ttl))
+        return value
+
+    def set(self, key: str, value: bytes) -> None:
+        with self._lock:
+            self._remember(key, value, time.monotonic() + self.ttl)
+        if self.backend is not None:
+            self.backend.set(key, value, self.ttl)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def close(self) -> None:
+        if self.backend is not None:
+            self.backend.close()
@@ -0,0 +1,260 @@
+"""Load balancing across replicas of an OpenAI-compatible backend."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections.abc import AsyncIterator, Callable, Sequence
+from contextlib import asynccontextmanager
+
+import httpx
+
+from .metrics import ENDPOINT_SECONDS
+
+__all__ = ["Endpoint", "EndpointRouter", "NoEndpointAvailable", "parse_endpoints"]
+
+logger = logging.getLogger(__name__)
+
+
+def parse_endpoints(spec: str) -> list[tuple[str, float]]:
+    """Parse ``"URL [WEIGHT], URL [WEIGHT], ..."`` into ``(url, weight)`` pairs."""
+
+    endpoints = []
+    for entry in spec.split(","):
+        parts = entry.split()
+        if not parts:
+            continue
+        if len(parts) > 2:
+            raise ValueError(f"Invalid backend endpoint: {entry.strip()!r}")
+        weight = float(parts[1]) if len(parts) == 2 else 1.0
+        if weight <= 0:
+            raise ValueError(f"Endpoint weight must be positive: {entry.strip()!r}")
+        endpoints.append((parts[0].rstrip("/"), weight))
+    return endpoints
+
+
+class NoEndpointAvailable(Exception):
+    """Every endpoint has already been tried for this call."""
+
+
+class Endpoint:
+    """One backend replica with its own connection pool and health state."""
+
+    def __init__(self, url: str, weight: float = 1.0) -> None:
+        self.url = url
+        self.weight = weight
+        self.client: httpx.AsyncClient | None = None
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.failures = 0  # consecutive, reset by a success
+        self.ejections = 0
+        self.ejected_until = 0.0
+        self.latency: float | None = None  # EWMA of successful calls
+
+    def ejected(self, now: float) -> bool:
+        return now < self.ejected_until
+
+    def load(self) -> tuple[float, float]:
+        """Sort key: outstanding calls per unit weight, then calls served."""
+
+        return ((self.outstanding + 1) / self.weight, self.requests / self.weight)
+
+    def stats(self) -> dict[str, object]:
+        now = time.monotonic()
+        return {
+            "url": self.url,
+            "weight": self.weight,
+            "healthy": not self.ejected(now),
+            "outstanding": self.outstanding,
+            "requests": self.requests,
+            "errors": self.errors,
+            "ejections": self.ejections,
+            "ejected_for": round(max(self.ejected_until - now, 0.0), 3),
+            "latency": round(self.latency or 0.0, 6),
+        }
+
+
+class EndpointRouter:
+    """Route calls to the least loaded healthy endpoint, relative to its weight.
+
+    A call that fails with a transport error (including timeouts), a 5xx or a
+    429 is retried on another endpoint up to ``retries`` times. Callers only
+    retry calls that are safe to repeat, e.g. a completion that has not yet
+    streamed anything to the client.
+
+    An endpoint is ejected for ``eject_seconds`` after ``max_failures``
+    consecutive transport errors or 5xx responses (``0`` disables passive
+    ejection). With ``health_check_interval`` an endpoint is also ejected when
+    ``GET health_check_path`` fails, and readmitted as soon as it succeeds.
+    If every endpoint is ejected, calls go to the one due back first rather
+    than failing outright.
+    """
+
+    def __init__(
+        self,
+        endpoints: Sequence[tuple[str, float]],
+        client_factory: Callable[[str], httpx.AsyncClient],
+        *,
+        retries: int = 1,
+        max_failures: int = 3,
+        eject_seconds: float = 30.0,
+        health_check_interval: float = 0.0,
+        health_check_path: str = "/models",
+    ) -> None:
+        if not endpoints:
+            raise ValueError("At least one backend endpoint is required")
+        self.endpoints = [Endpoint(url, weight) for url, weight in endpoints]
+        self.client_factory = client_factory
+        self.retries = max(retries, 0)
+        self.max_failures = max_failures
+        self.eject_seconds = eject_seconds
+        self.health_check_interval = health_check_interval
+        self.health_check_path = health_check_path
+        self._health_task: asyncio.Task[None] | None = None
+
+    def client(self, endpoint: Endpoint) -> httpx.AsyncClient:
+        """Return the endpoint's pooled client, creating it on first use."""
+
+        if endpoint.client is None:
+            endpoint.client = self.client_factory(endpoint.url)
+        return endpoint.client
+
+    def pick(self, exclude: Sequence[Endpoint] = ()) -> Endpoint:
+        candidates = [e for e in self.endpoints if e not in exclude]
+        if not candidates:
+            raise NoEndpointAvailable("All backend endpoints were tried")
+        now = time.monotonic()
+        healthy = [e for e in candidates if not e.ejected(now)]
+        if not healthy:
+            return min(candidates, key=lambda e: e.ejected_until)
+        return min(healthy, key=Endpoint.load)
+
+    @asynccontextmanager
+    async def use(self, tried: list[Endpoint]) -> AsyncIterator[httpx.AsyncClient]:
+        """Hold an endpoint for the ``async with`` block and record the outcome.
+
+        The chosen endpoint is appended to ``tried`` so a retry goes elsewhere.
+        """
+
+        self._start_health_checks()
+        endpoint = self.pick(tried)
+        tried.append(endpoint)
+        endpoint.outstanding += 1
+        started = time.perf_counter()
+        try:
+            yield self.client(endpoint)
+        except Exception as exc:
+            self._record(endpoint, time.perf_counter() - started, exc)
+            raise
+        else:
+            self._record(endpoint, time.perf_counter() - started, None)
+        finally:
+            endpoint.outstanding -= 1
+
+    def should_retry(self, exc: BaseException, tried: Sequence[Endpoint]) -> bool:
+        return (
+            self._retryable(exc)
+            and len(tried) <= self.retries
+            and len(tried) < len(self.endpoints)
+        )
+
+    async def request(self, method: str, url: str, **kwargs: object) -> httpx.Response:
+        """Send a repeatable request, retrying failures on other endpoints."""
+
+        tried: list[Endpoint] = []
+        while True:
+            try:
+                async with self.use(tried) as client:
+                    response = await client.request(method, url, **kwargs)  # type: ignore[arg-type]
+                    response.raise_for_status()
+                    return response
+            except Exception as exc:
+                if not self.should_retry(exc, tried):
+                    raise
+                logger.warning("retrying on another endpoint after %r", exc)
+
+    @staticmethod
+    def _unhealthy(exc: BaseException) -> bool:
+        """Errors that say something about the endpoint rather than the call."""
+
+        if isinstance(exc, httpx.HTTPStatusError):
+            return exc.response.status_code >= 500
+        return isinstance(exc, httpx.TransportError)
+
+    @classmethod
+    def _retryable(cls, exc: BaseException) -> bool:
+        if isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code == 429:
+            return True
+        return cls._unhealthy(exc)
+
+    def _record(
+        self, endpoint: Endpoint, latency: float, exc: BaseException | None
+    ) -> None:
+        endpoint.requests += 1
+        ENDPOINT_SECONDS.observe(
+            latency, endpoint=endpoint.url, outcome="ok" if exc is None else "error"
+        )
+        if exc is None:
+            endpoint.latency = (
+                latency
+                if endpoint.latency is None
+                else 0.8 * endpoint.latency + 0.2 * latency
+            )
+        else:
+            endpoint.errors += 1
+        if exc is None or not self._unhealthy(exc):
+            # The endpoint answered; a 4xx is the call's fault, not its own.
+            endpoint.failures = 0
+            return
+        endpoint.failures += 1
+        if self.max_failures > 0 and endpoint.failures >= self.max_failures:
+            self._eject(endpoint, f"{endpoint.failures} consecutive failures")
+
+    def _eject(self, endpoint: Endpoint, reason: str) -> None:
+        if not endpoint.ejected(time.monotonic()):
+            endpoint.ejections += 1
+            logger.warning("ejecting backend %s: %s", endpoint.url, reason)
+        endpoint.failures = 0
+        endpoint.ejected_until = time.monotonic() + self.eject_seconds
+
+    async def check_health(self) -> None:
+        """Probe every endpoint once, ejecting or readmitting it."""
+
+        async def probe(endpoint: Endpoint) -> None:
+            try:
+                response = await self.client(endpoint).get(self.health_check_path)
+                response.raise_for_status()
+            except Exception as exc:
+                self._eject(endpoint, f"health check failed: {exc!r}")
+            else:
+                endpoint.failures = 0
+                endpoint.ejected_until = 0.0
+
+        await asyncio.gather(*[probe(endpoint) for endpoint in self.endpoints])
+
+    def _start_health_checks(self) -> None:
+        if self.health_check_interval <= 0 or self._health_task is not None:
+            return
+        self._health_task = asyncio.get_running_loop().create_task(self._health_loop())
+
+    async def _health_loop(self) -> None:
+        while True:
+            await self.check_health()
+            await asyncio.sleep(self.health_check_interval)
+
+    def stats(self) -> list[dict[str, object]]:
+        return [endpoint.stats() for endpoint in self.endpoints]
+
+    async def aclose(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._health_task
+            self._health_task = None
+        for endpoint in self.endpoints:
+            if endpoint.client is not None:
+                await endpoint.client.aclose()
+                endpoint.client = None
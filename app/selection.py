@@ -2,16 +2,48 @@
 
 from __future__ import annotations
 
+import asyncio
+import logging
+import queue
+import threading
+import time
+from collections.abc import Callable, Sequence
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Any, Protocol
+
 import numpy as np
 
-try:
-    from sentence_transformers import SentenceTransformer  # type: ignore
-except Exception:  # pragma: no cover - optional dependency
-    SentenceTransformer = None  # type: ignore
+from .chunking import count_tokens, split_sentences
+from .embedding_cache import EmbeddingCache
+from .lazy import UNRESOLVED, resolve
+from .metrics import timed
+from .quantization import QuantizedMatrix, truncate_dim
+from .singleflight import SingleFlight
+
+# Optional dependencies, imported on first use (torch alone takes seconds).
+SentenceTransformer: Any = UNRESOLVED
+onnxruntime: Any = UNRESOLVED
+Tokenizer: Any = UNRESOLVED
+
+
+def _sentence_transformer() -> Any:
+    return resolve(
+        globals(), "SentenceTransformer", "sentence_transformers", "SentenceTransformer"
+    )
+
+
+EMBEDDING_BACKENDS = ("auto", "onnx", "sentence-transformers", "fallback")
+
+logger = logging.getLogger(__name__)
 
 
-def _cosine_similarity(matrix: np.ndarray, vector: np.ndarray) -> np.ndarray:
+def _cosine_similarity(
+    matrix: np.ndarray | QuantizedMatrix, vector: np.ndarray
+) -> np.ndarray:
     """Compute cosine similarity between each row of matrix and a vector."""
+    if isinstance(matrix, QuantizedMatrix):  # rows are stored unit-length
+        return matrix.dot(vector) / (np.linalg.norm(vector) or 1.0)
     matrix_norms = np.linalg.norm(matrix, axis=1, keepdims=True)
     vector_norm = np.linalg.norm(vector)
     matrix_norms[matrix_norms == 0] = 1.0
@@ -20,21 +52,444 @@ def _cosine_similarity(matrix: np.ndarray, vector: np.ndarray) -> np.ndarray:
     return matrix.dot(vector) / (matrix_norms.flatten() * vector_norm)
 
 
+def _normalize_rows(
+    matrix: np.ndarray | QuantizedMatrix,
+) -> np.ndarray | QuantizedMatrix:
+    """Scale each row of ``matrix`` to unit length, leaving zero rows untouched."""
+    if isinstance(matrix, QuantizedMatrix):
+        return matrix
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _mean_rows(matrix: np.ndarray | QuantizedMatrix) -> np.ndarray:
+    if isinstance(matrix, QuantizedMatrix):
+        return matrix.mean()
+    return np.mean(matrix, axis=0)
+
+
+def _top_candidates(
+    embeddings: np.ndarray | QuantizedMatrix,
+    query_vec: np.ndarray,
+    m: int,
+    block_rows: int = 8192,
+) -> np.ndarray:
+    """Return the sorted indices of the ``m`` rows most similar to ``query_vec``.
+
+    Exact retrieval computed block by block, so only ``block_rows`` similarities
+    plus the running top-``m`` are held at once.
+    """
+    best_indices = np.empty(0, dtype=np.int64)
+    best_sims = np.empty(0, dtype=np.float64)
+    for start in range(0, embeddings.shape[0], block_rows):
+        sims = _cosine_similarity(embeddings[start : start + block_rows], query_vec)
+        best_sims = np.concatenate((best_sims, sims))
+        best_indices = np.concatenate((
+            best_indices,
+            np.arange(start, start + sims.shape[0], dtype=np.int64),
+        ))
+        if best_sims.shape[0] > m:
+            keep = np.argpartition(-best_sims, m - 1)[:m]
+            best_sims, best_indices = best_sims[keep], best_indices[keep]
+    return np.sort(best_indices)
+
+
+class EmbeddingBatcher:
+    """Coalesce concurrent encode calls into one batch within a short wait window.
+
+    A single worker thread gathers requests for up to ``max_wait`` seconds (or
+    ``max_batch`` texts), encodes them in one call and fans the rows back out
+    in order. ``encode`` blocks the calling thread meanwhile; ``aencode`` waits
+    on the event loop instead, so the number of requests that can share a
+    batch is not capped by a thread pool.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[list[str]], np.ndarray],
+        max_wait: float,
+        max_batch: int,
+    ) -> None:
+        self._encode = encode
+        self.max_wait = max(max_wait, 0.0)
+        self.max_batch = max(max_batch, 1)
+        self._queue: queue.Queue[tuple[list[str], Future] | None] = queue.Queue()
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.texts = 0
+        self._thread = threading.Thread(
+            target=self._run, name="embedding-batcher", daemon=True
+        )
+        self._thread.start()
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return self._encode(texts)
+        future: Future[np.ndarray] = Future()
+        self._queue.put((list(texts), future))
+        return future.result()
+
+    async def aencode(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return self._encode(texts)
+        future: Future[np.ndarray] = Future()
+        self._queue.put((list(texts), future))
+        return await asyncio.wrap_future(future)
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            pending = [item]
+            size = len(item[0])
+            deadline = time.monotonic() + self.max_wait
+            stopping = False
+            while size < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                pending.append(item)
+                size += len(item[0])
+            self._flush(pending)
+            if stopping:
+                return
+
+    def _flush(self, pending: list[tuple[list[str], Future]]) -> None:
+        # Drop callers that were cancelled while waiting (see ``aencode``).
+        pending = [item for item in pending if item[1].set_running_or_notify_cancel()]
+        if not pending:
+            return
+        texts = [text for batch, _ in pending for text in batch]
+        try:
+            vectors = np.asarray(self._encode(texts))
+        except Exception as exc:
+            for _, future in pending:
+                future.set_exception(exc)
+            return
+        offset = 0
+        for batch, future in pending:
+            future.set_result(vectors[offset : offset + len(batch)])
+            offset += len(batch)
+        with self._lock:
+            self.requests += len(pending)
+            self.batches += 1
+            self.texts += len(texts)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "texts": self.texts,
+            }
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+
+def _length_buckets(lengths: np.ndarray, max_tokens: int) -> list[np.ndarray]:
+    """Group indices sorted by length into batches of at most ``max_tokens``.
+
+    The cost of a batch is its row count times its longest row, i.e. the
+    tokens after padding; ``max_tokens <= 0`` yields one sorted batch. A row
+    longer than ``max_tokens`` gets a batch of its own.
+    """
+    order = np.argsort(lengths, kind="stable")
+    if max_tokens <= 0:
+        return [order] if len(order) else []
+    buckets: list[np.ndarray] = []
+    start = 0
+    for end in range(1, len(order) + 1):
+        # Sorted ascending, so the next row decides the padded width.
+        if end == len(order) or (end + 1 - start) * lengths[order[end]] > max_tokens:
+            buckets.append(order[start:end])
+            start = end
+    return buckets
+
+
+class EmbeddingBackend(Protocol):
+    """Encodes a batch of texts into a ``(len(texts), dim)`` matrix.
+
+    Backends may define ``cache_id``, naming what produces their vectors; it
+    is part of the embedding cache namespace, so vectors from different
+    backends for the same model are never mixed.
+    """
+
+    def encode(self, texts: list[str]) -> np.ndarray: ...
+
+
+def backend_cache_id(backend: EmbeddingBackend) -> str:
+    return getattr(backend, "cache_id", None) or type(backend).__name__
+
+
+class SentenceTransformerBackend:
+    """PyTorch ``SentenceTransformer`` encoder with normalized outputs."""
+
+    cache_id = "sentence-transformers"
+
+    def __init__(self, model_name: str) -> None:
+        model_class = _sentence_transformer()
+        if model_class is None:
+            raise RuntimeError("sentence-transformers is not installed")
+        self.model = model_class(model_name)
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        return np.array(self.model.encode(texts, normalize_embeddings=True))
+
+
+class FallbackBackend:
+    """Dependency-free letter-histogram embeddings for tests and offline runs."""
+
+    cache_id = "fallback"
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        embeddings = [Selector._fallback_embed(text) for text in texts]
+        return np.stack(embeddings, axis=0) if embeddings else np.zeros((0, 26))
+
+
+class OnnxEmbeddingBackend:
+    """ONNX Runtime encoder for an exported (optionally quantized) model.
+
+    Texts are tokenized once, sorted by length and packed into batches of at
+    most ``max_batch_tokens`` padded tokens, so each batch pads only to its own
+    longest text. Outputs are pooled (``cls`` or ``mean``), normalized and
+    returned in input order.
+    """
+
+    # Buckets by exact token counts itself, so Selector passes whole batches.
+    length_bucketed = True
+
+    def __init__(
+        self,
+        session: Any,
+        tokenizer: Any,
+        max_batch_tokens: int = 8192,
+        pooling: str = "cls",
+    ) -> None:
+        if pooling not in ("cls", "mean"):
+            raise ValueError(f"Unsupported pooling: {pooling}")
+        self.session = session
+        self.tokenizer = tokenizer
+        self.max_batch_tokens = max_batch_tokens
+        self.pooling = pooling
+        self.input_names = {node.name for node in session.get_inputs()}
+        self.dim = 0
+        self.cache_id = f"onnx:{pooling}"
+
+    @classmethod
+    def from_path(
+        cls,
+        path: str,
+        threads: int = 0,
+        max_length: int = 512,
+        max_batch_tokens: int = 8192,
+        pooling: str = "cls",
+    ) -> OnnxEmbeddingBackend:
+        """Load ``model.onnx`` and ``tokenizer.json`` from ``path``.
+
+        ``path`` may also point at the ``.onnx`` file itself, with the tokenizer
+        next to it. ``threads`` sets ONNX Runtime's intra-op thread count.
+        """
+        ort = resolve(globals(), "onnxruntime", "onnxruntime")
+        tokenizer_class = resolve(globals(), "Tokenizer", "tokenizers", "Tokenizer")
+        if ort is None or tokenizer_class is None:
+            raise RuntimeError("onnxruntime and tokenizers are required for ONNX")
+        model = Path(path)
+        if model.is_dir():
+            model = model / "model.onnx"
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+        session = ort.InferenceSession(
+            str(model), sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        tokenizer = tokenizer_class.from_file(str(model.parent / "tokenizer.json"))
+        tokenizer.enable_truncation(max_length)
+        backend = cls(session, tokenizer, max_batch_tokens, pooling)
+        backend.cache_id = f"onnx:{model.resolve()}:{pooling}:{max_length}"
+        return backend
+
+    def _pool(self, hidden: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        if hidden.ndim == 2:  # model already pools
+            return hidden
+        if self.pooling == "cls":
+            return hidden[:, 0]
+        weights = mask[:, :, None].astype(hidden.dtype)
+        return (hidden * weights).sum(axis=1) / np.maximum(weights.sum(axis=1), 1)
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        encodings = self.tokenizer.encode_batch(texts)
+        lengths = np.array([len(encoding.ids) for encoding in encodings])
+        output: np.ndarray | None = None
+        for batch in _length_buckets(lengths, self.max_batch_tokens):
+            width = int(lengths[batch].max())
+            ids = np.zeros((len(batch), width), dtype=np.int64)
+            mask = np.zeros((len(batch), width), dtype=np.int64)
+            for row, index in enumerate(batch):
+                ids[row, : lengths[index]] = encodings[index].ids
+                mask[row, : lengths[index]] = 1
+            feeds = {"input_ids": ids, "attention_mask": mask}
+            if "token_type_ids" in self.input_names:
+                feeds["token_type_ids"] = np.zeros_like(ids)
+            pooled = self._pool(self.session.run(None, feeds)[0], mask)
+            if output is None:
+                output = np.empty((len(texts), pooled.shape[1]), dtype=np.float32)
+            output[batch] = pooled
+        assert output is not None
+        self.dim = output.shape[1]
+        norms = np.linalg.norm(output, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return output / norms
+
+
+def load_embedding_backend(
+    name: str,
+    model_name: str,
+    onnx_path: str | None = None,
+    **onnx_options: Any,
+) -> EmbeddingBackend:
+    """Build the configured backend, falling back ONNX -> PyTorch -> letters.
+
+    An explicitly requested backend that cannot be loaded raises; ``auto``
+    logs the failure and moves on to the next option.
+    """
+    if name not in EMBEDDING_BACKENDS:
+        raise ValueError(f"Unsupported embedding backend: {name}")
+    if name in ("auto", "onnx") and onnx_path:
+        try:
+            return OnnxEmbeddingBackend.from_path(onnx_path, **onnx_options)
+        except Exception:
+            if name == "onnx":
+                raise
+            logger.warning("ONNX embedding backend unavailable", exc_info=True)
+    elif name == "onnx":
+        raise ValueError("the onnx embedding backend requires EMBEDDING_ONNX_PATH")
+    if name in ("auto", "sentence-transformers") and (
+        name == "sentence-transformers" or _sentence_transformer() is not None
+    ):
+        return SentenceTransformerBackend(model_name)
+    return FallbackBackend()
+
+
+class EmbeddingDimensionMismatch(ValueError):
+    """Precomputed embeddings do not match the vectors this selector produces."""
+
+
 class Selector:
     """Select representative text chunks using MMR."""
 
-    def __init__(self, model_name: str):
+    def __init__(
+        self,
+        model_name: str,
+        cache: EmbeddingCache | None = None,
+        batch_wait_ms: float = 0.0,
+        max_batch_size: int = 256,
+        candidate_pool: int = 0,
+        embedding_dim: int = 0,
+        backend: EmbeddingBackend | None = None,
+        max_batch_tokens: int = 0,
+    ):
         self.model_name = model_name
-        self.model = (
-            SentenceTransformer(model_name) if SentenceTransformer is not None else None
+        self.candidate_pool = candidate_pool
+        self.max_batch_tokens = max_batch_tokens
+        self.embedding_dim = embedding_dim
+        self.cache = cache
+        self.inflight = SingleFlight()
+        self.backend = backend or load_embedding_backend("auto", model_name)
+        self._backend_id: str | None = None
+        self._cache_namespace: str | None = None
+        self.batcher = (
+            EmbeddingBatcher(self._encode_batch, batch_wait_ms / 1000, max_batch_size)
+            if batch_wait_ms > 0
+            else None
         )
 
     def embed(self, texts: list[str]) -> np.ndarray:
-        if self.model is not None:
-            return np.array(self.model.encode(texts, normalize_embeddings=True))
+        """Embed ``texts``; identical concurrent calls share one computation."""
+        with timed("embedding"):
+            return self.inflight.do(tuple(texts), lambda: self._embed(texts))
 
-        embeddings = [self._fallback_embed(text) for text in texts]
-        return np.stack(embeddings, axis=0) if embeddings else np.zeros((0, 26))
+    async def aembed(self, texts: list[str]) -> np.ndarray:
+        """Embed ``texts`` from the event loop through the micro-batcher.
+
+        Waiting for the batch window holds no thread, so any number of
+        concurrent requests can share one encode call.
+        """
+        if self.batcher is None:
+            raise RuntimeError("aembed requires the embedding micro-batcher")
+        with timed("embedding"):
+            if self.cache is not None:
+                return await self.cache.aget_or_compute(
+                    self._namespace(), texts, self.batcher.aencode
+                )
+            return await self.batcher.aencode(texts)
+
+    def _embed(self, texts: list[str]) -> np.ndarray:
+        if self.cache is not None:
+            return self.cache.get_or_compute(self._namespace(), texts, self._encode)
+        return self._encode(texts)
+
+    @property
+    def backend_id(self) -> str:
+        """``backend_cache_id`` of the loaded backend, looked up once."""
+        if self._backend_id is None:
+            self._backend_id = backend_cache_id(self.backend)
+        return self._backend_id
+
+    def _namespace(self) -> str:
+        """Cache namespace: model, the backend that actually loaded, and dim."""
+        if self._cache_namespace is None:
+            namespace = f"{self.model_name}[{self.backend_id}]"
+            if self.embedding_dim > 0:
+                namespace = f"{namespace}@{self.embedding_dim}"
+            self._cache_namespace = namespace
+        return self._cache_namespace
+
+    def _encode(self, texts: list[str]) -> np.ndarray:
+        if self.batcher is not None:
+            return self.batcher.encode(texts)
+        return self._encode_batch(texts)
+
+    def _encode_batch(self, texts: list[str]) -> np.ndarray:
+        if (
+            self.max_batch_tokens <= 0
+            or len(texts) < 2
+            or getattr(self.backend, "length_bucketed", False)
+        ):
+            embeddings = np.asarray(self.backend.encode(texts))
+        else:
+            embeddings = self._encode_bucketed(texts)
+        return truncate_dim(embeddings, self.embedding_dim)
+
+    def _encode_bucketed(self, texts: list[str]) -> np.ndarray:
+        """Encode length-sorted buckets of ``max_batch_tokens`` padded tokens.
+
+        For backends that pad a whole call to its longest text, a few long
+        chunks otherwise make every short text pay for their length.
+        """
+        lengths = np.array([max(count_tokens(text), 1) for text in texts])
+        output: np.ndarray | None = None
+        for bucket in _length_buckets(lengths, self.max_batch_tokens):
+            rows = np.asarray(self.backend.encode([texts[i] for i in bucket]))
+            if output is None:
+                output = np.empty((len(texts), rows.shape[1]), dtype=rows.dtype)
+            output[bucket] = rows
+        assert output is not None
+        return output
 
     @staticmethod
     def _fallback_embed(text: str) -> np.ndarray:
@@ -48,38 +503,87 @@ class Selector:
         return vec
 
     def mmr(
-        self, embeddings: np.ndarray, query_vec: np.ndarray, k: int, lam: float
+        self,
+        embeddings: np.ndarray | QuantizedMatrix,
+        query_vec: np.ndarray,
+        k: int,
+        lam: float,
     ) -> list[int]:
+        """Greedy MMR that keeps a running max-similarity-to-selected vector.
+
+        Each pick costs a single matrix-vector product against the newly selected
+        row instead of re-scoring every candidate against the full selected set.
+        """
         n = embeddings.shape[0]
         if k >= n:
             return list(range(n))
 
+        normalized = _normalize_rows(embeddings)
         sims_to_query = _cosine_similarity(embeddings, query_vec)
 
-        selected = []
-        candidates = list(range(n))
         first = int(np.argmax(sims_to_query))
-        selected.append(first)
-        candidates.remove(first)
-
-        while len(selected) < k and candidates:
-            best_candidate = None
-            best_score = -np.inf
-            for candidate in candidates:
-                relevance = sims_to_query[candidate]
-                if selected:
-                    selected_matrix = embeddings[selected]
-                    diversity = _cosine_similarity(
-                        selected_matrix, embeddings[candidate]
-                    ).max()
-                else:
-                    diversity = 0.0
-                score = lam * relevance - (1 - lam) * diversity
-                if score > best_score:
-                    best_score = score
-                    best_candidate = candidate
-            selected.append(best_candidate)  # type: ignore[arg-type]
-            candidates.remove(best_candidate)  # type: ignore[arg-type]
+        selected = [first]
+        available = np.ones(n, dtype=bool)
+        available[first] = False
+        max_sim_to_selected = normalized.dot(normalized[first])
+
+        relevance = lam * sims_to_query
+        while len(selected) < k:
+            scores = relevance - (1 - lam) * max_sim_to_selected
+            scores[~available] = -np.inf
+            best = int(np.argmax(scores))
+            selected.append(best)
+            available[best] = False
+            np.maximum(
+                max_sim_to_selected,
+                normalized.dot(normalized[best]),
+                out=max_sim_to_selected,
+            )
+        return selected
+
+    def mmr_budget(
+        self,
+        embeddings: np.ndarray | QuantizedMatrix,
+        query_vec: np.ndarray,
+        costs: Sequence[int],
+        budget: int,
+        lam: float,
+    ) -> list[int]:
+        """Knapsack-style MMR: fill a token budget instead of picking ``k`` rows.
+
+        Each pick is the best MMR score among the chunks that still fit in the
+        remaining budget, so once a large chunk no longer fits, smaller ones can
+        fill the gap. Stops when nothing fits; if no chunk fits at all, the most
+        relevant one is returned so the caller never gets an empty selection.
+        """
+        n = embeddings.shape[0]
+        costs = np.asarray(costs, dtype=np.int64)
+        normalized = _normalize_rows(embeddings)
+        sims_to_query = _cosine_similarity(embeddings, query_vec)
+        if not np.any(costs <= budget):
+            return [int(np.argmax(sims_to_query))] if n else []
+
+        relevance = lam * sims_to_query
+        max_sim_to_selected = np.zeros(n)
+        available = costs <= budget
+        remaining = budget
+        selected: list[int] = []
+        while available.any():
+            if selected:
+                scores = relevance - (1 - lam) * max_sim_to_selected
+            else:
+                scores = sims_to_query.copy()
+            scores[~available] = -np.inf
+            best = int(np.argmax(scores))
+            selected.append(best)
+            remaining -= int(costs[best])
+            available[best] = False
+            available &= costs <= remaining
+            np.maximum(
+                max_sim_to_selected,
+                normalized.dot(normalized[best]),
+                out=max_sim_to_selected,
+            )
         return selected
 
     def select(
@@ -88,20 +592,123 @@ class Selector:
         task: str | None,
         keep_ratio: float = 0.4,
         lam: float = 0.5,
+        embeddings: np.ndarray | QuantizedMatrix | None = None,
+        token_counts: Sequence[int] | None = None,
+        budget_tokens: int | None = None,
+        task_embedding: np.ndarray | None = None,
     ) -> tuple[list[int], list[float]]:
-        embeddings = self.embed(texts)
+        """Pick chunks by MMR; ``embeddings`` skips re-embedding precomputed texts.
+
+        ``task_embedding`` likewise skips embedding ``task``. With
+        ``budget_tokens`` the selection fills that many tokens (per
+        ``token_counts``) instead of keeping ``keep_ratio`` of the chunks.
+        """
+        if embeddings is None:
+            embeddings = self.embed(texts)
         if embeddings.size == 0:
             return [], []
 
+        if task:
+            if task_embedding is None:
+                task_embedding = self.embed([task])[0]
+            if task_embedding.shape[-1] != embeddings.shape[1]:
+                raise EmbeddingDimensionMismatch(
+                    f"Embeddings have dimension {embeddings.shape[1]} but "
+                    f"{self.model_name} produces {task_embedding.shape[-1]}"
+                )
+        else:
+            task_embedding = _mean_rows(embeddings)
+
+        with timed("mmr"):
+            if budget_tokens is not None:
+                if token_counts is None:
+                    token_counts = [count_tokens(text) for text in texts]
+                indices = self._select_budget(
+                    embeddings, task_embedding, token_counts, budget_tokens, lam
+                )
+                return self._ordered(embeddings, task_embedding, indices)
+
+            k = max(1, int(len(texts) * keep_ratio))
+            pool_size = max(self.candidate_pool, k)
+            if self.candidate_pool > 0 and pool_size < len(texts):
+                # Two-stage: exact top-M retrieval, then MMR over the M candidates.
+                pool = _top_candidates(embeddings, task_embedding, pool_size)
+                local = self.mmr(embeddings[pool], task_embedding, k=k, lam=lam)
+                indices = pool[local].tolist()
+            else:
+                indices = self.mmr(embeddings, task_embedding, k=k, lam=lam)
+            return self._ordered(embeddings, task_embedding, indices)
+
+    def _select_budget(
+        self,
+        embeddings: np.ndarray | QuantizedMatrix,
+        task_embedding: np.ndarray,
+        token_counts: Sequence[int],
+        budget_tokens: int,
+        lam: float,
+    ) -> list[int]:
+        costs = np.asarray(token_counts, dtype=np.int64)
+        if 0 < self.candidate_pool < len(costs):
+            pool = _top_candidates(embeddings, task_embedding, self.candidate_pool)
+            local = self.mmr_budget(
+                embeddings[pool], task_embedding, costs[pool], budget_tokens, lam
+            )
+            return pool[local].tolist()
+        return self.mmr_budget(embeddings, task_embedding, costs, budget_tokens, lam)
+
+    def select_sentences(
+        self, texts: list[str], task: str | None, budget_tokens: int, lam: float = 0.5
+    ) -> list[str]:
+        """Trim ``texts`` to ``budget_tokens`` by running MMR over their sentences.
+
+        All sentences are embedded in one batch; kept sentences stay in their
+        original order and chunk, so the result aligns with ``texts`` (a chunk
+        whose sentences were all dropped becomes an empty string).
+        """
+        pieces = [split_sentences(text) for text in texts]
+        flat = [piece for chunk in pieces for piece in chunk]
+        counts = [count_tokens(piece) for piece in flat]
+        if sum(counts) <= budget_tokens:
+            return list(texts)
+
+        embeddings = self.embed([piece.strip() for piece in flat])
         if task:
             task_embedding = self.embed([task])[0]
         else:
             task_embedding = np.mean(embeddings, axis=0)
+        chosen = set(
+            self.mmr_budget(embeddings, task_embedding, counts, budget_tokens, lam)
+        )
+
+        trimmed: list[str] = []
+        position = 0
+        for chunk in pieces:
+            kept = (
+                piece
+                for index, piece in enumerate(chunk, start=position)
+                if index in chosen
+            )
+            trimmed.append("".join(kept).strip())
+            position += len(chunk)
+        return trimmed
 
-        k = max(1, int(len(texts) * keep_ratio))
-        indices = self.mmr(embeddings, task_embedding, k=k, lam=lam)
+    @staticmethod
+    def _ordered(
+        embeddings: np.ndarray | QuantizedMatrix,
+        task_embedding: np.ndarray,
+        indices: list[int],
+    ) -> tuple[list[int], list[float]]:
+        """Return ``indices`` in document order with their task similarity."""
         scores = _cosine_similarity(embeddings[indices], task_embedding).tolist()
         index_to_score = dict(zip(indices, scores, strict=False))
         ordered_indices = sorted(indices)
         ordered_scores = [index_to_score[idx] for idx in ordered_indices]
         return ordered_indices, ordered_scores
+
+    def close(self) -> None:
+        if self.batcher is not None:
+            self.batcher.close()
+            self.batcher = None
+        close_backend = getattr(self.backend, "close", None)
+        if close_backend is not None:
+            close_backend()
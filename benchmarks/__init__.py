@@ -0,0 +1 @@
+"""Offline micro-benchmarks for the compression pipeline."""
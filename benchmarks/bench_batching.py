@@ -0,0 +1,99 @@
+"""Embedding throughput with length-bucketed batches versus padded single calls.
+
+Run with ``uv run python -m benchmarks.bench_batching``. Inputs mix many short
+texts with a few full-size chunks, like caller-supplied ``texts`` plus a
+chunked document. By default a padding-sensitive stand-in encoder is used:
+every call pays for ``rows x longest row`` tokens, as a transformer does.
+Pass ``--model`` to measure a real sentence-transformers model instead.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from app.selection import Selector, SentenceTransformerBackend
+
+
+class PaddedEncoder:
+    """Mean-pooled random token embeddings passed through one dense layer."""
+
+    def __init__(self, dim: int, seed: int) -> None:
+        rng = np.random.default_rng(seed)
+        self.vocab = rng.standard_normal((4096, dim)).astype(np.float32)
+        self.weights = rng.standard_normal((dim, dim)).astype(np.float32)
+        self.padded_tokens = 0
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        ids = [
+            [hash(word) % len(self.vocab) for word in text.split()] for text in texts
+        ]
+        width = max((len(row) for row in ids), default=0) or 1
+        padded = np.zeros((len(texts), width), dtype=np.int64)
+        mask = np.zeros((len(texts), width), dtype=np.float32)
+        for row, tokens in enumerate(ids):
+            padded[row, : len(tokens)] = tokens
+            mask[row, : len(tokens)] = 1.0
+        self.padded_tokens += padded.size
+        hidden = np.tanh(self.vocab[padded] @ self.weights)
+        pooled = (hidden * mask[:, :, None]).sum(axis=1)
+        return pooled / np.maximum(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12)
+
+
+def _texts(n: int, long_fraction: float, rng: np.random.Generator) -> list[str]:
+    texts = []
+    for _ in range(n):
+        if rng.random() < long_fraction:
+            words = int(rng.integers(600, 900))
+        else:
+            words = int(rng.integers(5, 120))
+        texts.append(" ".join(f"w{int(w)}" for w in rng.integers(0, 50_000, words)))
+    return texts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--texts", type=int, default=512)
+    parser.add_argument("--long-fraction", type=float, default=0.05)
+    parser.add_argument(
+        "--max-batch-tokens", type=int, nargs="+", default=[0, 4096, 8192, 16384]
+    )
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    texts = _texts(args.texts, args.long_fraction, rng)
+    backend = (
+        SentenceTransformerBackend(args.model)
+        if args.model
+        else PaddedEncoder(args.dim, args.seed)
+    )
+    print(f"{'max tokens':>10} {'texts/s':>9} {'speedup':>8} {'padded tok':>11}")
+    baseline = None
+    for max_tokens in args.max_batch_tokens:
+        selector = Selector("bench", backend=backend, max_batch_tokens=max_tokens)
+        selector._encode_batch(texts[:8])  # warm up
+        best = float("inf")
+        padded = 0
+        for _ in range(args.repeat):
+            if isinstance(backend, PaddedEncoder):
+                backend.padded_tokens = 0
+            start = time.perf_counter()
+            selector._encode_batch(texts)
+            best = min(best, time.perf_counter() - start)
+            padded = getattr(backend, "padded_tokens", 0)
+        baseline = baseline or best
+        label = "one call" if max_tokens <= 0 else str(max_tokens)
+        print(
+            f"{label:>10} {len(texts) / best:>9.1f} "
+            f"{baseline / best:>7.1f}x {padded or '-':>11}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Benchmark ``chunk_text`` and the structure-aware chunking strategy.
+
+The window chunker is compared against the original decode-every-window
+implementation; the structure strategy is compared against ``chunk_text`` on
+markdown with code fences, counting chunks that cut a fence in half.
+
+Run with ``uv run python -m benchmarks.bench_chunking``. Uses the tiktoken
+encoding when it can be resolved and a byte-level stand-in otherwise.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from app import chunking
+
+
+class ByteEncoding:
+    """One token per UTF-8 byte; used when tiktoken data is unavailable."""
+
+    n_vocab = 256
+
+    def encode(self, text: str, disallowed_special=()) -> list[int]:
+        return list(text.encode("utf-8"))
+
+    def encode_to_numpy(self, text: str, disallowed_special=()) -> np.ndarray:
+        return np.frombuffer(text.encode("utf-8"), dtype=np.uint8).astype(np.uint32)
+
+    def decode(self, tokens: list[int]) -> str:
+        return bytes(tokens).decode("utf-8", errors="replace")
+
+    def decode_single_token_bytes(self, token: int) -> bytes:
+        return bytes([token])
+
+
+def legacy_chunk_text(encoding, document: str, target: int, overlap: int) -> list[str]:
+    """The original chunker: encode, then decode each overlapping window."""
+    effective_overlap = min(overlap, target - 1) if target > 1 else 0
+    step = max(target - effective_overlap, 1)
+    token_ids = encoding.encode(document)
+    chunks = [
+        encoding.decode(token_ids[start : start + target])
+        for start in range(0, len(token_ids), step)
+    ]
+    return [chunk for chunk in chunks if chunk]
+
+
+def _document(size_bytes: int) -> str:
+    paragraph = (
+        "The service selects relevant chunks with MMR before compressing them. "
+        "Identifiers like `Selector.mmr` and numbers such as 42 must survive. "
+        "Unicode text — naïve café, 東京, 🚀 — exercises multi-byte tokens.\n\n"
+    )
+    repeats = size_bytes // len(paragraph.encode("utf-8")) + 1
+    return paragraph * repeats
+
+
+def _markdown_document(size_bytes: int) -> str:
+    section = (
+        "## Module notes\n"
+        "The selector ranks chunks by relevance and diversity before compression.\n\n"
+        "```python\n"
+        "def select(texts, task):\n"
+        "    embeddings = embed(texts)\n"
+        "    return mmr(embeddings, embed([task])[0], k=4, lam=0.5)\n"
+        "```\n\n"
+    )
+    return section * (size_bytes // len(section) + 1)
+
+
+def _broken_fences(chunks: list[str]) -> int:
+    return sum(chunk.count("```") % 2 for chunk in chunks)
+
+
+def _measure(func) -> tuple[float, float, object]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1e6, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 4_000_000]
+    )
+    parser.add_argument("--overlaps", type=float, nargs="+", default=[0.0, 0.13, 0.5])
+    parser.add_argument("--target", type=int, default=900)
+    args = parser.parse_args()
+
+    encoding = chunking._resolve_encoding()
+    if encoding is None:
+        print("tiktoken encoding unavailable; using byte-level stand-in")
+        encoding = ByteEncoding()
+        chunking._resolve_encoding = lambda: encoding  # type: ignore[assignment]
+    chunking._token_byte_lengths(encoding)  # one-time per-process setup
+
+    print(
+        f"{'bytes':>10} {'overlap':>8} {'legacy (s)':>11} {'new (s)':>9} "
+        f"{'legacy MB':>10} {'new MB':>8} {'same':>5}"
+    )
+    for size in args.sizes:
+        document = _document(size)
+        for ratio in args.overlaps:
+            overlap = int(args.target * ratio)
+            legacy_s, legacy_mb, legacy = _measure(
+                lambda d=document, o=overlap: legacy_chunk_text(
+                    encoding, d, args.target, o
+                )
+            )
+            new_s, new_mb, new = _measure(
+                lambda d=document, o=overlap: chunking.chunk_text(d, args.target, o)
+            )
+            print(
+                f"{size:>10} {ratio:>8.2f} {legacy_s:>11.4f} {new_s:>9.4f} "
+                f"{legacy_mb:>10.1f} {new_mb:>8.1f} {str(legacy == new):>5}"
+            )
+
+    print()
+    print(
+        f"{'bytes':>10} {'window (s)':>11} {'structure (s)':>14} "
+        f"{'window broken':>14} {'structure broken':>17}"
+    )
+    overlap = int(args.target * 0.13)
+    for size in args.sizes:
+        document = _markdown_document(size)
+        window_s, _, window = _measure(
+            lambda d=document: chunking.chunk_text(d, args.target, overlap)
+        )
+        structure_s, _, structure = _measure(
+            lambda d=document: chunking.chunk_document(
+                d, args.target, overlap, "structure"
+            )
+        )
+        print(
+            f"{size:>10} {window_s:>11.4f} {structure_s:>14.4f} "
+            f"{_broken_fences(window):>14} {_broken_fences(structure):>17}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Compare the vectorized ``Selector.mmr`` against the original per-candidate loop.
+
+Run with ``uv run python -m benchmarks.bench_mmr``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from app.selection import Selector, _cosine_similarity
+
+
+def legacy_mmr(
+    embeddings: np.ndarray, query_vec: np.ndarray, k: int, lam: float
+) -> list[int]:
+    """The pre-vectorization MMR loop, kept as a correctness and speed baseline."""
+    n = embeddings.shape[0]
+    if k >= n:
+        return list(range(n))
+
+    sims_to_query = _cosine_similarity(embeddings, query_vec)
+    selected = [int(np.argmax(sims_to_query))]
+    candidates = [index for index in range(n) if index != selected[0]]
+    while len(selected) < k and candidates:
+        best_candidate = candidates[0]
+        best_score = -np.inf
+        for candidate in candidates:
+            diversity = _cosine_similarity(
+                embeddings[selected], embeddings[candidate]
+            ).max()
+            score = lam * sims_to_query[candidate] - (1 - lam) * diversity
+            if score > best_score:
+                best_score = score
+                best_candidate = candidate
+        selected.append(best_candidate)
+        candidates.remove(best_candidate)
+    return selected
+
+
+def _time(func, repeat: int) -> tuple[float, list[int]]:
+    best = float("inf")
+    result: list[int] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def run(
+    sizes: list[int], ratios: list[float], dim: int, repeat: int, seed: int
+) -> list[dict[str, float]]:
+    rng = np.random.default_rng(seed)
+    selector = Selector.__new__(Selector)
+    rows: list[dict[str, float]] = []
+    for n in sizes:
+        embeddings = rng.standard_normal((n, dim)).astype(np.float32)
+        query = rng.standard_normal(dim).astype(np.float32)
+        for ratio in ratios:
+            k = max(1, int(n * ratio))
+            legacy_s, legacy = _time(
+                lambda e=embeddings, q=query, k=k: legacy_mmr(e, q, k, 0.5), repeat
+            )
+            vectorized_s, vectorized = _time(
+                lambda e=embeddings, q=query, k=k: selector.mmr(e, q, k, 0.5), repeat
+            )
+            rows.append({
+                "n": n,
+                "k": k,
+                "legacy_s": legacy_s,
+                "vectorized_s": vectorized_s,
+                "same_order": float(vectorized == legacy),
+            })
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--ratios", type=float, nargs="+", default=[0.05, 0.1])
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    print(f"{'n':>6} {'k':>6} {'legacy (s)':>12} {'vectorized (s)':>15} {'speedup':>9}")
+    for row in run(args.sizes, args.ratios, args.dim, args.repeat, args.seed):
+        speedup = row["legacy_s"] / max(row["vectorized_s"], 1e-12)
+        flag = "" if row["same_order"] else "  (order differs)"
+        print(
+            f"{row['n']:>6} {row['k']:>6} {row['legacy_s']:>12.4f} "
+            f"{row['vectorized_s']:>15.4f} {speedup:>8.1f}x{flag}"
+        )
+
+
+if __name__ == "__main__":
+    main()
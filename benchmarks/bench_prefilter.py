@@ -0,0 +1,70 @@
+"""Recall and latency of the top-M pre-filter versus exact MMR over all chunks.
+
+Run with ``uv run python -m benchmarks.bench_prefilter``. Embeddings are drawn
+around random cluster centres so that, as in real corpora, only some chunks are
+relevant to the query.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from app.selection import Selector
+
+
+def _corpus(
+    n: int, dim: int, clusters: int, rng: np.random.Generator
+) -> tuple[np.ndarray, np.ndarray]:
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    noise = rng.standard_normal((n, dim)).astype(np.float32) * 0.6
+    query = centres[0] + rng.standard_normal(dim).astype(np.float32) * 0.6
+    return centres[labels] + noise, query
+
+
+def _select(
+    selector: Selector, embeddings: np.ndarray, query: np.ndarray, k: int, lam: float
+) -> list[int]:
+    texts = [""] * embeddings.shape[0]
+    selector.embed = lambda batch: embeddings if batch is texts else query[None, :]
+    indices, _ = selector.select(texts, task="task", keep_ratio=k / len(texts), lam=lam)
+    return indices
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000])
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--pools", type=int, nargs="+", default=[100, 250, 1000, 4000])
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--lam", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    selector = Selector.__new__(Selector)
+    print(f"{'n':>7} {'M':>6} {'latency (s)':>12} {'speedup':>8} {'recall':>7}")
+    for n in args.sizes:
+        embeddings, query = _corpus(n, args.dim, clusters=64, rng=rng)
+        selector.candidate_pool = 0
+        start = time.perf_counter()
+        exact = set(_select(selector, embeddings, query, args.k, args.lam))
+        exact_s = time.perf_counter() - start
+        print(f"{n:>7} {'all':>6} {exact_s:>12.4f} {1.0:>7.1f}x {1.0:>7.3f}")
+        for pool in args.pools:
+            selector.candidate_pool = pool
+            start = time.perf_counter()
+            filtered = set(_select(selector, embeddings, query, args.k, args.lam))
+            filtered_s = time.perf_counter() - start
+            recall = len(filtered & exact) / len(exact)
+            print(
+                f"{n:>7} {pool:>6} {filtered_s:>12.4f} "
+                f"{exact_s / max(filtered_s, 1e-12):>7.1f}x {recall:>7.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Memory, MMR latency and selection agreement of compact embedding storage.
+
+Run with ``uv run python -m benchmarks.bench_quantization``. Each variant stores
+the same clustered corpus as float16, int8 (per-row scales) or a truncated
+prefix of the dimensions, and is compared with float32 MMR selection. Truncation
+is only meaningful for Matryoshka-trained models; on random data it shows the
+worst case.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+
+from app.quantization import QuantizedMatrix, truncate_dim
+from app.selection import Selector
+
+
+def _corpus(
+    n: int, dim: int, clusters: int, rng: np.random.Generator
+) -> tuple[np.ndarray, np.ndarray]:
+    centres = rng.standard_normal((clusters, dim)).astype(np.float32)
+    labels = rng.integers(0, clusters, size=n)
+    noise = rng.standard_normal((n, dim)).astype(np.float32) * 0.6
+    matrix = centres[labels] + noise
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    query = centres[0] + rng.standard_normal(dim).astype(np.float32) * 0.6
+    return matrix, query
+
+
+def _timed_mmr(
+    selector: Selector, matrix, query: np.ndarray, k: int, lam: float
+) -> tuple[set[int], float]:
+    start = time.perf_counter()
+    selected = selector.mmr(matrix, query, k=k, lam=lam)
+    return set(selected), time.perf_counter() - start
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 50_000])
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--truncate", type=int, nargs="+", default=[256, 512])
+    parser.add_argument("--k", type=int, default=50)
+    parser.add_argument("--lam", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    selector = Selector.__new__(Selector)
+    print(f"{'n':>7} {'storage':>12} {'MiB':>8} {'latency (s)':>12} {'agreement':>10}")
+    for n in args.sizes:
+        matrix, query = _corpus(n, args.dim, clusters=64, rng=rng)
+        exact, exact_s = _timed_mmr(selector, matrix, query, args.k, args.lam)
+        variants: list[tuple[str, object, np.ndarray]] = [
+            ("float32", matrix, query),
+            ("float16", QuantizedMatrix.from_array(matrix, "float16"), query),
+            ("int8", QuantizedMatrix.from_array(matrix, "int8"), query),
+        ]
+        for dim in args.truncate:
+            variants.append((f"f32[:{dim}]", truncate_dim(matrix, dim), query[:dim]))
+            variants.append((
+                f"int8[:{dim}]",
+                QuantizedMatrix.from_array(truncate_dim(matrix, dim), "int8"),
+                query[:dim],
+            ))
+        for name, stored, vector in variants:
+            if stored is matrix:
+                selected, seconds = exact, exact_s
+            else:
+                selected, seconds = _timed_mmr(
+                    selector, stored, vector, args.k, args.lam
+                )
+            agreement = len(selected & exact) / len(exact)
+            mib = stored.nbytes / 2**20
+            print(f"{n:>7} {name:>12} {mib:>8.1f} {seconds:>12.4f} {agreement:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Minimal OpenAI-compatible chat completions server for offline benchmarks.
+
+Run with ``uv run python -m benchmarks.stub_openai --port 8001`` and point
+``OPENAI_BASE_URL`` at ``http://127.0.0.1:8001/v1``. Each completion sleeps for
+``--latency`` seconds plus ``--per-token`` seconds per generated token, then
+returns the first ``max_tokens`` words of the prompt with a ``usage`` block.
+Streaming requests get the same words as Server-Sent Events.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes on a keep-alive connection;
+    # with Nagle on, the body waits for the client's delayed ACK (~40 ms).
+    disable_nagle_algorithm = True
+    server: StubServer
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        pass
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if not self.path.endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        prompt = body["messages"][-1]["content"]
+        words = prompt.split()[: int(body.get("max_tokens") or 16)]
+        with self.server.lock:
+            self.server.requests += 1
+        if body.get("stream"):
+            self._stream(words)
+            return
+        time.sleep(self.server.latency + self.server.per_token * len(words))
+        payload = json.dumps({
+            "choices": [{"message": {"role": "assistant", "content": " ".join(words)}}],
+            "usage": {
+                "prompt_tokens": len(prompt.split()),
+                "completion_tokens": len(words),
+            },
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, words: list[str]) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        time.sleep(self.server.latency)
+        for word in words:
+            time.sleep(self.server.per_token)
+            delta = {"choices": [{"delta": {"content": word + " "}}]}
+            self.wfile.write(f"data: {json.dumps(delta)}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded stub server; ``requests`` counts completions served."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.05,
+        per_token: float = 0.0,
+    ) -> None:
+        super().__init__((host, port), _Handler)
+        self.latency = latency
+        self.per_token = per_token
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> StubServer:
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--per-token", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = StubServer(args.host, args.port, args.latency, args.per_token)
+    print(f"serving {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
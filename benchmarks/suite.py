@@ -0,0 +1,336 @@
+"""Reproducible end-to-end benchmark suite with JSON output.
+
+Run with ``uv run python -m benchmarks.suite --output bench.json`` and compare
+two runs (e.g. from different commits) with
+``uv run python -m benchmarks.suite --compare base.json bench.json``.
+
+Everything runs offline: embeddings use the letter-histogram fallback backend
+and ``/compress`` calls go to an in-process stub OpenAI-compatible server (see
+``benchmarks.stub_openai``). The suite covers chunking throughput by document
+size, embedding throughput by batch size, MMR scaling in ``n`` and ``k``,
+``/compress`` latency percentiles at several concurrency levels, and peak
+memory. ``--quick`` shrinks every section for a smoke run.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+import numpy as np
+
+from app import chunking
+from app.config import settings
+from app.selection import FallbackBackend, Selector
+
+from .stub_openai import StubServer
+
+Record = dict[str, Any]
+
+
+def _best(func: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def _peak_mb(func: Callable[[], object]) -> float:
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1e6, 3)
+
+
+def _document(size_bytes: int, salt: str = "") -> str:
+    section = (
+        f"## Notes {salt}\n"
+        "The selector ranks chunks by relevance and diversity before compression. "
+        "Identifiers like `Selector.mmr` and numbers such as 42 must survive.\n\n"
+        "```python\n"
+        "def select(texts, task):\n"
+        "    return mmr(embed(texts), embed([task])[0], k=4, lam=0.5)\n"
+        "```\n\n"
+    )
+    return section * (size_bytes // len(section) + 1)
+
+
+def bench_chunking(sizes: list[int], repeat: int) -> list[Record]:
+    records = []
+    for size in sizes:
+        document = _document(size)
+        for strategy in ("window", "structure"):
+
+            def run(d: str = document, s: str = strategy) -> list[str]:
+                return chunking.chunk_document(
+                    d, settings.chunk_target_tokens, settings.chunk_overlap_tokens, s
+                )
+
+            seconds = _best(run, repeat)
+            records.append({
+                "bench": "chunking",
+                "params": {"bytes": size, "strategy": strategy},
+                "metrics": {
+                    "seconds": round(seconds, 6),
+                    "mb_per_s": round(len(document.encode()) / 1e6 / seconds, 3),
+                    "chunks": len(run()),
+                    "peak_mb": _peak_mb(run),
+                },
+            })
+    return records
+
+
+def bench_embedding(batch_sizes: list[int], texts: int, repeat: int) -> list[Record]:
+    rng = np.random.default_rng(0)
+    words = [f"token{int(i)}" for i in rng.integers(0, 10_000, texts * 64)]
+    corpus = [
+        " ".join(words[i * 64 : i * 64 + int(rng.integers(4, 64))])
+        for i in range(texts)
+    ]
+    selector = Selector("bench", backend=FallbackBackend())
+    records = []
+    for batch in batch_sizes:
+
+        def run(b: int = batch) -> None:
+            for start in range(0, len(corpus), b):
+                selector.embed(corpus[start : start + b])
+
+        seconds = _best(run, repeat)
+        records.append({
+            "bench": "embedding",
+            "params": {"backend": "fallback", "batch": batch},
+            "metrics": {
+                "seconds": round(seconds, 6),
+                "texts_per_s": round(len(corpus) / seconds, 1),
+            },
+        })
+    return records
+
+
+def bench_mmr(sizes: list[int], ks: list[int], dim: int, repeat: int) -> list[Record]:
+    rng = np.random.default_rng(0)
+    selector = Selector.__new__(Selector)
+    records = []
+    for n in sizes:
+        embeddings = rng.standard_normal((n, dim)).astype(np.float32)
+        query = rng.standard_normal(dim).astype(np.float32)
+        for k in ks:
+
+            def run(
+                e: np.ndarray = embeddings, q: np.ndarray = query, k: int = k
+            ) -> list[int]:
+                return selector.mmr(e, q, k=k, lam=0.5)
+
+            records.append({
+                "bench": "mmr",
+                "params": {"n": n, "k": k, "dim": dim},
+                "metrics": {"seconds": round(_best(run, repeat), 6)},
+            })
+    return records
+
+
+async def _compress_load(
+    concurrency: int, requests: int, document_bytes: int
+) -> list[float]:
+    import httpx
+
+    from app import main
+
+    transport = httpx.ASGITransport(app=main.app)
+    latencies: list[float] = []
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for index in range(requests):
+        queue.put_nowait(index)
+
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+
+        async def worker() -> None:
+            while not queue.empty():
+                index = queue.get_nowait()
+                # Distinct documents so no request is coalesced with another.
+                payload = {
+                    "document": _document(document_bytes, salt=str(index)),
+                    "mode": "task",
+                    "task": "how does selection work",
+                }
+                start = time.perf_counter()
+                response = await client.post("/compress", json=payload)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - start)
+
+        await asyncio.gather(*[worker() for _ in range(concurrency)])
+    return latencies
+
+
+async def _bench_compress(
+    concurrency: list[int], requests: int, document_bytes: int, latency: float
+) -> list[Record]:
+    from app import main
+
+    records = []
+    # One event loop for the whole run: the backend client pools connections.
+    try:
+        main.startup()
+        await _compress_load(1, 2, document_bytes)  # warm up
+        for level in concurrency:
+            started = time.perf_counter()
+            latencies = await _compress_load(level, requests, document_bytes)
+            wall = time.perf_counter() - started
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            records.append({
+                "bench": "compress",
+                "params": {
+                    "concurrency": level,
+                    "document_bytes": document_bytes,
+                    "backend_latency": latency,
+                },
+                "metrics": {
+                    "p50": round(float(p50), 6),
+                    "p95": round(float(p95), 6),
+                    "p99": round(float(p99), 6),
+                    "requests_per_s": round(len(latencies) / wall, 2),
+                },
+            })
+    finally:
+        await main.shutdown()
+    return records
+
+
+def bench_compress(
+    concurrency: list[int], requests: int, document_bytes: int, latency: float
+) -> list[Record]:
+    server = StubServer(latency=latency).start()
+    settings.openai_base_url = server.base_url
+    settings.compressor_backend = "OPENAI"
+    settings.embedding_backend = "fallback"
+    settings.response_cache_ttl = 0
+    settings.model_loading = "eager"
+    try:
+        return asyncio.run(
+            _bench_compress(concurrency, requests, document_bytes, latency)
+        )
+    finally:
+        server.shutdown()
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _environment(args: argparse.Namespace) -> dict[str, Any]:
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "tokenizer": "tiktoken" if chunking._resolve_encoding() else "whitespace",
+        "args": {k: v for k, v in vars(args).items() if k not in {"compare"}},
+    }
+
+
+def _key(record: Record) -> str:
+    params = ",".join(f"{k}={v}" for k, v in sorted(record["params"].items()))
+    return f"{record['bench']}[{params}]"
+
+
+def compare(base_path: str, new_path: str) -> None:
+    """Print every metric present in both runs with its relative change."""
+    with open(base_path, encoding="utf-8") as handle:
+        base = {_key(r): r["metrics"] for r in json.load(handle)["results"]}
+    with open(new_path, encoding="utf-8") as handle:
+        new = {_key(r): r["metrics"] for r in json.load(handle)["results"]}
+    print(f"{'benchmark':<58} {'metric':>15} {'base':>12} {'new':>12} {'change':>8}")
+    for key, metrics in new.items():
+        for metric, value in metrics.items():
+            before = base.get(key, {}).get(metric)
+            if before is None:
+                continue
+            change = (value - before) / before * 100 if before else 0.0
+            print(f"{key:<58} {metric:>15} {before:>12g} {value:>12g} {change:>+7.1f}%")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", help="Write results as JSON to this file")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"))
+    parser.add_argument("--quick", action="store_true")
+    parser.add_argument(
+        "--only", nargs="+", choices=["chunking", "embedding", "mmr", "compress"]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--backend-latency",
+        type=float,
+        default=0.05,
+        help="Seconds the stub backend waits per completion",
+    )
+    args = parser.parse_args()
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    quick = args.quick
+    sections = set(args.only or ["chunking", "embedding", "mmr", "compress"])
+    results: list[Record] = []
+    if "chunking" in sections:
+        sizes = [10_000, 100_000] if quick else [10_000, 100_000, 1_000_000]
+        results += bench_chunking(sizes, args.repeat)
+    if "embedding" in sections:
+        results += bench_embedding([1, 32, 256], 256 if quick else 4096, args.repeat)
+    if "mmr" in sections:
+        sizes = [1_000, 5_000] if quick else [1_000, 10_000, 50_000]
+        results += bench_mmr(sizes, [10, 100], 256 if quick else 1024, args.repeat)
+    if "compress" in sections:
+        results += bench_compress(
+            [1, 4] if quick else [1, 8, 32],
+            8 if quick else 128,
+            20_000,
+            args.backend_latency,
+        )
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    scale = 1e6 if sys.platform == "darwin" else 1e3  # bytes vs kilobytes
+    report = {
+        "environment": _environment(args),
+        "results": results,
+        "memory": {"max_rss_mb": round(max_rss / scale, 1)},
+    }
+    for record in results:
+        metrics = " ".join(f"{k}={v}" for k, v in record["metrics"].items())
+        print(f"{_key(record):<58} {metrics}")
+    print(f"max RSS: {report['memory']['max_rss_mb']} MB")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+            handle.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+
+from app.admission import ConcurrencyLimiter, Overloaded
+
+
+def test_limiter_caps_concurrency_and_queues_in_order():
+    async def main():
+        limiter = ConcurrencyLimiter(2, max_queue=10, queue_timeout=5)
+        active = 0
+        peak = 0
+        order = []
+
+        async def call(index):
+            nonlocal active, peak
+            async with limiter.slot():
+                active += 1
+                peak = max(peak, active)
+                order.append(index)
+                await asyncio.sleep(0.01)
+                active -= 1
+
+        await asyncio.gather(*[call(index) for index in range(6)])
+        return limiter, peak, order
+
+    limiter, peak, order = asyncio.run(main())
+
+    assert peak == 2
+    assert order == list(range(6))
+    assert limiter.in_flight == 0
+    assert limiter.stats()["admitted"] == 6
+
+
+def test_limiter_rejects_when_queue_is_full_or_wait_times_out():
+    async def main():
+        limiter = ConcurrencyLimiter(1, max_queue=1, queue_timeout=0.05)
+        release = asyncio.Event()
+
+        async def hold():
+            async with limiter.slot():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as full:
+            await limiter.acquire()
+        with pytest.raises(Overloaded) as timeout:
+            await waiter
+        release.set()
+        await holder
+        return limiter, full.value, timeout.value
+
+    limiter, full, timeout = asyncio.run(main())
+
+    assert full.reason == "queue_full"
+    assert full.retry_after_header == "1"
+    assert timeout.reason == "timeout"
+    assert limiter.in_flight == 0
+    assert limiter.stats()["queued"] == 0
+    assert limiter.rejected == 2
+
+
+def test_limiter_rejects_when_expected_wait_exceeds_deadline():
+    async def main():
+        limiter = ConcurrencyLimiter(1, queue_timeout=1.0)
+        limiter.latency = 2.0  # learned from earlier calls
+        await limiter.acquire()
+        with pytest.raises(Overloaded) as rejected:
+            await limiter.acquire()
+        return rejected.value
+
+    rejected = asyncio.run(main())
+
+    assert rejected.reason == "deadline"
+    assert rejected.retry_after_header == "2"
+
+
+def test_adaptive_limit_backs_off_on_slow_or_failed_calls_and_recovers():
+    limiter = ConcurrencyLimiter(10, adaptive=True, min_limit=2)
+
+    limiter.in_flight = 1
+    limiter.release(0.1)  # baseline
+    assert limiter.limit == 10
+
+    limiter.in_flight = 1
+    limiter.release(1.0)  # 10x the baseline: congestion
+    assert limiter.limit == pytest.approx(9.0)
+    limiter.in_flight = 1
+    limiter.release(1.0)  # within the same round trip: no second decrease
+    assert limiter.limit == pytest.approx(9.0)
+
+    limiter._last_decrease = 0.0
+    for _ in range(30):
+        limiter._last_decrease = 0.0
+        limiter.in_flight = 1
+        limiter.release(0.5, ok=False)
+    assert limiter.limit == 2
+
+    for _ in range(20):
+        limiter.in_flight = limiter.capacity  # saturated
+        limiter.release(0.1)
+    assert limiter.limit > 4
+    assert limiter.limit <= 10
@@ -16,6 +16,9 @@ class DummySelector:
         scores = [0.9, 0.8][: len(indices)]
         return indices, scores
 
+    def close(self) -> None:
+        self.closed = True
+
 
 class DummyCompressor:
     def __init__(self) -> None:
@@ -26,9 +29,24 @@ class DummyCompressor:
         self.budget_observed = budget
         return "compressed result"
 
+    async def acompress(self, content, task, budget, mode):
+        return self.compress(content, task, budget, mode)
+
+    async def astream(self, content, task, budget, mode):
+        self.budget_observed = budget
+        for piece in ("```python\n", "print('hi')"):
+            yield piece
+
+    async def acompress_hierarchical(self, texts, task, budget, mode):
+        self.budget_observed = budget
+        return "hierarchical result", {"depth": 1, "levels": []}
+
     def close(self) -> None:
         self.closed = True
 
+    async def aclose(self) -> None:
+        self.close()
+
 
 def test_dummy_compressor_exposes_close():
     dummy = DummyCompressor()
@@ -287,3 +305,643 @@ def test_compress_endpoint_records_explicit_selection_hyperparams(client_with_se
     assert selector.selection_kwargs is not None
     assert selector.selection_kwargs["keep_ratio"] == pytest.approx(keep_ratio)
     assert selector.selection_kwargs["lam"] == pytest.approx(mmr_lambda)
+
+
+def test_compress_endpoint_reports_hierarchy_in_meta(client):
+    payload = {
+        "texts": ["Function A does X", "Function B depends on A"],
+        "mode": "losslessish",
+        "hierarchical": True,
+    }
+
+    response = client.post("/compress", json=payload)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["compressed"] == "hierarchical result"
+    assert body["meta"]["hierarchy"] == {"depth": 1, "levels": []}
+
+
+def _parse_sse(body: str) -> list[tuple[str, dict]]:
+    import json
+
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def test_compress_stream_emits_selection_tokens_and_closed_tail(client):
+    payload = {
+        "texts": ["Function A does X", "Function B depends on A", "chit-chat"],
+        "task": "summarize dependencies for refactor",
+        "mode": "task",
+    }
+
+    response = client.post("/compress/stream", json=payload)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = _parse_sse(response.text)
+    assert [name for name, _ in events] == [
+        "selection",
+        "token",
+        "token",
+        "token",
+        "done",
+    ]
+    selection = events[0][1]
+    assert selection["kept_indices"] == [0, 1]
+    assert selection["selection_scores"] == [0.9, 0.8]
+    assert events[3][1]["text"] == "\n```"
+    assert events[-1][1]["compressed"] == "```python\nprint('hi')\n```"
+
+
+def test_compress_endpoint_honors_chunking_strategy(monkeypatch):
+    from app import main
+
+    class TrackingSelector(DummySelector):
+        def select(self, texts, task, keep_ratio, lam):
+            self.texts_observed = list(texts)
+            return super().select(texts, task, keep_ratio, lam)
+
+    selector = TrackingSelector()
+    monkeypatch.setattr(main, "selector", selector)
+    monkeypatch.setattr(main, "compressor", DummyCompressor())
+    document = "# One\nalpha beta\n\n# Two\ngamma delta\n"
+
+    with TestClient(main.app) as client:
+        response = client.post(
+            "/compress",
+            json={"document": document, "chunking_strategy": "structure"},
+        )
+
+    assert response.status_code == 200
+    assert selector.texts_observed == ["# One\nalpha beta\n\n# Two\ngamma delta"]
+
+
+def test_compress_batch_endpoint_returns_results_in_order(client):
+    payload = {
+        "requests": [
+            {"texts": ["alpha", "beta", "gamma"], "mode": "losslessish"},
+            {"texts": "single block", "mode": "task", "task": "summarize"},
+        ]
+    }
+
+    response = client.post("/compress/batch", json=payload)
+
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [result["original_count"] for result in results] == [3, 1]
+    assert all(result["compressed"] == "compressed result" for result in results)
+
+
+def test_compress_batch_endpoint_reports_failed_jobs_in_place(monkeypatch):
+    from app import main
+    from app.admission import Overloaded
+
+    class PickyCompressor(DummyCompressor):
+        async def acompress(self, content, task, budget, mode):
+            if "busy" in content:
+                raise Overloaded("queue_full", 1.0)
+            return await super().acompress(content, task, budget, mode)
+
+    monkeypatch.setattr(main, "selector", DummySelector())
+    monkeypatch.setattr(main, "compressor", PickyCompressor())
+    monkeypatch.setattr(main, "response_cache", None)
+    payload = {
+        "requests": [
+            {"texts": ["alpha"]},
+            {"texts": ["busy"]},
+            {"corpus_id": "deadbeef"},
+        ]
+    }
+
+    with TestClient(main.app) as client:
+        response = client.post("/compress/batch", json=payload)
+
+    assert response.status_code == 200
+    first, busy, missing = response.json()["results"]
+    assert first["compressed"] == "compressed result"
+    assert busy["status"] == 429
+    assert missing == {"status": 404, "detail": "Unknown corpus"}
+
+
+def test_compress_batch_coalesces_more_jobs_than_cpu_workers(monkeypatch):
+    from app import main, selection
+    from app.config import settings
+
+    calls: list[list[str]] = []
+
+    class CountingBackend(selection.FallbackBackend):
+        def encode(self, texts):
+            calls.append(list(texts))
+            return super().encode(texts)
+
+    selector = selection.Selector(
+        "fallback", backend=CountingBackend(), batch_wait_ms=500, max_batch_size=64
+    )
+    monkeypatch.setattr(settings, "cpu_workers", 2)
+    monkeypatch.setattr(main, "executor", None)
+    monkeypatch.setattr(main, "selector", selector)
+    monkeypatch.setattr(main, "compressor", DummyCompressor())
+    jobs = [
+        {"texts": [f"job {i} alpha", f"job {i} beta"], "task": f"task {i}"}
+        for i in range(8)
+    ]
+
+    with TestClient(main.app) as client:
+        response = client.post("/compress/batch", json={"requests": jobs})
+        batched = selector.batcher.stats()
+
+    assert response.status_code == 200
+    assert all("compressed" in result for result in response.json()["results"])
+    assert len(calls) == 1
+    assert len(calls[0]) == 8 * 3  # every job's chunks and task in one call
+    assert batched == {"requests": 16, "batches": 1, "texts": 24}
+
+
+def test_compress_batch_endpoint_rejects_empty_batch(client):
+    response = client.post("/compress/batch", json={"requests": []})
+
+    assert response.status_code == 422
+
+
+def test_compress_endpoint_reuses_cached_responses(monkeypatch):
+    from app import main
+    from app.response_cache import ResponseCache
+
+    compressor = DummyCompressor()
+    calls = []
+    original = compressor.compress
+
+    def counting_compress(content, task, budget, mode):
+        calls.append(content)
+        return original(content, task, budget, mode)
+
+    compressor.compress = counting_compress
+    monkeypatch.setattr(main, "selector", DummySelector())
+    monkeypatch.setattr(main, "compressor", compressor)
+    monkeypatch.setattr(main, "response_cache", ResponseCache(1 << 20, ttl=60))
+    payload = {"texts": ["alpha", "beta"], "mode": "losslessish"}
+
+    with TestClient(main.app) as client:
+        first = client.post("/compress", json=payload).json()
+        second = client.post("/compress", json=payload).json()
+        third = client.post("/compress", json={**payload, "keep_ratio": 0.9}).json()
+        explicit = client.post("/compress", json={**payload, "keep_ratio": 0.5}).json()
+
+    assert first["meta"]["cache"] == "miss"
+    assert second["meta"]["cache"] == "hit"
+    assert third["meta"]["cache"] == "miss"
+    assert explicit["meta"]["cache"] == "hit"
+    assert second["compressed"] == first["compressed"]
+    assert len(calls) == 2
+
+
+@pytest.fixture
+def corpus_client(monkeypatch, tmp_path):
+    from app import main, selection
+    from app.corpus import CorpusStore
+
+    monkeypatch.setattr(selection, "SentenceTransformer", None)
+    selector = selection.Selector("fallback")
+    embedded: list[list[str]] = []
+    original_embed = selector.embed
+
+    def tracking_embed(texts):
+        embedded.append(list(texts))
+        return original_embed(texts)
+
+    selector.embed = tracking_embed
+    monkeypatch.setattr(main, "selector", selector)
+    monkeypatch.setattr(main, "compressor", DummyCompressor())
+    monkeypatch.setattr(main, "corpus_store", CorpusStore(tmp_path))
+
+    with TestClient(main.app) as client:
+        yield client, embedded
+
+
+def test_compress_by_id_rejects_corpus_from_another_embedding_model(
+    corpus_client, monkeypatch
+):
+    import numpy as np
+
+    from app import main
+
+    client, _ = corpus_client
+    corpus_id = client.post("/corpora", json={"texts": ["a b", "c d"]}).json()[
+        "corpus_id"
+    ]
+    request = {"corpus_id": corpus_id, "task": "a"}
+
+    monkeypatch.setattr(main.selector, "model_name", "other-model")
+    assert client.post("/compress", json=request).status_code == 409
+
+    monkeypatch.setattr(main.selector, "model_name", "fallback")
+    monkeypatch.setattr(main.selector, "embedding_dim", 8)
+    assert client.post("/compress", json=request).status_code == 409
+
+    # Same model and dim, but another backend's vector space.
+    monkeypatch.setattr(main.selector, "embedding_dim", 0)
+    monkeypatch.setattr(main.selector, "_backend_id", "onnx:/models/m:mean:512")
+    response = client.post("/compress", json=request)
+    assert response.status_code == 409
+    assert "[fallback]" in response.json()["detail"]
+    monkeypatch.setattr(main.selector, "_backend_id", "fallback")
+    assert client.post("/compress", json=request).status_code == 200
+
+    # Same model, but the corpus was built with a truncated EMBEDDING_DIM.
+    monkeypatch.setattr(
+        main.corpus_store,
+        "embedding_model",
+        lambda corpus_id: ("fallback", 8, "fallback"),
+    )
+    monkeypatch.setattr(
+        main.corpus_store,
+        "load",
+        lambda corpus_id: (["a b", "c d"], np.ones((2, 8))),
+    )
+    response = client.post("/compress/stream", json=request)
+    assert response.status_code == 409
+    assert "dimension" in response.json()["detail"]
+
+
+def test_corpus_lifecycle_and_compress_by_id(corpus_client):
+    client, embedded = corpus_client
+    texts = ["apples and pears", "zebra yak xylophone", "pears and plums"]
+
+    created = client.post("/corpora", json={"texts": texts})
+    assert created.status_code == 201
+    corpus_id = created.json()["corpus_id"]
+    assert created.json()["chunk_count"] == 3
+    assert embedded == [texts]
+
+    response = client.post(
+        "/compress",
+        json={"corpus_id": corpus_id, "task": "pears", "return_selection": True},
+    )
+    assert response.status_code == 200
+    assert response.json()["original_count"] == 3
+    assert embedded[-1] == ["pears"]
+    assert set(response.json()["kept_texts"]) <= set(texts)
+
+    listing = client.get("/corpora").json()
+    assert [info["corpus_id"] for info in listing["corpora"]] == [corpus_id]
+    assert listing["total_bytes"] > 0
+    assert client.get(f"/corpora/{corpus_id}").json()["loaded"] is True
+
+    assert client.delete(f"/corpora/{corpus_id}").status_code == 204
+    assert client.get(f"/corpora/{corpus_id}").status_code == 404
+    missing = client.post("/compress", json={"corpus_id": corpus_id})
+    assert missing.status_code == 404
+    missing = client.post("/compress/stream", json={"corpus_id": corpus_id})
+    assert missing.status_code == 404
+
+
+def test_corpus_rejects_empty_payload(corpus_client):
+    client, _ = corpus_client
+
+    assert client.post("/corpora", json={}).status_code == 422
+    assert client.post("/corpora", json={"texts": []}).status_code == 422
+
+
+def test_corpus_patch_appends_and_invalidates_cached_responses(
+    corpus_client, monkeypatch
+):
+    from app import main
+    from app.response_cache import ResponseCache
+
+    client, embedded = corpus_client
+    monkeypatch.setattr(main, "response_cache", ResponseCache(1 << 20, 60))
+    document = "\n\n".join(f"paragraph {i} about pears" for i in range(40))
+    corpus_id = client.post("/corpora", json={"document": document}).json()["corpus_id"]
+    request = {"corpus_id": corpus_id, "task": "pears"}
+    assert client.post("/compress", json=request).json()["meta"]["cache"] == "miss"
+    assert client.post("/compress", json=request).json()["meta"]["cache"] == "hit"
+
+    updated = client.patch(f"/corpora/{corpus_id}", json={"append": "\n\nfresh plums"})
+
+    assert updated.status_code == 200
+    body = updated.json()
+    assert body["revision"] == 1
+    assert body["embedded_chunks"] == len(embedded[-1])
+    assert (
+        body["kept_chunks"] + body["embedded_chunks"] + body["reused_chunks"]
+        == body["chunk_count"]
+    )
+    assert client.post("/compress", json=request).json()["meta"]["cache"] == "miss"
+    assert (
+        client.patch(f"/corpora/{corpus_id}", json={"texts": ["x"]}).status_code == 409
+    )
+    assert client.patch(f"/corpora/{corpus_id}", json={}).status_code == 422
+    assert client.patch("/corpora/missing", json={"append": "x"}).status_code == 404
+
+
+def test_selection_budget_bounds_selected_tokens(corpus_client):
+    client, _ = corpus_client
+    texts = [("pears " * (5 + 3 * i)).strip() for i in range(12)]
+
+    response = client.post(
+        "/compress",
+        json={
+            "texts": texts,
+            "task": "pears",
+            "selection_budget_tokens": 40,
+            "keep_ratio": 1.0,
+            "return_selection": True,
+        },
+    )
+
+    body = response.json()
+    selection = body["meta"]["selection"]
+    assert selection["budget_tokens"] == 40
+    assert 0 < selection["selected_tokens"] <= 40
+    assert body["kept_count"] < len(texts)
+
+    corpus_id = client.post("/corpora", json={"texts": texts}).json()["corpus_id"]
+    by_corpus = client.post(
+        "/compress",
+        json={"corpus_id": corpus_id, "task": "pears", "selection_budget_tokens": 40},
+    ).json()
+    assert by_corpus["kept_indices"] == body["kept_indices"]
+
+
+def test_selection_budget_reuses_chunking_token_counts(corpus_client, monkeypatch):
+    from app import main
+    from app.config import settings
+
+    client, _ = corpus_client
+    monkeypatch.setattr(settings, "chunk_target_tokens", 20)
+    monkeypatch.setattr(settings, "chunk_overlap_tokens", 0)
+    counted = []
+    real_count_tokens = main.count_tokens
+
+    def counting(text):
+        counted.append(text)
+        return real_count_tokens(text)
+
+    monkeypatch.setattr(main, "count_tokens", counting)
+    response = client.post(
+        "/compress",
+        json={
+            "document": " ".join(f"pears{i}" for i in range(400)),
+            "task": "pears",
+            "selection_budget_tokens": 40,
+            "mode": "extractive",
+        },
+    )
+
+    assert response.status_code == 200
+    assert 0 < response.json()["meta"]["selection"]["selected_tokens"] <= 40
+    assert set(counted) == {main.CHUNK_SEPARATOR}  # no chunk is encoded again
+
+
+class FailingCompressor(DummyCompressor):
+    async def acompress(self, content, task, budget, mode):
+        raise AssertionError("extractive mode must not call the backend")
+
+    async def astream(self, content, task, budget, mode):
+        raise AssertionError("extractive mode must not call the backend")
+        yield ""
+
+
+def test_extractive_mode_skips_backend(corpus_client, monkeypatch):
+    from app import main
+
+    client, _ = corpus_client
+    monkeypatch.setattr(main, "compressor", FailingCompressor())
+    texts = [
+        "Pears are sweet. Zebras run fast across the plains every day.",
+        "Quartz is a hard mineral. Pear orchards need plenty of sun.",
+    ]
+    payload = {
+        "texts": texts,
+        "task": "pears",
+        "mode": "extractive",
+        "keep_ratio": 1.0,
+        "budget_tokens": 10,
+    }
+
+    body = client.post("/compress", json=payload).json()
+
+    assert body["meta"] == {"backend": "NONE", "model": None, "mode": "extractive"}
+    assert body["compressed"]
+    assert len(body["compressed"]) < len(" ".join(texts))
+
+    stream = client.post("/compress/stream", json=payload)
+    assert "event: done" in stream.text
+    assert "error" not in stream.text
+
+
+def test_backend_none_runs_without_compressor(monkeypatch):
+    from app import main, selection
+
+    monkeypatch.setattr(main.settings, "compressor_backend", "NONE")
+    monkeypatch.setattr(selection, "SentenceTransformer", None)
+    monkeypatch.setattr(main, "selector", selection.Selector("fallback"))
+    monkeypatch.setattr(main, "compressor", None)
+
+    with TestClient(main.app) as client:
+        assert main.compressor is None
+        response = client.post(
+            "/compress", json={"texts": ["alpha beta", "gamma"], "mode": "task"}
+        )
+
+    assert response.status_code == 200
+    assert response.json()["meta"]["mode"] == "extractive"
+    assert response.json()["compressed"]
+
+
+class RecordingCompressor(DummyCompressor):
+    def __init__(self) -> None:
+        super().__init__()
+        self.contents: list[str] = []
+
+    async def acompress(self, content, task, budget, mode):
+        self.contents.append(content)
+        return self.compress(content, task, budget, mode)
+
+
+def test_sentence_pass_shrinks_prompt_and_reports_tokens(corpus_client, monkeypatch):
+    from app import main
+
+    client, embedded = corpus_client
+    compressor = RecordingCompressor()
+    monkeypatch.setattr(main, "compressor", compressor)
+    texts = [
+        "Pears are sweet. Zebras run fast. Pears grow on trees. Yaks are big.",
+        "Quartz is a mineral. Pear orchards need sun. Xylophones are loud.",
+    ]
+
+    body = client.post(
+        "/compress",
+        json={
+            "texts": texts,
+            "task": "pears",
+            "keep_ratio": 1.0,
+            "sentence_keep_ratio": 0.5,
+            "return_selection": True,
+        },
+    ).json()
+
+    sentences = body["meta"]["sentences"]
+    assert sentences["output_tokens"] <= sentences["input_tokens"] // 2
+    assert body["kept_texts"] == texts
+    assert len(compressor.contents[0]) < len("".join(texts))
+    assert [len(batch) for batch in embedded[-2:]] == [7, 1]  # sentences, task
+
+    plain = client.post("/compress", json={"texts": texts, "keep_ratio": 1.0}).json()
+    assert "sentences" not in plain["meta"]
+
+
+def test_compress_reports_stage_timings_and_metrics(corpus_client, monkeypatch):
+    from app import main
+    from app.metrics import BACKEND_ERRORS, STAGE_SECONDS
+
+    client, _ = corpus_client
+    document = "alpha beta gamma. " * 50
+    mmr_before = STAGE_SECONDS.count(stage="mmr")
+
+    response = client.post(
+        "/compress",
+        json={"document": document, "task": "beta", "return_timings": True},
+    )
+
+    timings = response.json()["meta"]["timings"]
+    assert {"chunking", "embedding", "mmr", "backend", "guards", "total"} <= set(
+        timings
+    )
+    assert timings["total"] >= timings["backend"]
+    assert STAGE_SECONDS.count(stage="mmr") == mmr_before + 1
+    plain = client.post("/compress", json={"document": document, "task": "beta"})
+    assert "timings" not in plain.json()["meta"]
+
+    monkeypatch.setattr(main, "compressor", FailingCompressor())
+    errors_before = BACKEND_ERRORS.value(error="AssertionError")
+    with pytest.raises(AssertionError):
+        client.post("/compress", json={"texts": ["a", "b"]})
+    assert BACKEND_ERRORS.value(error="AssertionError") == errors_before + 1
+
+    exposition = client.get("/metrics")
+    assert exposition.status_code == 200
+    assert exposition.headers["content-type"].startswith("text/plain")
+    body = exposition.text
+    assert "# TYPE compressor_stage_seconds histogram" in body
+    assert 'compressor_stage_seconds_bucket{stage="mmr",le="+Inf"}' in body
+    assert 'compressor_chunks_total{kind="kept"}' in body
+    assert 'compressor_backend_errors_total{error="AssertionError"}' in body
+
+
+def test_background_model_loading_gates_requests_until_ready(monkeypatch):
+    import threading
+    import time
+
+    from app import main
+
+    release = threading.Event()
+
+    def slow_selector():
+        release.wait(5)
+        return DummySelector()
+
+    monkeypatch.setattr(main.settings, "model_loading", "background")
+    monkeypatch.setattr(main, "selector", None)
+    monkeypatch.setattr(main, "compressor", DummyCompressor())
+    monkeypatch.setattr(main, "_build_selector", slow_selector)
+
+    with TestClient(main.app) as client:
+        assert client.get("/healthz").status_code == 200
+        loading = client.get("/readyz")
+        assert loading.status_code == 503
+        assert loading.json()["state"] == "loading"
+        busy = client.post("/compress", json={"texts": ["a", "b"]})
+        assert busy.status_code == 503
+        assert busy.headers["retry-after"] == "5"
+
+        release.set()
+        for _ in range(100):
+            ready = client.get("/readyz")
+            if ready.status_code == 200:
+                break
+            time.sleep(0.01)
+        assert ready.json()["ready"] is True
+        assert "selector" in ready.json()["seconds"]
+        assert client.post("/compress", json={"texts": ["a", "b"]}).status_code == 200
+
+
+def test_failed_model_loading_is_reported(monkeypatch):
+    from app import main
+
+    def broken_selector():
+        raise RuntimeError("no weights")
+
+    monkeypatch.setattr(main.settings, "model_loading", "eager")
+    monkeypatch.setattr(main, "selector", None)
+    monkeypatch.setattr(main, "compressor", DummyCompressor())
+    monkeypatch.setattr(main, "_build_selector", broken_selector)
+
+    with TestClient(main.app) as client:
+        status = client.get("/readyz").json()
+        response = client.post("/compress", json={"texts": ["a"]})
+
+    assert status["state"] == "failed"
+    assert "no weights" in status["error"]
+    assert response.status_code == 503
+    assert "no weights" in response.json()["detail"]
+
+
+def test_startup_warmup_runs_a_selection(monkeypatch):
+    from app import main
+
+    selector = DummySelector()
+    monkeypatch.setattr(main.settings, "model_loading", "eager")
+    monkeypatch.setattr(main.settings, "startup_warmup", True)
+    monkeypatch.setattr(main, "selector", selector)
+    monkeypatch.setattr(main, "compressor", DummyCompressor())
+
+    with TestClient(main.app) as client:
+        status = client.get("/readyz").json()
+
+    assert status["ready"] is True
+    assert "warmup" in status["seconds"]
+    assert selector.keep_ratio_observed == 0.5
+
+
+def test_overloaded_backend_answers_429_with_retry_after(monkeypatch):
+    from app import main
+    from app.admission import Overloaded
+
+    class OverloadedCompressor(DummyCompressor):
+        async def acompress(self, content, task, budget, mode):
+            raise Overloaded("queue_full", 2.5)
+
+    monkeypatch.setattr(main, "selector", DummySelector())
+    monkeypatch.setattr(main, "compressor", OverloadedCompressor())
+
+    with TestClient(main.app) as client:
+        response = client.post("/compress", json={"texts": ["a", "b"]})
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "3"
+    assert "overloaded" in response.json()["detail"]
+
+
+def test_overloaded_backend_answers_429_before_streaming(monkeypatch):
+    from app import main
+    from app.admission import ConcurrencyLimiter
+
+    compressor = DummyCompressor()
+    compressor.limiter = ConcurrencyLimiter(1, max_queue=0)
+    compressor.limiter.in_flight = 1  # another call holds the only slot
+    monkeypatch.setattr(main, "selector", DummySelector())
+    monkeypatch.setattr(main, "compressor", compressor)
+
+    with TestClient(main.app) as client:
+        response = client.post("/compress/stream", json={"texts": ["a", "b"]})
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "1"
+    assert "queue_full" in response.json()["detail"]
+    assert compressor.limiter.stats()["rejected"] == 1
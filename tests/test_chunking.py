@@ -0,0 +1,231 @@
+import pytest
+
+from app import chunking
+
+
+class ByteEncoding:
+    """Tokenizer stand-in that emits one token per UTF-8 byte."""
+
+    n_vocab = 256
+
+    def __init__(self) -> None:
+        self.decoded_windows = 0
+
+    def encode(self, text, disallowed_special="all"):
+        # Like tiktoken, refuse special-token text unless told otherwise.
+        if disallowed_special == "all" and "<|endoftext|>" in text:
+            raise ValueError(
+                "Encountered text corresponding to disallowed special token"
+            )
+        return list(text.encode("utf-8"))
+
+    def decode(self, tokens):
+        self.decoded_windows += 1
+        return bytes(tokens).decode("utf-8", errors="replace")
+
+    def decode_single_token_bytes(self, token):
+        return bytes([token])
+
+
+def _reference_chunks(encoding, document, target, step):
+    token_ids = encoding.encode(document)
+    chunks = [
+        encoding.decode(token_ids[start : start + target])
+        for start in range(0, len(token_ids), step)
+    ]
+    return [chunk for chunk in chunks if chunk]
+
+
+@pytest.fixture
+def byte_encoding(monkeypatch):
+    encoding = ByteEncoding()
+    monkeypatch.setattr(chunking, "_resolve_encoding", lambda: encoding)
+    return encoding
+
+
+@pytest.mark.parametrize("target,overlap", [(5, 0), (5, 2), (7, 6), (1, 0), (64, 8)])
+def test_token_chunks_match_window_decoding(byte_encoding, target, overlap):
+    document = "héllo wörld — naïve façade 🚀 " * 7
+    step = target - min(overlap, target - 1)
+
+    chunks = chunking.chunk_text(document, target, overlap)
+
+    expected = _reference_chunks(ByteEncoding(), document, target, step)
+    assert chunks == expected
+    assert byte_encoding.decoded_windows == 0
+
+
+def test_special_token_text_is_ordinary_input(byte_encoding):
+    text = "chat log <|endoftext|> next turn"
+
+    assert chunking.count_tokens(text) == len(text.encode("utf-8"))
+    assert "".join(chunking.chunk_text(text, 8, 0)) == text
+
+
+def test_iter_chunks_is_lazy(byte_encoding):
+    chunks = chunking.iter_chunks("abcdefghij" * 100, 10, 2)
+
+    assert next(chunks) == "abcdefghij"
+    assert next(chunks) == "ijabcdefgh"
+
+
+def test_empty_document_yields_nothing(byte_encoding):
+    assert chunking.chunk_text("", 10, 2) == []
+
+
+def test_encoding_is_resolved_once(monkeypatch):
+    calls = []
+
+    class FakeTiktoken:
+        @staticmethod
+        def get_encoding(name):
+            calls.append(name)
+            return ByteEncoding()
+
+    chunking._resolve_encoding.cache_clear()
+    monkeypatch.setattr(chunking, "tiktoken", FakeTiktoken)
+    try:
+        chunking.chunk_text("some text", 4, 1)
+        chunking.chunk_text("more text", 4, 1)
+        chunking.count_tokens("tokens")
+    finally:
+        chunking._resolve_encoding.cache_clear()
+
+    assert calls == ["cl100k_base"]
+
+
+STRUCTURED_DOCUMENT = """# Title
+Intro paragraph that explains the module.
+
+Second paragraph with more words in it.
+
+```python
+def compute(a, b):
+
+    return a + b
+```
+
+## Details
+Closing notes.
+"""
+
+
+def test_structured_chunks_never_split_code_fences(monkeypatch):
+    monkeypatch.setattr(chunking, "_resolve_encoding", lambda: None)
+
+    chunks = chunking.chunk_document(STRUCTURED_DOCUMENT, 12, 0, "structure")
+
+    assert all(chunk.count("```") % 2 == 0 for chunk in chunks)
+    fenced = next(chunk for chunk in chunks if "```python" in chunk)
+    assert "return a + b\n```" in fenced
+    assert chunks[-1].startswith("## Details")
+
+
+def test_structured_chunks_pack_segments_up_to_target(monkeypatch):
+    monkeypatch.setattr(chunking, "_resolve_encoding", lambda: None)
+
+    chunks = chunking.chunk_document(STRUCTURED_DOCUMENT, 1000, 0, "structure")
+
+    assert len(chunks) == 1
+    assert chunks[0] == STRUCTURED_DOCUMENT.rstrip()
+
+
+def test_structured_chunks_split_oversized_segments(monkeypatch):
+    monkeypatch.setattr(chunking, "_resolve_encoding", lambda: None)
+    document = " ".join(f"w{i}" for i in range(25))
+
+    chunks = chunking.chunk_document(document, 10, 0, "structure")
+
+    assert [len(chunk.split()) for chunk in chunks] == [10, 10, 5]
+
+
+def test_chunk_document_rejects_unknown_strategy():
+    with pytest.raises(ValueError):
+        chunking.chunk_document("text", 10, 0, "sentences")
+
+
+@pytest.mark.parametrize("strategy", ["window", "structure"])
+def test_chunk_spans_locate_chunks(byte_encoding, strategy):
+    document = "# Title\n\nhéllo wörld 🚀 text\n\n## Next\n\nmore words here\n" * 3
+
+    spans = chunking.chunk_spans(document, 24, 6, strategy)
+
+    assert [text for _, _, text in spans] == chunking.chunk_document(
+        document, 24, 6, strategy
+    )
+    for start, end, text in spans:
+        if "�" not in text:  # windows may cut through a multi-byte character
+            assert document[start:end] == text
+
+
+@pytest.mark.parametrize("strategy", ["window", "structure"])
+def test_chunkers_return_the_token_counts_they_know(byte_encoding, strategy):
+    document = "# Title\n\nhello world text\n\n## Next\n\nmore words here\n" * 3
+
+    chunks, counts = chunking.chunk_document(
+        document, 24, 6, strategy, return_counts=True
+    )
+    spans, span_counts = chunking.chunk_spans(
+        document, 24, 6, strategy, return_counts=True
+    )
+
+    assert chunks == chunking.chunk_document(document, 24, 6, strategy)
+    assert [text for _, _, text in spans] == chunks
+    assert span_counts == counts
+    exact = [chunking.count_tokens(chunk) for chunk in chunks]
+    if strategy == "window":
+        assert counts == exact
+    else:  # segment sums include whitespace trimmed off the chunk's end
+        pairs = zip(counts, exact, strict=True)
+        assert all(0 <= count - token < 3 for count, token in pairs)
+
+
+@pytest.mark.parametrize("strategy", ["window", "structure"])
+@pytest.mark.parametrize("tokenizer", ["bytes", "words"])
+def test_rechunk_tail_matches_full_rechunk_on_append(monkeypatch, strategy, tokenizer):
+    if tokenizer == "bytes":
+        monkeypatch.setattr(chunking, "_resolve_encoding", lambda: ByteEncoding())
+        target, overlap = 60, 12
+    else:
+        monkeypatch.setattr(chunking, "_resolve_encoding", lambda: None)
+        target, overlap = 12, 3
+    document = "".join(
+        f"## Part {i}\n\nalpha beta gamma {i} delta\n\n" for i in range(20)
+    )
+    grown = document + "epsilon zeta eta theta iota kappa lambda\n\n## Tail\n\nmu nu\n"
+    spans = chunking.chunk_spans(document, target, overlap, strategy)
+
+    keep, tail = chunking.rechunk_tail(
+        document, spans, grown, target, overlap, strategy
+    )
+
+    assert keep >= len(spans) - 2
+    rebuilt = [text for _, _, text in spans[:keep] + tail]
+    assert rebuilt == chunking.chunk_document(grown, target, overlap, strategy)
+
+
+def test_rechunk_tail_restarts_at_the_edited_window(monkeypatch):
+    monkeypatch.setattr(chunking, "_resolve_encoding", lambda: None)
+    document = " ".join(f"w{i}" for i in range(100))
+    edited = document.replace("w90", "changed")
+    spans = chunking.chunk_spans(document, 10, 2)
+
+    keep, tail = chunking.rechunk_tail(document, spans, edited, 10, 2)
+
+    assert spans[keep][0] <= document.index("w90") < spans[keep][1]
+    assert "w90" in spans[keep][2]
+    assert tail[0][0] == spans[keep][0]
+    assert [text for _, _, text in spans[:keep] + tail] == chunking.chunk_text(
+        edited, 10, 2
+    )
+
+
+def test_split_sentences_keeps_code_fences_whole():
+    text = "First point. Second!\nA line\n\n```py\nx = 1. y = 2\n```\nLast one."
+
+    pieces = chunking.split_sentences(text)
+
+    assert "".join(pieces) == text
+    assert pieces[:3] == ["First point. ", "Second!\n", "A line\n\n"]
+    assert "```py\nx = 1. y = 2\n```\n" in pieces
+    assert pieces[-1] == "Last one."
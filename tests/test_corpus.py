@@ -0,0 +1,235 @@
+import numpy as np
+import pytest
+
+from app.corpus import CorpusNotFound, CorpusStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return CorpusStore(tmp_path / "corpora")
+
+
+def test_create_and_load_round_trip(store):
+    embeddings = np.arange(12, dtype=np.float64).reshape(3, 4)
+
+    info = store.create(["a", "b", "c"], embeddings, "model", "window")
+    texts, matrix = store.load(info["corpus_id"])
+
+    assert texts == ["a", "b", "c"]
+    assert isinstance(matrix, np.memmap)
+    assert matrix.dtype == np.float32
+    np.testing.assert_array_equal(matrix, embeddings)
+    assert info["chunk_count"] == 3
+    assert info["dim"] == 4
+    assert info["embedding_bytes"] == 3 * 4 * 4
+
+
+def test_list_reports_memory_accounting(store):
+    assert store.list() == []
+    first = store.create(["a"], np.ones((1, 2)), "model")
+    second = store.create(["b", "c"], np.ones((2, 2)), "model")
+    store.load(second["corpus_id"])
+
+    infos = {info["corpus_id"]: info for info in store.list()}
+    stats = store.stats()
+
+    assert set(infos) == {first["corpus_id"], second["corpus_id"]}
+    assert infos[second["corpus_id"]]["loaded"] is True
+    assert infos[first["corpus_id"]]["loaded"] is False
+    assert stats["corpora"] == 2
+    assert stats["chunks"] == 3
+    assert stats["embedding_bytes"] == 3 * 2 * 4
+    assert stats["loaded"] == 1
+
+
+def test_delete_removes_corpus(store):
+    info = store.create(["a"], np.ones((1, 2)), "model")
+
+    store.delete(info["corpus_id"])
+
+    with pytest.raises(CorpusNotFound):
+        store.load(info["corpus_id"])
+    with pytest.raises(CorpusNotFound):
+        store.delete(info["corpus_id"])
+
+
+def test_rejects_path_like_ids(store):
+    with pytest.raises(CorpusNotFound):
+        store.info("../etc")
+
+
+def test_store_survives_restart(tmp_path):
+    info = CorpusStore(tmp_path).create(["a", "b"], np.eye(2), "model")
+
+    texts, matrix = CorpusStore(tmp_path).load(info["corpus_id"])
+
+    assert texts == ["a", "b"]
+    np.testing.assert_array_equal(matrix, np.eye(2))
+
+
+class CountingEmbed:
+    def __init__(self) -> None:
+        self.calls: list[list[str]] = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return np.array([[len(text), text.count(" ")] for text in texts], dtype=float)
+
+
+@pytest.fixture
+def word_chunking(monkeypatch):
+    from app import chunking
+
+    monkeypatch.setattr(chunking, "_resolve_encoding", lambda: None)
+
+
+def _document_corpus(store, document, embed, strategy="window"):
+    from app.chunking import chunk_spans
+
+    spans = chunk_spans(document, 8, 2, strategy)
+    texts = [text for _, _, text in spans]
+    return store.create(
+        texts, embed(texts), "model", strategy, document=document, spans=spans
+    )
+
+
+def test_append_embeds_only_the_changed_tail(store, word_chunking):
+    from app.chunking import chunk_text
+
+    embed = CountingEmbed()
+    document = " ".join(f"w{i}" for i in range(60))
+    info = _document_corpus(store, document, embed)
+    before = info["chunk_count"]
+
+    updated = store.update_document(
+        info["corpus_id"], embed, 8, 2, append=" tail words appended here"
+    )
+    texts, matrix = store.load(info["corpus_id"])
+
+    grown = document + " tail words appended here"
+    assert texts == chunk_text(grown, 8, 2)
+    np.testing.assert_array_equal(matrix, CountingEmbed()(texts))
+    assert updated["kept_chunks"] == before - 1
+    assert updated["embedded_chunks"] == len(embed.calls[-1]) == 2
+    assert updated["revision"] == 1
+    assert store.revision(info["corpus_id"]) == 1
+
+
+def test_update_reuses_embeddings_of_unchanged_tail_chunks(store, word_chunking):
+    embed = CountingEmbed()
+    document = "# A\n\nalpha beta\n\n# B\n\ngamma delta\n\n# C\n\nepsilon zeta\n"
+    info = _document_corpus(store, document, embed, "structure")
+
+    updated = store.update_document(
+        info["corpus_id"], embed, 8, 2, document=document + "\n# D\n\neta theta\n"
+    )
+
+    assert updated["reused_chunks"] >= 1
+    assert embed.calls[-1] == ["# D\n\neta theta"]
+    texts, matrix = store.load(info["corpus_id"])
+    np.testing.assert_array_equal(matrix, CountingEmbed()(texts))
+
+
+def test_shrinking_update_keeps_file_and_mapping_valid(store, word_chunking):
+    embed = CountingEmbed()
+    document = " ".join(f"w{i}" for i in range(60))
+    info = _document_corpus(store, document, embed)
+    _, old_matrix = store.load(info["corpus_id"])
+
+    store.update_document(info["corpus_id"], embed, 8, 2, document=document[:40])
+    texts, matrix = store.load(info["corpus_id"])
+
+    assert matrix.shape[0] == len(texts) < old_matrix.shape[0]
+    assert old_matrix[-1].shape == (2,)  # still mapped, no SIGBUS
+    assert store.info(info["corpus_id"])["embedding_bytes"] == matrix.nbytes
+
+
+def test_update_is_invisible_to_held_and_crashed_reads(
+    store, word_chunking, monkeypatch
+):
+    embed = CountingEmbed()
+    document = "# A\n\nalpha beta\n\n# B\n\ngamma delta\n"
+    info = _document_corpus(store, document, embed, "structure")
+    corpus_id = info["corpus_id"]
+    old_texts, old_matrix = store.load(corpus_id)
+    edited = "# A\n\nalpha beta\n\n# B\n\nomega psi chi\n"
+
+    real_write_text = CorpusStore._write_text
+
+    def crash_on_commit(path, text):
+        if path.name == "meta.json":
+            raise OSError("disk full")
+        real_write_text(path, text)
+
+    monkeypatch.setattr(CorpusStore, "_write_text", staticmethod(crash_on_commit))
+    with pytest.raises(OSError):
+        store.update_document(corpus_id, embed, 8, 2, document=edited)
+    monkeypatch.setattr(CorpusStore, "_write_text", staticmethod(real_write_text))
+    store._loaded.clear()
+    texts, matrix = store.load(corpus_id)
+    assert store.revision(corpus_id) == 0
+    np.testing.assert_array_equal(matrix, CountingEmbed()(texts))
+
+    store.update_document(corpus_id, embed, 8, 2, document=edited)
+
+    np.testing.assert_array_equal(old_matrix, CountingEmbed()(old_texts))
+    texts, matrix = store.load(corpus_id)
+    assert texts[-1] == "# B\n\nomega psi chi"
+    np.testing.assert_array_equal(matrix, CountingEmbed()(texts))
+    assert sorted(p.name for p in (store.directory / corpus_id).iterdir()) == [
+        "chunks.1.json",
+        "document.1.txt",
+        "embeddings.1.f32",
+        "meta.json",
+        "spans.1.json",
+        "tokens.1.json",
+    ]
+
+
+def test_extend_appends_chunks_to_text_corpus(store):
+    embed = CountingEmbed()
+    info = store.create(["a b", "c"], embed(["a b", "c"]), "model")
+
+    updated = store.extend(info["corpus_id"], ["d e f"], embed)
+
+    texts, matrix = store.load(info["corpus_id"])
+    assert texts == ["a b", "c", "d e f"]
+    np.testing.assert_array_equal(matrix[2], [5, 2])
+    assert updated["embedded_chunks"] == 1
+    with pytest.raises(ValueError):
+        store.update_document(info["corpus_id"], embed, 8, 2, append="x")
+
+
+def test_failed_embed_leaves_corpus_unchanged(store, word_chunking):
+    info = _document_corpus(store, "one two three", CountingEmbed())
+
+    def broken(texts):
+        raise RuntimeError("backend down")
+
+    with pytest.raises(RuntimeError):
+        store.update_document(info["corpus_id"], broken, 8, 2, append=" four")
+
+    assert store.load(info["corpus_id"])[0] == ["one two three"]
+    assert store.revision(info["corpus_id"]) == 0
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_compact_corpus_round_trip_and_update(tmp_path, dtype):
+    from app.quantization import QuantizedMatrix
+
+    store = CorpusStore(tmp_path, dtype=dtype)
+    embeddings = np.random.default_rng(0).standard_normal((4, 8))
+    info = store.create(["a", "b", "c", "d"], embeddings, "model")
+
+    texts, matrix = store.load(info["corpus_id"])
+    assert isinstance(matrix, QuantizedMatrix)
+    assert isinstance(matrix.data, np.memmap)
+    unit = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    np.testing.assert_allclose(matrix.to_array(), unit, atol=2e-2)
+    assert info["dtype"] == dtype
+    assert info["embedding_bytes"] == matrix.nbytes < embeddings.astype("f4").nbytes
+
+    store.extend(info["corpus_id"], ["e"], lambda texts: np.ones((1, 8)))
+    _, matrix = store.load(info["corpus_id"])
+    np.testing.assert_allclose(matrix[4], np.full(8, 8**-0.5), atol=2e-2)
+    np.testing.assert_allclose(matrix[:4].to_array(), unit, atol=2e-2)
@@ -0,0 +1,183 @@
+import numpy as np
+import pytest
+
+from app.embedding_cache import DiskEmbeddingStore, EmbeddingCache, cache_key
+
+
+class CountingEncoder:
+    def __init__(self, dim: int = 4) -> None:
+        self.dim = dim
+        self.calls: list[list[str]] = []
+
+    def __call__(self, texts: list[str]) -> np.ndarray:
+        self.calls.append(list(texts))
+        return np.array([
+            np.full(self.dim, float(len(text)), dtype=np.float32) for text in texts
+        ]).reshape(len(texts), self.dim)
+
+
+def test_cache_key_depends_on_model_and_text():
+    assert cache_key("a", "text") != cache_key("b", "text")
+    assert cache_key("a", "text") != cache_key("a", "other")
+    assert cache_key("a", "text") == cache_key("a", "text")
+
+
+def test_only_misses_are_encoded_in_one_batch():
+    cache = EmbeddingCache(max_bytes=1 << 20)
+    encoder = CountingEncoder()
+
+    first = cache.get_or_compute("model", ["a", "bb", "a"], encoder)
+    second = cache.get_or_compute("model", ["bb", "ccc", "a"], encoder)
+
+    assert encoder.calls == [["a", "bb"], ["ccc"]]
+    assert first[:, 0].tolist() == [1.0, 2.0, 1.0]
+    assert second[:, 0].tolist() == [2.0, 3.0, 1.0]
+    stats = cache.stats()
+    assert stats["misses"] == 4
+    assert stats["hits"] == 2
+    assert stats["entries"] == 3
+
+
+def test_lru_is_bounded_by_bytes():
+    vector_bytes = 4 * np.dtype(np.float32).itemsize
+    cache = EmbeddingCache(max_bytes=2 * vector_bytes)
+    encoder = CountingEncoder()
+
+    cache.get_or_compute("model", ["a", "bb"], encoder)
+    cache.get_or_compute("model", ["a"], encoder)
+    cache.get_or_compute("model", ["ccc"], encoder)
+    cache.get_or_compute("model", ["a", "bb"], encoder)
+
+    stats = cache.stats()
+    assert stats["bytes"] <= 2 * vector_bytes
+    assert stats["evictions"] == 2
+    assert encoder.calls[-1] == ["bb"]
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    encoder = CountingEncoder()
+    EmbeddingCache(max_bytes=0, directory=tmp_path).get_or_compute(
+        "model", ["a", "bb"], encoder
+    )
+
+    reopened = EmbeddingCache(max_bytes=1 << 20, directory=tmp_path)
+    vectors = reopened.get_or_compute("model", ["bb", "a"], encoder)
+
+    assert len(encoder.calls) == 1
+    assert vectors[:, 0].tolist() == [2.0, 1.0]
+    assert reopened.stats()["disk_hits"] == 2
+
+
+def test_disk_store_rejects_dimension_change(tmp_path):
+    store = DiskEmbeddingStore(tmp_path)
+    store.put_many([("k1", np.ones(4))])
+
+    with pytest.raises(ValueError):
+        store.put_many([("k2", np.ones(3))])
+
+
+def test_disk_store_ignores_partially_written_rows(tmp_path):
+    store = DiskEmbeddingStore(tmp_path)
+    store.put_many([("k1", np.ones(4)), ("k2", np.ones(4) * 2)])
+    vectors_path = tmp_path / "vectors.f32"
+    vectors_path.write_bytes(vectors_path.read_bytes()[:-4])
+
+    reopened = DiskEmbeddingStore(tmp_path)
+
+    assert "k1" in reopened
+    assert "k2" not in reopened
+
+
+def test_disk_store_appends_stay_aligned_after_torn_write(tmp_path):
+    store = DiskEmbeddingStore(tmp_path)
+    store.put_many([("a", np.ones(4)), ("b", np.full(4, 2.0))])
+    vectors_path = tmp_path / "vectors.f32"
+    vectors_path.write_bytes(vectors_path.read_bytes()[:-8])
+
+    reopened = DiskEmbeddingStore(tmp_path)
+    reopened.put_many([("b", np.full(4, 2.0)), ("c", np.full(4, 3.0))])
+    restarted = DiskEmbeddingStore(tmp_path)
+
+    assert restarted.get("a").tolist() == [1.0] * 4
+    assert restarted.get("b").tolist() == [2.0] * 4
+    assert restarted.get("c").tolist() == [3.0] * 4
+
+
+def test_selector_embed_uses_cache(monkeypatch):
+    from app import selection
+
+    encoded: list[list[str]] = []
+
+    class RecordingSentenceTransformer:
+        def __init__(self, *_args, **_kwargs):
+            pass
+
+        def encode(self, texts, normalize_embeddings=True):
+            encoded.append(list(texts))
+            return np.eye(3)[: len(texts)]
+
+    monkeypatch.setattr(selection, "SentenceTransformer", RecordingSentenceTransformer)
+    selector = selection.Selector("dummy-model", cache=EmbeddingCache(1 << 20))
+
+    selector.embed(["x", "y"])
+    selector.embed(["y", "z"])
+
+    assert encoded == [["x", "y"], ["z"]]
+
+
+def test_int8_tier_stores_compact_vectors():
+    vectors = np.random.default_rng(1).standard_normal((3, 64)).astype(np.float32)
+    cache = EmbeddingCache(max_bytes=1 << 20, dtype="int8")
+
+    cache.get_or_compute("m", ["a", "b", "c"], lambda texts: vectors)
+    cached = cache.get_or_compute("m", ["a", "b", "c"], lambda texts: 1 / 0)
+
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.testing.assert_allclose(cached, unit, atol=2e-2)
+    assert cached.dtype == np.float32
+    assert cache.stats()["bytes"] == 3 * (64 + 4)
+
+
+def test_quantized_misses_match_later_hits():
+    vectors = np.random.default_rng(2).standard_normal((2, 64)).astype(np.float32)
+    cache = EmbeddingCache(max_bytes=1 << 20, dtype="int8")
+
+    cold = cache.get_or_compute("m", ["a", "b"], lambda texts: vectors)
+    warm = cache.get_or_compute("m", ["a", "b"], lambda texts: 1 / 0)
+
+    np.testing.assert_array_equal(cold, warm)
+
+
+def test_disk_tier_keeps_one_store_per_namespace(tmp_path):
+    cache = EmbeddingCache(max_bytes=0, directory=tmp_path)
+    cache.get_or_compute("model", ["a"], CountingEncoder(dim=8))
+    cache.get_or_compute("model@4", ["a", "bb"], CountingEncoder(dim=4))
+
+    reopened = EmbeddingCache(max_bytes=0, directory=tmp_path)
+    full = reopened.get_or_compute("model", ["a"], lambda texts: 1 / 0)
+    truncated = reopened.get_or_compute("model@4", ["bb"], lambda texts: 1 / 0)
+
+    assert full.shape == (1, 8)
+    assert truncated.shape == (1, 4)
+    assert len(list(tmp_path.iterdir())) == 2
+    assert reopened.stats()["disk_entries"] == 3
+
+
+def test_selector_cache_namespace_includes_backend(tmp_path):
+    from app.selection import FallbackBackend, Selector
+
+    class WideBackend:
+        cache_id = "sentence-transformers"
+
+        def encode(self, texts):
+            return np.ones((len(texts), 8), dtype=np.float32)
+
+    degraded = Selector(
+        "model", cache=EmbeddingCache(0, tmp_path), backend=FallbackBackend()
+    )
+    assert degraded.embed(["alpha"]).shape == (1, 26)
+
+    restarted = Selector(
+        "model", cache=EmbeddingCache(0, tmp_path), backend=WideBackend()
+    )
+    assert restarted.embed(["alpha", "beta"]).shape == (2, 8)
@@ -0,0 +1,34 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from app.lazy import UNRESOLVED, resolve
+
+
+def test_resolve_imports_once_and_caches_missing_modules():
+    namespace = {"json_dumps": UNRESOLVED, "missing": UNRESOLVED}
+
+    dumps = resolve(namespace, "json_dumps", "json", "dumps")
+    assert dumps([1]) == "[1]"
+    assert namespace["json_dumps"] is dumps
+    assert resolve(namespace, "missing", "no_such_module_for_tests") is None
+    assert namespace["missing"] is None
+
+    namespace["json_dumps"] = "patched"
+    assert resolve(namespace, "json_dumps", "json", "dumps") == "patched"
+
+
+def test_importing_the_app_skips_heavy_optional_dependencies():
+    code = (
+        "import sys, app.main; "
+        "print(sorted(m for m in ('torch', 'transformers', 'sentence_transformers', "
+        "'onnxruntime') if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).resolve().parents[1],
+    )
+    assert result.stdout.strip() == "[]"
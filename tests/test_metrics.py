@@ -0,0 +1,60 @@
+import asyncio
+
+from app.metrics import Counter, Histogram, Registry, start_timings, timed
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = Histogram("latency_seconds", "Latency.", ("stage",), (0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        histogram.observe(value, stage="embed")
+    registry = Registry()
+    registry.register(histogram)
+
+    lines = registry.render().splitlines()
+
+    assert lines[:2] == [
+        "# HELP latency_seconds Latency.",
+        "# TYPE latency_seconds histogram",
+    ]
+    assert lines[2:] == [
+        'latency_seconds_bucket{stage="embed",le="0.1"} 1',
+        'latency_seconds_bucket{stage="embed",le="1"} 3',
+        'latency_seconds_bucket{stage="embed",le="+Inf"} 4',
+        'latency_seconds_sum{stage="embed"} 6.05',
+        'latency_seconds_count{stage="embed"} 4',
+    ]
+
+
+def test_counter_escapes_label_values():
+    counter = Counter("errors", "Errors.", ("error",))
+    counter.inc(error='bad "quote"\n')
+    counter.inc(2, error='bad "quote"\n')
+
+    assert list(counter.samples()) == [r'errors_total{error="bad \"quote\"\n"} 3']
+
+
+def test_large_values_keep_full_precision():
+    counter = Counter("tokens", "Tokens.")
+    counter.inc(12_345_681)
+    histogram = Histogram("seconds", "Seconds.", buckets=(1.0,))
+    histogram.observe(1234567.125)
+
+    assert list(counter.samples()) == ["tokens_total 12345681"]
+    assert "seconds_sum 1234567.125" in list(histogram.samples())
+
+
+def test_timings_are_collected_per_task():
+    async def request(stages):
+        timings = start_timings()
+        for stage in stages:
+            with timed(stage):
+                await asyncio.sleep(0)
+        return timings
+
+    async def main():
+        return await asyncio.gather(request(["a", "a"]), request(["b"]))
+
+    first, second = asyncio.run(main())
+
+    assert set(first) == {"a"}
+    assert set(second) == {"b"}
@@ -156,3 +156,718 @@ def test_compressor_compress_preserves_braces(monkeypatch):
     prompt = request["json"]["messages"][1]["content"]
     assert task in prompt
     assert content in prompt
+
+
+def _loop_mmr(embeddings, query_vec, k, lam):
+    n = embeddings.shape[0]
+    if k >= n:
+        return list(range(n))
+    sims_to_query = _cosine_similarity(embeddings, query_vec)
+    selected = [int(np.argmax(sims_to_query))]
+    candidates = [index for index in range(n) if index != selected[0]]
+    while len(selected) < k:
+        best_candidate, best_score = None, -np.inf
+        for candidate in candidates:
+            diversity = _cosine_similarity(
+                embeddings[selected], embeddings[candidate]
+            ).max()
+            score = lam * sims_to_query[candidate] - (1 - lam) * diversity
+            if score > best_score:
+                best_candidate, best_score = candidate, score
+        selected.append(best_candidate)
+        candidates.remove(best_candidate)
+    return selected
+
+
+@pytest.mark.parametrize("lam", [0.0, 0.3, 0.5, 1.0])
+def test_vectorized_mmr_matches_candidate_loop(lam):
+    from app.selection import Selector
+
+    rng = np.random.default_rng(7)
+    embeddings = rng.standard_normal((60, 16))
+    query = rng.standard_normal(16)
+    selector = Selector.__new__(Selector)
+
+    for k in (1, 5, 20, 59, 60):
+        assert selector.mmr(embeddings, query, k=k, lam=lam) == _loop_mmr(
+            embeddings, query, k, lam
+        )
+
+
+def test_compressor_acompress_uses_pooled_async_client(monkeypatch):
+    import asyncio
+
+    import httpx
+
+    from app import compression
+    from app.config import settings
+
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"choices": [{"message": {"content": " ok "}}]})
+
+    created = []
+    real_async_client = httpx.AsyncClient
+
+    def build_client(**kwargs):
+        created.append(kwargs)
+        return real_async_client(transport=httpx.MockTransport(handler), **kwargs)
+
+    monkeypatch.setattr(settings, "openai_max_connections", 7)
+    monkeypatch.setattr(compression.httpx, "AsyncClient", build_client)
+    compressor = compression.Compressor()
+
+    async def run():
+        results = await asyncio.gather(*[
+            compressor.acompress(
+                content=f"data {index}", task=None, budget=50, mode="task"
+            )
+            for index in range(3)
+        ])
+        await compressor.aclose()
+        return results
+
+    assert asyncio.run(run()) == ["ok", "ok", "ok"]
+    assert len(created) == 1
+    assert created[0]["limits"].max_connections == 7
+    assert len(requests) == 3
+    assert compressor.router.endpoints[0].client is None
+    assert compressor.client is None
+
+
+def test_hierarchical_compression_reduces_until_single_call(monkeypatch):
+    import asyncio
+
+    from app import compression
+    from app.config import settings
+
+    monkeypatch.setattr(compression, "count_tokens", lambda text: len(text.split()))
+    monkeypatch.setattr(settings, "compressor_context_tokens", 400)
+    monkeypatch.setattr(settings, "openai_max_tokens", 50)
+
+    compressor = compression.Compressor.__new__(compression.Compressor)
+    compressor.backend = "OPENAI"
+    calls: list[tuple[str, int]] = []
+
+    async def fake_acompress(content, task, budget, mode):
+        calls.append((content, budget))
+        return " ".join(["summary"] * 60)
+
+    compressor.acompress = fake_acompress
+    limit = compressor._batch_token_limit(None, 50, "losslessish")
+    texts = [" ".join(["word"] * (limit // 3)) for _ in range(12)]
+
+    result, report = asyncio.run(
+        compressor.acompress_hierarchical(texts, None, 50, "losslessish")
+    )
+
+    assert result == " ".join(["summary"] * 60)
+    assert report["depth"] == len(report["levels"]) >= 2
+    assert report["levels"][0]["inputs"] == 12
+    assert report["levels"][0]["batches"] > 1
+    assert report["levels"][-1]["batches"] == 1
+    assert all(level["seconds"] >= 0 for level in report["levels"])
+    assert calls[-1][1] == 50
+    assert all(budget <= limit // 2 for _, budget in calls[:-1])
+    assert all(
+        len(content.split()) <= limit for content, _ in calls if "---" in content
+    )
+
+
+def test_hierarchical_compression_never_exceeds_backend_context(monkeypatch):
+    import asyncio
+
+    from app import compression
+    from app.chunking import count_tokens
+    from app.config import settings
+
+    monkeypatch.setattr(settings, "compressor_context_tokens", 1000)
+
+    compressor = compression.Compressor.__new__(compression.Compressor)
+    compressor.backend = "OPENAI"
+    calls: list[tuple[str, int]] = []
+
+    async def fake_acompress(content, task, budget, mode):
+        calls.append((content, budget))
+        return " ".join(["summary"] * budget)
+
+    compressor.acompress = fake_acompress
+    limit = compressor._batch_token_limit(None, 50, "losslessish")
+
+    result, report = asyncio.run(
+        compressor.acompress_hierarchical(
+            ["word " * 5000, "short"], None, 50, "losslessish"
+        )
+    )
+
+    assert report["depth"] >= 2
+    assert report["levels"][-1]["batches"] == 1
+    assert max(count_tokens(content) for content, _ in calls) <= limit
+    assert any("short" in content for content, _ in calls)
+
+
+def test_hierarchical_compression_single_batch_makes_one_call():
+    import asyncio
+
+    from app import compression
+
+    compressor = compression.Compressor.__new__(compression.Compressor)
+    compressor.backend = "OPENAI"
+    calls = []
+
+    async def fake_acompress(content, task, budget, mode):
+        calls.append(content)
+        return "done"
+
+    compressor.acompress = fake_acompress
+
+    result, report = asyncio.run(
+        compressor.acompress_hierarchical(["a", "b"], None, 100, "losslessish")
+    )
+
+    assert result == "done"
+    assert calls == ["a\n\n---\n\nb"]
+    assert report["depth"] == 1
+
+
+def test_compressor_astream_parses_openai_sse(monkeypatch):
+    import asyncio
+    import json
+
+    import httpx
+
+    from app import compression
+
+    captured = {}
+
+    def handler(request):
+        captured["body"] = json.loads(request.content)
+        events = [
+            {"choices": [{"delta": {"role": "assistant"}}]},
+            {"choices": [{"delta": {"content": "  Hello"}}]},
+            {"choices": [{"delta": {"content": ", world"}}]},
+        ]
+        lines = [f"data: {json.dumps(event)}\n\n" for event in events]
+        lines.append("data: [DONE]\n\n")
+        return httpx.Response(
+            200,
+            content="".join(lines).encode(),
+            headers={"content-type": "text/event-stream"},
+        )
+
+    real_async_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        compression.httpx,
+        "AsyncClient",
+        lambda **kwargs: real_async_client(
+            transport=httpx.MockTransport(handler), **kwargs
+        ),
+    )
+    compressor = compression.Compressor()
+
+    async def run():
+        pieces = [
+            piece
+            async for piece in compressor.astream(
+                content="data", task=None, budget=50, mode="losslessish"
+            )
+        ]
+        await compressor.aclose()
+        return pieces
+
+    assert asyncio.run(run()) == ["Hello", ", world"]
+    assert captured["body"]["stream"] is True
+
+
+def test_embedding_batcher_coalesces_concurrent_calls():
+    import threading
+
+    from app.selection import EmbeddingBatcher
+
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[float(len(text))] for text in texts])
+
+    batcher = EmbeddingBatcher(encode, max_wait=0.2, max_batch=6)
+    results = {}
+    start = threading.Barrier(3)
+
+    def worker(name, texts):
+        start.wait()
+        results[name] = batcher.encode(texts)
+
+    threads = [
+        threading.Thread(target=worker, args=(name, texts))
+        for name, texts in [("a", ["x", "yy"]), ("b", ["zzz"]), ("c", ["wwww", "v"])]
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    batcher.close()
+
+    assert len(calls) == 1
+    assert sorted(calls[0]) == sorted(["x", "yy", "zzz", "wwww", "v"])
+    assert results["a"][:, 0].tolist() == [1.0, 2.0]
+    assert results["b"][:, 0].tolist() == [3.0]
+    assert results["c"][:, 0].tolist() == [4.0, 1.0]
+    assert batcher.stats() == {"requests": 3, "batches": 1, "texts": 5}
+
+
+def test_embedding_batcher_aencode_waits_without_threads_and_skips_cancelled():
+    import asyncio
+
+    from app.selection import EmbeddingBatcher
+
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[float(len(text))] for text in texts])
+
+    batcher = EmbeddingBatcher(encode, max_wait=0.2, max_batch=100)
+
+    async def main():
+        cancelled = asyncio.ensure_future(batcher.aencode(["gone"]))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        return await asyncio.gather(*[batcher.aencode(["x" * n]) for n in range(1, 21)])
+
+    try:
+        results = asyncio.run(main())
+    finally:
+        batcher.close()
+
+    assert calls == [["x" * n for n in range(1, 21)]]
+    assert [result[0, 0] for result in results] == list(range(1, 21))
+
+
+def test_embedding_batcher_propagates_errors():
+    from app.selection import EmbeddingBatcher
+
+    def encode(texts):
+        raise RuntimeError("encoder failed")
+
+    batcher = EmbeddingBatcher(encode, max_wait=0.001, max_batch=4)
+    try:
+        with pytest.raises(RuntimeError, match="encoder failed"):
+            batcher.encode(["x"])
+    finally:
+        batcher.close()
+
+
+def test_compressor_acompress_coalesces_identical_inflight_calls():
+    import asyncio
+
+    from app import compression
+
+    compressor = compression.Compressor()
+    calls = []
+
+    async def slow_post(body):
+        calls.append(body)
+        await asyncio.sleep(0.01)
+        return "shared"
+
+    compressor._post_openai = slow_post
+
+    async def run():
+        return await asyncio.gather(
+            *[
+                compressor.acompress(content="same", task=None, budget=50, mode="task")
+                for _ in range(4)
+            ],
+            compressor.acompress(content="other", task=None, budget=50, mode="task"),
+        )
+
+    assert asyncio.run(run()) == ["shared"] * 5
+    assert len(calls) == 2
+    assert compressor.inflight.stats() == {"calls": 2, "coalesced": 3}
+    compressor.close()
+
+
+def test_selector_embed_coalesces_concurrent_identical_calls(monkeypatch):
+    import threading
+    import time
+
+    from app import selection
+
+    started = threading.Event()
+    release = threading.Event()
+    encoded = []
+
+    class BlockingSentenceTransformer:
+        def __init__(self, *_args, **_kwargs):
+            pass
+
+        def encode(self, texts, normalize_embeddings=True):
+            encoded.append(list(texts))
+            started.set()
+            release.wait(timeout=5)
+            return np.eye(2)[: len(texts)]
+
+    monkeypatch.setattr(selection, "SentenceTransformer", BlockingSentenceTransformer)
+    selector = selection.Selector("dummy-model")
+    results = []
+
+    def worker():
+        results.append(selector.embed(["a", "b"]))
+
+    leader = threading.Thread(target=worker)
+    leader.start()
+    started.wait(timeout=5)
+    followers = [threading.Thread(target=worker) for _ in range(2)]
+    for thread in followers:
+        thread.start()
+    while selector.inflight.stats()["coalesced"] < 2:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join()
+
+    assert encoded == [["a", "b"]]
+    assert len(results) == 3
+    assert all(np.array_equal(result, np.eye(2)) for result in results)
+
+
+def test_top_candidates_matches_full_sort_across_blocks():
+    from app.selection import _top_candidates
+
+    rng = np.random.default_rng(3)
+    embeddings = rng.standard_normal((1000, 8))
+    query = rng.standard_normal(8)
+
+    result = _top_candidates(embeddings, query, m=25, block_rows=128)
+
+    sims = _cosine_similarity(embeddings, query)
+    expected = np.sort(np.argsort(-sims)[:25])
+    assert result.tolist() == expected.tolist()
+
+
+def test_select_with_candidate_pool_runs_mmr_on_pool_only(monkeypatch):
+    from app.selection import Selector
+
+    rng = np.random.default_rng(5)
+    embeddings = rng.standard_normal((200, 8))
+    selector = Selector.__new__(Selector)
+    selector.candidate_pool = 30
+    monkeypatch.setattr(selector, "embed", lambda texts: embeddings[: len(texts)])
+    observed = []
+    original_mmr = Selector.mmr
+
+    def recording_mmr(matrix, query_vec, k, lam):
+        observed.append(matrix.shape[0])
+        return original_mmr(selector, matrix, query_vec, k, lam)
+
+    monkeypatch.setattr(selector, "mmr", recording_mmr)
+
+    indices, scores = selector.select(
+        [str(i) for i in range(200)], task=None, keep_ratio=0.05, lam=0.7
+    )
+
+    assert observed == [30]
+    assert len(indices) == 10
+    assert indices == sorted(indices)
+    query = embeddings.mean(axis=0)
+    top = set(np.argsort(-_cosine_similarity(embeddings, query))[:30].tolist())
+    assert set(indices) <= top
+    assert len(scores) == 10
+
+
+def test_mmr_budget_fills_budget_with_smaller_chunks():
+    from app.selection import Selector
+
+    selector = Selector.__new__(Selector)
+    embeddings = np.eye(4)
+    query = np.array([1.0, 0.9, 0.8, 0.7])
+
+    selected = selector.mmr_budget(
+        embeddings, query, costs=[50, 80, 30, 10], budget=100, lam=0.7
+    )
+
+    assert selected == [0, 2, 3]
+    assert sum([50, 80, 30, 10][i] for i in selected) <= 100
+
+
+def test_mmr_budget_keeps_most_relevant_chunk_when_nothing_fits():
+    from app.selection import Selector
+
+    selector = Selector.__new__(Selector)
+    embeddings = np.eye(3)
+
+    selected = selector.mmr_budget(
+        embeddings, np.array([0.1, 1.0, 0.2]), costs=[5, 5, 5], budget=4, lam=0.5
+    )
+
+    assert selected == [1]
+
+
+def test_select_with_token_budget_ignores_keep_ratio(monkeypatch):
+    from app.selection import Selector
+
+    rng = np.random.default_rng(11)
+    embeddings = rng.standard_normal((100, 8))
+    counts = rng.integers(10, 200, size=100).tolist()
+    selector = Selector.__new__(Selector)
+    selector.candidate_pool = 0
+    monkeypatch.setattr(selector, "embed", lambda texts: embeddings[: len(texts)])
+
+    indices, scores = selector.select(
+        [str(i) for i in range(100)],
+        task=None,
+        keep_ratio=1.0,
+        lam=0.5,
+        token_counts=counts,
+        budget_tokens=1000,
+    )
+
+    assert indices == sorted(indices)
+    assert len(scores) == len(indices)
+    used = sum(counts[i] for i in indices)
+    assert used <= 1000
+    assert all(counts[i] > 1000 - used for i in set(range(100)) - set(indices))
+
+
+def test_select_sentences_trims_to_budget_in_order(monkeypatch):
+    from app import selection
+
+    monkeypatch.setattr(selection, "count_tokens", lambda text: len(text.split()))
+    selector = selection.Selector.__new__(selection.Selector)
+    embedded = []
+
+    def keyword_embed(batch):
+        embedded.append(batch)
+        return np.array([
+            [float("pear" in t.lower()), float("zebra" in t.lower()), 0.1]
+            for t in batch
+        ])
+
+    monkeypatch.setattr(selector, "embed", keyword_embed)
+    texts = [
+        "Pears are sweet. Zebras run fast. Pears grow on trees.",
+        "Quartz is a mineral. Pear orchards need sun.",
+    ]
+
+    trimmed = selector.select_sentences(texts, "pears", budget_tokens=11, lam=0.9)
+
+    assert trimmed == [
+        "Pears are sweet. Pears grow on trees.",
+        "Pear orchards need sun.",
+    ]
+    assert len(embedded[0]) == 5  # every sentence in one batch
+    assert selector.select_sentences(texts, "pears", budget_tokens=100) == texts
+
+
+class _FakeEncoding:
+    def __init__(self, ids):
+        self.ids = ids
+
+
+class _FakeTokenizer:
+    def encode_batch(self, texts):
+        return [_FakeEncoding([len(word) for word in text.split()]) for text in texts]
+
+
+class _FakeSession:
+    """Hidden state row t is (token id, position); records padded batch shapes."""
+
+    def __init__(self, inputs=("input_ids", "attention_mask")):
+        self.inputs = [type("Input", (), {"name": name})() for name in inputs]
+        self.shapes = []
+        self.feeds = []
+
+    def get_inputs(self):
+        return self.inputs
+
+    def run(self, _outputs, feeds):
+        ids = feeds["input_ids"]
+        self.shapes.append(ids.shape)
+        self.feeds.append(set(feeds))
+        positions = np.broadcast_to(np.arange(ids.shape[1]), ids.shape)
+        return [np.stack([ids, positions + 1], axis=-1).astype(np.float32)]
+
+
+def test_onnx_backend_batches_by_length_and_restores_order():
+    from app.selection import OnnxEmbeddingBackend
+
+    session = _FakeSession()
+    backend = OnnxEmbeddingBackend(session, _FakeTokenizer(), max_batch_tokens=6)
+    texts = ["a b c d e f", "aa", "aaa b", "aaaa", "x y z"]
+
+    embeddings = backend.encode(texts)
+
+    # Sorted lengths 1, 1, 2, 3, 6: each batch pads only to its longest text.
+    assert session.shapes == [(3, 2), (1, 3), (1, 6)]
+    assert np.allclose(np.linalg.norm(embeddings, axis=1), 1.0)
+    # CLS pooling keeps the first token: (first word length, position 1).
+    expected = np.array([[1, 1], [2, 1], [3, 1], [4, 1], [1, 1]], dtype=np.float32)
+    expected /= np.linalg.norm(expected, axis=1, keepdims=True)
+    assert np.allclose(embeddings, expected)
+
+
+def test_onnx_backend_mean_pooling_ignores_padding():
+    from app.selection import OnnxEmbeddingBackend
+
+    session = _FakeSession(("input_ids", "attention_mask", "token_type_ids"))
+    backend = OnnxEmbeddingBackend(session, _FakeTokenizer(), pooling="mean")
+
+    embeddings = backend.encode(["aa bbbb", "cccccc"])
+
+    assert session.shapes == [(2, 2)]
+    assert session.feeds[0] == {"input_ids", "attention_mask", "token_type_ids"}
+    expected = np.array([[3, 1.5], [6, 1]], dtype=np.float32)
+    expected /= np.linalg.norm(expected, axis=1, keepdims=True)
+    assert np.allclose(embeddings, expected)
+    assert backend.encode([]).shape == (0, 2)
+
+
+def test_load_embedding_backend_falls_back(monkeypatch):
+    from app import selection
+
+    monkeypatch.setattr(selection, "SentenceTransformer", None)
+    backend = selection.load_embedding_backend("auto", "m", "/missing/model.onnx")
+    assert isinstance(backend, selection.FallbackBackend)
+    assert backend.encode(["abc"]).shape == (1, 26)
+
+    with pytest.raises(ValueError):
+        selection.load_embedding_backend("onnx", "m")
+    with pytest.raises(ValueError):
+        selection.load_embedding_backend("tensorrt", "m")
+
+
+def test_selector_uses_injected_backend():
+    from app.selection import Selector
+
+    class Backend:
+        def __init__(self):
+            self.calls = []
+
+        def encode(self, texts):
+            self.calls.append(list(texts))
+            return np.eye(3)[: len(texts)]
+
+    backend = Backend()
+    selector = Selector("m", backend=backend)
+    indices, _ = selector.select(["a", "b", "c"], task=None, keep_ratio=0.5, lam=0.5)
+
+    assert backend.calls == [["a", "b", "c"]]
+    assert len(indices) == 1
+
+
+def test_selector_buckets_embedding_calls_by_length():
+    from app.selection import Selector
+
+    class Backend:
+        def __init__(self):
+            self.calls = []
+
+        def encode(self, texts):
+            self.calls.append(list(texts))
+            return np.array([[len(text.split()), 1.0] for text in texts])
+
+    backend = Backend()
+    selector = Selector("m", backend=backend, max_batch_tokens=8)
+    texts = ["w " * 6, "w", "w " * 3, "w w", "w " * 12, "w"]
+
+    embeddings = selector.embed(texts)
+
+    # Buckets are filled in length order; their padded size stays within 8
+    # tokens, except for a single over-long text.
+    assert [[len(text.split()) for text in call] for call in backend.calls] == [
+        [1, 1, 2],
+        [3],
+        [6],
+        [12],
+    ]
+    assert embeddings[:, 0].tolist() == [6, 1, 3, 2, 12, 1]
+
+
+@pytest.mark.parametrize("start_method", ["spawn", "fork"])
+def test_embedding_worker_pool_matches_in_process_backend(start_method):
+    import multiprocessing
+
+    from app.embedding_workers import EmbeddingWorkerPool
+    from app.selection import FallbackBackend, Selector
+
+    if start_method not in multiprocessing.get_all_start_methods():
+        pytest.skip(f"{start_method} is not available")
+    texts = [f"text {'abc' * (i % 7)} number {i}" for i in range(40)]
+    pool = EmbeddingWorkerPool(
+        2,
+        "fallback",
+        "m",
+        max_batch_tokens=16,
+        start_method=start_method,
+        preload=True,
+    )
+    selector = Selector("m", backend=pool, max_batch_tokens=16)
+    try:
+        embeddings = selector.embed(texts)
+        cache_id = pool.cache_id
+    finally:
+        selector.close()
+
+    assert np.allclose(embeddings, FallbackBackend().encode(texts))
+    assert cache_id == "fallback"
+    stats = pool.stats()
+    assert stats["calls"] == 1
+    assert stats["tasks"] > 1
+    assert stats["texts"] == len(texts)
+
+
+def test_embedding_worker_pool_forwards_max_batch_tokens(monkeypatch):
+    import multiprocessing
+
+    from app import embedding_workers
+    from app.selection import FallbackBackend
+
+    if "fork" not in multiprocessing.get_all_start_methods():
+        pytest.skip("fork is not available")
+    configs = []
+
+    def load(config):
+        configs.append(config)
+        return FallbackBackend()
+
+    monkeypatch.setattr(embedding_workers, "_load", load)
+    pool = embedding_workers.EmbeddingWorkerPool(
+        1,
+        "onnx",
+        "m",
+        "model.onnx",
+        max_batch_tokens=2048,
+        start_method="fork",
+        preload=True,
+        pooling="mean",
+    )
+    pool.close()
+
+    assert configs[0]["max_batch_tokens"] == 2048
+    assert configs[0]["pooling"] == "mean"
+
+
+def test_embedding_worker_caps_threads_of_lazily_imported_torch(monkeypatch):
+    import sys
+    import types
+
+    from app import embedding_workers
+    from app.selection import FallbackBackend
+
+    capped = []
+    torch = types.SimpleNamespace(set_num_threads=capped.append)
+
+    def load(config):
+        monkeypatch.setitem(sys.modules, "torch", torch)  # imported by the backend
+        return FallbackBackend()
+
+    monkeypatch.delitem(sys.modules, "torch", raising=False)
+    monkeypatch.setattr(embedding_workers, "_load", load)
+    monkeypatch.setattr(embedding_workers, "_backend", None)
+
+    embedding_workers._init_worker({}, threads=3, preloaded=False)
+
+    assert capped == [3]
@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from app.quantization import QuantizedMatrix, quantize_rows, truncate_dim
+
+
+@pytest.fixture
+def matrix():
+    return np.random.default_rng(3).standard_normal((50, 16)).astype(np.float32)
+
+
+@pytest.mark.parametrize("dtype,atol", [("float16", 2e-3), ("int8", 2e-2)])
+def test_quantized_dot_matches_normalized_float32(matrix, dtype, atol):
+    unit = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+    vector = matrix[0]
+    quantized = QuantizedMatrix.from_array(matrix, dtype)
+    quantized.block_rows = 7  # exercise the blocked path
+
+    np.testing.assert_allclose(quantized.dot(vector), unit.dot(vector), atol=atol * 4)
+    np.testing.assert_allclose(quantized.mean(), unit.mean(axis=0), atol=atol)
+    np.testing.assert_allclose(quantized[3], unit[3], atol=atol)
+    assert quantized[[1, 4]].shape == (2, 16)
+    assert quantized.nbytes < matrix.nbytes / 1.9
+
+
+def test_int8_rows_carry_per_row_scales(matrix):
+    data, scales = quantize_rows(matrix, "int8")
+
+    assert data.dtype == np.int8
+    assert scales.shape == (50,)
+    assert np.abs(data).max(axis=1).tolist() == [127] * 50
+
+
+def test_truncate_dim_renormalizes_prefix(matrix):
+    truncated = truncate_dim(matrix, 4)
+
+    assert truncated.shape == (50, 4)
+    np.testing.assert_allclose(np.linalg.norm(truncated, axis=1), 1.0, rtol=1e-5)
+    assert truncate_dim(matrix, 0) is matrix
+
+
+def test_selector_mmr_agrees_on_quantized_matrix(matrix):
+    from app.selection import Selector
+
+    selector = Selector.__new__(Selector)
+    query = matrix[:5].mean(axis=0)
+
+    exact = selector.mmr(matrix, query, k=5, lam=0.7)
+    compact = selector.mmr(QuantizedMatrix.from_array(matrix, "float16"), query, 5, 0.7)
+
+    assert compact == exact
+
+
+def test_unknown_dtype_is_rejected(matrix):
+    with pytest.raises(ValueError):
+        quantize_rows(matrix, "bfloat16")
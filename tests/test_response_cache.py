@@ -0,0 +1,78 @@
+from app import response_cache as rc
+from app.response_cache import ResponseCache, SQLiteCacheBackend, stable_hash
+
+
+def test_stable_hash_ignores_key_order():
+    assert stable_hash({"a": 1, "b": [1, 2]}) == stable_hash({"b": [1, 2], "a": 1})
+    assert stable_hash({"a": 1}) != stable_hash({"a": 2})
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(rc.time, "monotonic", lambda: now[0])
+    cache = ResponseCache(max_bytes=1024, ttl=10)
+
+    cache.set("key", b"value")
+    assert cache.get("key") == b"value"
+
+    now[0] += 11
+    assert cache.get("key") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_is_bounded_by_bytes():
+    cache = ResponseCache(max_bytes=10, ttl=60)
+
+    cache.set("a", b"12345")
+    cache.set("b", b"12345")
+    cache.get("a")
+    cache.set("c", b"12345")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"12345"
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] == 10
+
+
+def test_sqlite_backend_is_shared_between_caches(tmp_path):
+    path = tmp_path / "responses.sqlite"
+    writer = ResponseCache(max_bytes=1024, ttl=60, backend=SQLiteCacheBackend(path))
+    reader = ResponseCache(max_bytes=1024, ttl=60, backend=SQLiteCacheBackend(path))
+
+    writer.set("key", b"shared")
+
+    assert reader.get("key") == b"shared"
+    assert reader.stats()["entries"] == 1
+    writer.close()
+    reader.close()
+
+
+def test_sqlite_backend_honors_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rc.time, "time", lambda: now[0])
+    backend = SQLiteCacheBackend(":memory:")
+
+    backend.set("key", b"value", ttl=5)
+    now[0] += 1
+    assert backend.get("key") == (b"value", 4.0)
+
+    now[0] += 5
+    assert backend.get("key") is None
+
+
+def test_shared_entries_keep_their_remaining_ttl_locally(monkeypatch):
+    wall, mono = [1000.0], [50.0]
+    monkeypatch.setattr(rc.time, "time", lambda: wall[0])
+    monkeypatch.setattr(rc.time, "monotonic", lambda: mono[0])
+    backend = SQLiteCacheBackend(":memory:")
+    backend.set("key", b"value", ttl=10)
+    wall[0] += 9
+    cache = ResponseCache(max_bytes=1024, ttl=10, backend=backend)
+
+    assert cache.get("key") == b"value"
+    wall[0] += 2
+    mono[0] += 2
+
+    assert cache.get("key") is None
@@ -0,0 +1,215 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.routing import EndpointRouter, parse_endpoints
+
+
+def _factory(handler, created=None):
+    def build(base_url):
+        if created is not None:
+            created.append(base_url)
+        return httpx.AsyncClient(
+            base_url=base_url, transport=httpx.MockTransport(handler)
+        )
+
+    return build
+
+
+def test_parse_endpoints_reads_optional_weights():
+    assert parse_endpoints("http://a/v1 3, http://b/v1/ ,") == [
+        ("http://a/v1", 3.0),
+        ("http://b/v1", 1.0),
+    ]
+    with pytest.raises(ValueError):
+        parse_endpoints("http://a/v1 0")
+
+
+def test_router_spreads_load_by_weight_and_outstanding_calls():
+    hosts = []
+
+    async def handler(request):
+        hosts.append(request.url.host)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={})
+
+    created = []
+    router = EndpointRouter(
+        [("http://a/v1", 2.0), ("http://b/v1", 1.0)], _factory(handler, created)
+    )
+
+    async def main():
+        await asyncio.gather(*[router.request("GET", "/x") for _ in range(6)])
+        idle = router.pick().url
+        await router.aclose()
+        return idle
+
+    idle = asyncio.run(main())
+
+    assert hosts.count("a") == 4
+    assert hosts.count("b") == 2
+    assert sorted(created) == ["http://a/v1", "http://b/v1"]
+    assert idle == "http://a/v1"
+    assert all(endpoint.outstanding == 0 for endpoint in router.endpoints)
+    assert all(endpoint.client is None for endpoint in router.endpoints)
+
+
+def test_router_retries_on_another_endpoint_and_ejects_failing_one():
+    def handler(request):
+        if request.url.host == "a":
+            return httpx.Response(503)
+        return httpx.Response(200, json={"host": request.url.host})
+
+    router = EndpointRouter(
+        [("http://a/v1", 1.0), ("http://b/v1", 1.0)],
+        _factory(handler),
+        max_failures=2,
+        eject_seconds=60,
+    )
+
+    async def main():
+        bodies = []
+        for _ in range(6):
+            response = await router.request("GET", "/x")
+            bodies.append(response.json()["host"])
+        await router.aclose()
+        return bodies
+
+    assert asyncio.run(main()) == ["b"] * 6
+    first, second = router.stats()
+    assert first["healthy"] is False
+    assert first["ejections"] == 1
+    assert first["errors"] == 2
+    assert second["errors"] == 0
+    assert second["requests"] == 6
+
+
+def test_router_does_not_retry_client_errors_or_beyond_budget():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.host)
+        return httpx.Response(400 if request.url.path == "/v1/bad" else 502)
+
+    router = EndpointRouter(
+        [("http://a/v1", 1.0), ("http://b/v1", 1.0), ("http://c/v1", 1.0)],
+        _factory(handler),
+        retries=1,
+    )
+
+    async def main():
+        with pytest.raises(httpx.HTTPStatusError) as bad:
+            await router.request("GET", "/bad")
+        with pytest.raises(httpx.HTTPStatusError) as down:
+            await router.request("GET", "/down")
+        await router.aclose()
+        return bad.value, down.value
+
+    bad, down = asyncio.run(main())
+
+    assert bad.response.status_code == 400
+    assert down.response.status_code == 502
+    assert len(calls) == 3  # one bad call, then one try plus one retry
+    assert sum(endpoint["errors"] for endpoint in router.stats()) == 3
+
+
+def test_router_counts_client_errors_without_ejecting():
+    router = EndpointRouter(
+        [("http://a/v1", 1.0)],
+        _factory(lambda request: httpx.Response(400)),
+        max_failures=1,
+    )
+
+    async def main():
+        with pytest.raises(httpx.HTTPStatusError):
+            await router.request("GET", "/x")
+        await router.aclose()
+
+    asyncio.run(main())
+
+    stats = router.stats()[0]
+    assert (stats["errors"], stats["ejections"], stats["healthy"]) == (1, 0, True)
+
+
+def test_router_health_checks_eject_and_readmit():
+    up = {"a": False, "b": True}
+
+    def handler(request):
+        return httpx.Response(200 if up[request.url.host] else 503, json={})
+
+    router = EndpointRouter(
+        [("http://a/v1", 1.0), ("http://b/v1", 1.0)], _factory(handler)
+    )
+
+    async def main():
+        await router.check_health()
+        down = [endpoint["healthy"] for endpoint in router.stats()]
+        up["a"] = True
+        await router.check_health()
+        healthy = [endpoint["healthy"] for endpoint in router.stats()]
+        await router.aclose()
+        return down, healthy
+
+    assert asyncio.run(main()) == ([False, True], [True, True])
+
+
+def test_router_uses_ejected_endpoint_when_nothing_else_is_left():
+    router = EndpointRouter(
+        [("http://a/v1", 1.0)],
+        _factory(lambda request: httpx.Response(500)),
+        max_failures=1,
+    )
+
+    async def main():
+        for _ in range(2):
+            with pytest.raises(httpx.HTTPStatusError):
+                await router.request("GET", "/x")
+        await router.aclose()
+
+    asyncio.run(main())
+
+    assert router.endpoints[0].requests == 2
+    assert router.stats()[0]["healthy"] is False
+
+
+def test_compressor_stream_retries_before_first_piece(monkeypatch):
+    from app import compression
+    from app.config import settings
+
+    def handler(request):
+        if request.url.host == "a":
+            raise httpx.ConnectError("refused", request=request)
+        event = {"choices": [{"delta": {"content": "ok"}}]}
+        return httpx.Response(
+            200,
+            content=f"data: {json.dumps(event)}\n\ndata: [DONE]\n\n".encode(),
+            headers={"content-type": "text/event-stream"},
+        )
+
+    real_async_client = httpx.AsyncClient
+    monkeypatch.setattr(
+        compression.httpx,
+        "AsyncClient",
+        lambda **kwargs: real_async_client(
+            transport=httpx.MockTransport(handler), **kwargs
+        ),
+    )
+    monkeypatch.setattr(settings, "openai_base_urls", "http://a/v1 5, http://b/v1")
+    compressor = compression.Compressor()
+
+    async def run():
+        pieces = [
+            piece
+            async for piece in compressor.astream(
+                content="data", task=None, budget=50, mode="losslessish"
+            )
+        ]
+        await compressor.aclose()
+        return pieces
+
+    assert asyncio.run(run()) == ["ok"]
+    first, second = compressor.router.stats()
+    assert (first["url"], first["errors"]) == ("http://a/v1", 1)
+    assert (second["url"], second["requests"]) == ("http://b/v1", 1)
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+from app.singleflight import AsyncSingleFlight, SingleFlight
+
+
+def test_sync_single_flight_runs_sequential_calls_separately():
+    flight = SingleFlight()
+
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.do("key", lambda: 2) == 2
+    assert flight.stats() == {"calls": 2, "coalesced": 0}
+
+
+def test_sync_single_flight_propagates_errors_and_releases_key():
+    flight = SingleFlight()
+
+    def fail():
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError):
+        flight.do("key", fail)
+
+    assert flight.do("key", lambda: "ok") == "ok"
+
+
+def test_async_single_flight_shares_result_and_errors():
+    flight = AsyncSingleFlight()
+    runs = []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return "value"
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("backend down")
+
+    async def run():
+        values = await asyncio.gather(*[flight.do("a", work) for _ in range(3)])
+        errors = await asyncio.gather(
+            *[flight.do("b", failing) for _ in range(2)], return_exceptions=True
+        )
+        return values, errors
+
+    values, errors = asyncio.run(run())
+
+    assert values == ["value"] * 3
+    assert len(runs) == 1
+    assert all(isinstance(error, RuntimeError) for error in errors)
+    assert flight.stats() == {"calls": 2, "coalesced": 3}
+
+
+def test_async_single_flight_survives_follower_cancellation():
+    flight = AsyncSingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run():
+        leader = asyncio.ensure_future(flight.do("key", work))
+        follower = asyncio.ensure_future(flight.do("key", work))
+        await asyncio.sleep(0)
+        follower.cancel()
+        return await leader
+
+    assert asyncio.run(run()) == "done"